@@ -0,0 +1,117 @@
+"""
+Requests/sec and latency of /user/dashboard-summary at high concurrency,
+comparing the async application against the old sync request path
+(benchmarks/sync_reference.py) on the same database.
+
+    python -m benchmarks.bench_async_vs_sync --concurrency 200 --duration 10
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_async_vs_sync
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from benchmarks.common import free_port, percentile, request, start_server, stop_server
+
+
+def seed(port, users):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    tokens = []
+    for i in range(users):
+        status, data, _ = request(conn, "POST", "/auth/register", {
+            "email": f"load{i}@bench.io",
+            "username": f"load{i}",
+            "password": "hunter22"
+        })
+        if status != 200:
+            status, data, _ = request(conn, "POST", "/auth/login", {
+                "email": f"load{i}@bench.io",
+                "password": "hunter22"
+            })
+        token = json.loads(data)["access_token"]
+        auth = {"Authorization": f"Bearer {token}"}
+        request(conn, "PUT", "/user/workout-plan", {
+            "workout_plan": {"monday": {"name": "Chest", "exercises": ["Bench Press"]}}
+        }, headers=auth)
+        request(conn, "PUT", "/user/workout-completion", {
+            "completed_exercises": {"monday-0": True},
+            "points": 10
+        }, headers=auth)
+        tokens.append(token)
+    return tokens
+
+
+def drive(port, tokens, concurrency, duration):
+    stop = threading.Event()
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def client(n):
+        c = http.client.HTTPConnection("127.0.0.1", port)
+        auth = {"Authorization": f"Bearer {tokens[n % len(tokens)]}"}
+        local = []
+        while not stop.is_set():
+            try:
+                status, _, elapsed = request(c, "GET", "/user/dashboard-summary", headers=auth)
+            except OSError:
+                c = http.client.HTTPConnection("127.0.0.1", port)
+                status, elapsed = 0, 0
+            if status == 200:
+                local.append(elapsed)
+            else:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    return latencies, errors[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL") or f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    # Hashing is not what is being measured here
+    env = {"HASH_POOL_SIZE": "0", "ARGON2_MEMORY_COST": "1024", "ARGON2_TIME_COST": "1"}
+
+    port = free_port()
+    proc = start_server(port, database_url, env=env)
+    try:
+        tokens = seed(port, args.users)
+    finally:
+        stop_server(proc)
+
+    for label, app in (("sync ", "benchmarks.sync_reference:app"), ("async", "main:app")):
+        port = free_port()
+        proc = start_server(port, database_url, app=app, env=env)
+        try:
+            latencies, errors = drive(port, tokens, args.concurrency, args.duration)
+        finally:
+            stop_server(proc)
+        print(
+            f"{label} concurrency={args.concurrency} "
+            f"rps={len(latencies) / args.duration:8.1f} "
+            f"p50={statistics.median(latencies) * 1000:7.1f}ms "
+            f"p99={percentile(latencies, 99) * 1000:7.1f}ms "
+            f"errors={errors}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+(user_id, activity_date) lookup latency on a one-million-row
+daily_activity table, with the legacy single-column user_id index and
+after migration 0003 adds the unique composite index.
+
+    python -m benchmarks.bench_composite_index --users 2000 --days 500
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, insert, text
+
+import migrations
+from benchmarks.common import percentile
+from models.activity import DailyActivity
+
+LOOKUP = text(
+    "SELECT id, steps, points FROM daily_activity "
+    "WHERE user_id = :user_id AND activity_date = :activity_date"
+)
+
+
+def measure(conn, users, start, days, lookups):
+    samples = []
+    for _ in range(lookups):
+        params = {
+            "user_id": random.choice(users),
+            "activity_date": start + timedelta(days=random.randrange(days)),
+        }
+        t0 = time.perf_counter()
+        conn.execute(LOOKUP, params).first()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def report(label, samples):
+    print(
+        f"{label:28s} p50={statistics.median(samples) * 1e6:9.1f}us "
+        f"p99={percentile(samples, 99) * 1e6:9.1f}us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=500)
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/index_bench.db"
+    engine = create_engine(url)
+    users = [str(uuid.uuid4()) for _ in range(args.users)]
+    start = date(2023, 1, 1)
+
+    with engine.begin() as conn:
+        migrations.upgrade(conn, target=2)
+        # Reproduce the pre-0003 layout: only the single-column user_id index
+        for name in ("uq_daily_activity_user_date", "uq_workout_completions_user_date", "uq_user_junk_limits_user_type"):
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+    print(f"seeding {args.users * args.days:,} daily_activity rows ...")
+    with engine.begin() as conn:
+        batch = []
+        for user_id in users:
+            for d in range(args.days):
+                batch.append({
+                    "id": str(uuid.uuid4()),
+                    "user_id": user_id,
+                    "activity_date": start + timedelta(days=d),
+                    "steps": random.randrange(12000),
+                    "points": 0,
+                })
+            if len(batch) >= 50000:
+                conn.execute(insert(DailyActivity.__table__), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(DailyActivity.__table__), batch)
+
+    with engine.connect() as conn:
+        before = measure(conn, users, start, args.days, args.lookups)
+
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        migrations.upgrade(conn)
+    migrate_seconds = time.perf_counter() - t0
+
+    with engine.connect() as conn:
+        after = measure(conn, users, start, args.days, args.lookups)
+
+    report("before (user_id index)", before)
+    report("after (unique user+date)", after)
+    print(f"migration 0003 took {migrate_seconds:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Fire parallel /activity/steps and /user/workout-completion writes for
+the same user and day, then check that exactly one row per day exists
+and that user_stats agrees with it. Reports write throughput; the
+correctness check alone runs in tests/test_concurrent_upserts.py.
+
+    python -m benchmarks.bench_concurrent_upserts --clients 32 --writes 50
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_concurrent_upserts
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from benchmarks.common import free_port, request, start_server, stop_server
+
+
+async def check_database(user_id):
+    from sqlalchemy import func, select
+    from database import SessionLocal, engine
+    from models.activity import DailyActivity
+    from models.user_stats import UserStats
+    from models.workout import WorkoutCompletion
+
+    try:
+        async with SessionLocal() as db:
+            activity_rows = await db.scalar(
+                select(func.count()).select_from(DailyActivity).where(DailyActivity.user_id == user_id)
+            )
+            completions = (await db.execute(
+                select(WorkoutCompletion.points_awarded).where(WorkoutCompletion.user_id == user_id)
+            )).all()
+            stats = await db.get(UserStats, user_id)
+    finally:
+        await engine.dispose()
+
+    assert activity_rows == 1, f"expected 1 daily_activity row, found {activity_rows}"
+    assert len(completions) == 1, f"expected 1 workout_completions row, found {len(completions)}"
+    points = completions[0][0]
+    assert stats.workout_points == points, (stats.workout_points, points)
+    assert stats.workout_active_points == max(points, 0), (stats.workout_active_points, points)
+    assert stats.workout_active_days == (1 if points > 0 else 0), stats.workout_active_days
+    assert stats.workout_streak == (1 if points > 0 else 0), stats.workout_streak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--writes", type=int, default=50)
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL") or f"sqlite:///{tempfile.mkdtemp()}/upserts.db"
+    os.environ["DATABASE_URL"] = database_url
+    env = {"HASH_POOL_SIZE": "0", "ARGON2_MEMORY_COST": "1024", "ARGON2_TIME_COST": "1"}
+
+    port = free_port()
+    proc = start_server(port, database_url, env=env)
+    failures = []
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        suffix = random.randrange(10 ** 9)
+        status, data, _ = request(conn, "POST", "/auth/register", {
+            "email": f"race{suffix}@bench.io",
+            "username": f"race{suffix}",
+            "password": "hunter22"
+        })
+        assert status == 200, data
+        body = json.loads(data)
+        auth = {"Authorization": f"Bearer {body['access_token']}"}
+
+        def writer(n):
+            c = http.client.HTTPConnection("127.0.0.1", port)
+            for i in range(args.writes):
+                points = random.choice([0, 5, 10, 20])
+                status, data, _ = request(c, "PUT", "/user/workout-completion", {
+                    "completed_exercises": {"monday-0": points > 0},
+                    "points": points
+                }, headers=auth)
+                if status != 200:
+                    failures.append((status, data[:200]))
+                status, data, _ = request(c, "POST", f"/activity/steps?steps={n * 1000 + i}", headers=auth)
+                if status != 200:
+                    failures.append((status, data[:200]))
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(args.clients)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        stop_server(proc)
+
+    total = args.clients * args.writes * 2
+    print(f"{total} writes from {args.clients} clients in {elapsed:.2f}s ({total / elapsed:.0f} writes/s)")
+    assert not failures, f"{len(failures)} failed writes, e.g. {failures[:3]}"
+    asyncio.run(check_database(body["user_id"]))
+    print("OK: one row per (user, day) and user_stats matches")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Dashboard-summary data access over a slow network: the previous three
+sequential queries against the single combined query, both through a
+local TCP proxy that adds a fixed delay in each direction, so every
+round trip costs roughly --rtt-ms.
+
+    python -m benchmarks.bench_dashboard_rtt --database-url postgresql://user:pw@localhost/ritual --rtt-ms 2
+
+Needs a server reachable over TCP (Postgres); SQLite has no round trips
+to save.
+"""
+import argparse
+import asyncio
+import time
+from datetime import date
+
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from benchmarks.common import percentile
+from benchmarks.seed import seed_database
+from crud.dashboard import get_dashboard_data
+from database import _async_url
+from models.user_stats import UserStats
+from models.workout import WorkoutCompletion, WorkoutPlan
+
+
+async def _pipe(reader, writer, delay):
+    try:
+        while data := await reader.read(65536):
+            await asyncio.sleep(delay)
+            writer.write(data)
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def start_proxy(host, port, rtt):
+    """Listen on a free local port; each direction adds half of ``rtt``."""
+    async def handle(client_reader, client_writer):
+        server_reader, server_writer = await asyncio.open_connection(host, port)
+        await asyncio.gather(
+            _pipe(client_reader, server_writer, rtt / 2),
+            _pipe(server_reader, client_writer, rtt / 2),
+        )
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+async def sequential(db, user_id, today):
+    # What the route did before: one round trip per piece
+    plan = await db.scalar(select(WorkoutPlan).where(WorkoutPlan.user_id == user_id))
+    completion = await db.scalar(select(WorkoutCompletion).where(
+        WorkoutCompletion.user_id == user_id,
+        WorkoutCompletion.completion_date == today
+    ))
+    stats = await db.get(UserStats, user_id)
+    return (
+        plan.plan if plan else {},
+        completion.completed_exercises if completion else {},
+        completion.points_awarded if completion else 0,
+        stats.workout_points if stats else 0,
+    )
+
+
+async def combined(db, user_id, today):
+    data = await get_dashboard_data(db, user_id, today)
+    return (
+        data.workout_plan or {},
+        data.completed_exercises or {},
+        data.today_points or 0,
+        data.total_points or 0,
+    )
+
+
+async def time_variant(sessionmaker, fetch, user_ids, today, repeat):
+    samples = []
+    for _ in range(repeat):
+        for user_id in user_ids:
+            # A fresh session per call, as a request gets
+            async with sessionmaker() as db:
+                start = time.perf_counter()
+                await fetch(db, user_id, today)
+                samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def run(url, rtt, users, repeat):
+    target = make_url(url)
+    proxy, port = await start_proxy(target.host or "127.0.0.1", target.port or 5432, rtt)
+    engine = create_async_engine(_async_url(target.set(host="127.0.0.1", port=port).render_as_string(hide_password=False)))
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    today = date.today()
+    try:
+        async with sessionmaker() as db:
+            user_ids = list(await db.scalars(select(UserStats.user_id).order_by(UserStats.user_id).limit(users)))
+            for user_id in user_ids:
+                assert await sequential(db, user_id, today) == await combined(db, user_id, today), user_id
+
+        results = {}
+        for name, fetch in (("sequential", sequential), ("combined", combined)):
+            # Warm the pool and the statement caches first
+            await time_variant(sessionmaker, fetch, user_ids[:5], today, 1)
+            results[name] = await time_variant(sessionmaker, fetch, user_ids, today, repeat)
+        return results
+    finally:
+        await engine.dispose()
+        proxy.close()
+        await proxy.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", required=True, help="postgresql://...")
+    parser.add_argument("--rtt-ms", type=float, default=2.0)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-seed", action="store_true", help="reuse an already seeded --database-url")
+    args = parser.parse_args()
+    if make_url(args.database_url).get_backend_name() == "sqlite":
+        parser.error("needs a networked database; SQLite has no round trips")
+
+    if not args.skip_seed:
+        seed_database(args.database_url, args.users, args.days)
+
+    results = asyncio.run(run(args.database_url, args.rtt_ms / 1000, args.users, args.repeat))
+    print(f"rtt={args.rtt_ms}ms users={args.users} calls={len(results['combined'])}")
+    for name, s in results.items():
+        print(
+            f"{name:12s} p50 {percentile(s, 50) * 1000:7.2f} ms  "
+            f"p95 {percentile(s, 95) * 1000:7.2f} ms  mean {sum(s) / len(s) * 1000:7.2f} ms"
+        )
+    saved = percentile(results["sequential"], 50) - percentile(results["combined"], 50)
+    print(f"combined saves {saved * 1000:.2f} ms at p50 (~{saved / (args.rtt_ms / 1000):.1f} round trips)")
+
+
+if __name__ == "__main__":
+    main()
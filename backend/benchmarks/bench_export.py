@@ -0,0 +1,157 @@
+"""
+Streaming export: checks GET /user/export against the seeded history
+in both formats and gzipped, then measures the all-user export
+(manage.py export) for throughput and peak Python memory on that
+database and on one with a quarter of the users. Memory should track
+the batch size, not the row count.
+
+    python -m benchmarks.bench_export --users 300 --days 365
+
+The run fails when the larger export peaks above --max-ratio times the
+smaller one.
+"""
+import argparse
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+from sqlalchemy import create_engine, text
+
+# record -> table, for the expected counts
+TABLES = {
+    "activity": "daily_activity",
+    "workout": "workout_completions",
+    "plan": "workout_plans",
+    "activity_streak": "streaks",
+    "workout_streak_run": "workout_streak_runs",
+}
+
+
+def expected_counts(url, user_id=None):
+    engine = create_engine(url)
+    counts = Counter()
+    with engine.connect() as conn:
+        for record, table in TABLES.items():
+            where = " WHERE user_id = :user_id" if user_id else ""
+            counts[record] = conn.scalar(text(f"SELECT COUNT(*) FROM {table}{where}"), {"user_id": user_id})
+    engine.dispose()
+    return +counts
+
+
+async def measure(url, traced=False):
+    """(rows, seconds, peak traced bytes) for one all-user export of ``url``."""
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from crud.export import stream_export
+
+    engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://", 1))
+    rows = 0
+    if traced:
+        tracemalloc.start()
+    start = time.perf_counter()
+    async with AsyncSession(engine) as db:
+        async for chunk in stream_export(db, "ndjson"):
+            rows += chunk.count(b"\n")
+    seconds = time.perf_counter() - start
+    peak = 0
+    if traced:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    await engine.dispose()
+    return rows, seconds, peak
+
+
+async def check_routes(url, user_id):
+    from benchmarks.common import ASGIClient
+    from benchmarks.seed import SEED_PASSWORD, seed_email
+    from main import app
+
+    failures = []
+    async with ASGIClient(app) as client:
+        # After startup, which rebuilds the stats and streak runs
+        expected = expected_counts(url, user_id)
+        status, data = await client.request("POST", "/auth/login", {"email": seed_email(0), "password": SEED_PASSWORD})
+        assert status == 200, data
+        auth = {"Authorization": f"Bearer {json.loads(data)['access_token']}"}
+
+        status, ndjson = await client.request("GET", "/user/export?format=ndjson", None, auth)
+        assert status == 200, status
+        records = [json.loads(line) for line in ndjson.splitlines()]
+        got = Counter(record["record"] for record in records)
+        if got != expected or {record["user_id"] for record in records} != {user_id}:
+            print(f"MISMATCH   ndjson: {dict(got)} != {dict(expected)}")
+            failures.append("ndjson")
+
+        status, body = await client.request("GET", "/user/export?format=csv", None, auth)
+        assert status == 200, status
+        got = Counter(row["record"] for row in csv.DictReader(io.StringIO(body.decode())))
+        if got != expected:
+            print(f"MISMATCH   csv: {dict(got)} != {dict(expected)}")
+            failures.append("csv")
+
+        status, body, headers = await client.request(
+            "GET", "/user/export?format=ndjson", None, {**auth, "Accept-Encoding": "gzip"}, with_headers=True
+        )
+        if headers.get("content-encoding") != "gzip" or gzip.decompress(body) != ndjson:
+            print(f"NOT GZIPPED export: {headers}")
+            failures.append("gzip")
+        else:
+            print(f"user export: {len(records):,} records, {len(ndjson):,} bytes, {len(body):,} gzipped")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--max-ratio", type=float, default=1.5)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    url = f"sqlite:///{directory}/export.db"
+    small_url = f"sqlite:///{directory}/export_small.db"
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("HASH_POOL_SIZE", "0")
+
+    from benchmarks.seed import seed_database
+    from crud.workout_streaks import backfill_workout_streak_runs
+    t0 = time.perf_counter()
+    user_ids = seed_database(url, args.users, args.days)
+    seed_database(small_url, args.users // 4, args.days, seed=1)
+    # The app builds the streak runs on startup; the small database never starts it
+    small_engine = create_engine(small_url)
+    with small_engine.begin() as conn:
+        backfill_workout_streak_runs(conn)
+    small_engine.dispose()
+    print(f"seeded {args.users:,} and {args.users // 4:,} users x {args.days} days in {time.perf_counter() - t0:.1f}s")
+
+    failures = asyncio.run(check_routes(url, user_ids[0]))
+
+    large = asyncio.run(measure(url, traced=True))
+    small = asyncio.run(measure(small_url, traced=True))
+    rows, seconds, _ = asyncio.run(measure(url))
+    for label, database, (exported, _, peak) in (("all users", url, large), ("quarter", small_url, small)):
+        total = sum(expected_counts(database).values())
+        if exported != total:
+            print(f"MISMATCH   {label} export: {exported:,} rows, {total:,} expected")
+            failures.append(label)
+        print(f"{label:10s} {exported:9,} rows, peak {peak / 1024:8.0f} KiB")
+    print(f"throughput: {rows / seconds:,.0f} rows/s ({seconds:.2f}s untraced)")
+    if large[2] > small[2] * args.max_ratio:
+        print(f"MEMORY     export peaked at {large[2] / small[2]:.1f}x for {large[0] / small[0]:.1f}x the rows")
+        failures.append("memory")
+
+    if failures:
+        print(f"FAIL: {', '.join(failures)}")
+        raise SystemExit(1)
+    print(f"OK: exports match history; peak memory {large[2] / small[2]:.2f}x for {large[0] / small[0]:.1f}x the rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Deep pagination of /activity/history and /user/workout-history: walks
+every page of one user's seeded history through the app with keyset
+cursors, checks the pages add up to the full history with no row
+skipped or repeated, and compares first- and last-page latency with
+the same pages read by LIMIT/OFFSET.
+
+    python -m benchmarks.bench_history_pages --users 50 --days 3000
+
+Keyset pages cost one index range scan wherever they start; OFFSET
+pages walk and discard every row before them, so the deepest page is
+the slowest. The run fails when the last keyset page is more than
+--max-ratio times slower than the first.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+
+# (route, table, date column)
+HISTORIES = [
+    ("/activity/history", "daily_activity", "activity_date"),
+    ("/user/workout-history", "workout_completions", "completion_date"),
+]
+
+
+def median_us(samples):
+    return statistics.median(samples) * 1e6
+
+
+async def walk(client, path, auth, limit):
+    """Every page of ``path``; returns (item ids, per-page seconds)."""
+    ids, timings, cursor = [], [], None
+    while True:
+        url = f"{path}?limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+        start = time.perf_counter()
+        status, body = await client.request("GET", url, None, auth)
+        timings.append(time.perf_counter() - start)
+        assert status == 200, (url, status, body)
+        page = json.loads(body)
+        ids.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids, timings
+
+
+def offset_pages(url, table, column, user_id, limit, total, repeat):
+    """Median seconds for the first and last OFFSET page."""
+    engine = create_engine(url)
+    query = text(
+        f"SELECT id, {column} FROM {table} WHERE user_id = :user_id "
+        f"ORDER BY {column} DESC LIMIT :limit OFFSET :offset"
+    )
+    results = []
+    with engine.connect() as conn:
+        for offset in (0, max(total - limit, 0)):
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                conn.execute(query, {"user_id": user_id, "limit": limit, "offset": offset}).all()
+                samples.append(time.perf_counter() - start)
+            results.append(samples)
+    engine.dispose()
+    return results
+
+
+async def run(url, user_id, limit, repeat, max_ratio):
+    from benchmarks.common import ASGIClient
+    from benchmarks.seed import SEED_PASSWORD, seed_email
+    from main import app
+
+    engine = create_engine(url)
+    failures = []
+    async with ASGIClient(app) as client:
+        status, data = await client.request("POST", "/auth/login", {"email": seed_email(0), "password": SEED_PASSWORD})
+        assert status == 200, data
+        auth = {"Authorization": f"Bearer {json.loads(data)['access_token']}"}
+
+        status, _ = await client.request("GET", "/activity/history?cursor=not-a-cursor", None, auth)
+        if status != 400:
+            print(f"BAD CURSOR accepted: {status}")
+            failures.append("cursor")
+
+        print(f"{'route':24s} {'rows':>6s} {'pages':>6s} {'first us':>9s} {'last us':>9s} "
+              f"{'offset first':>13s} {'offset last':>12s}")
+        for path, table, column in HISTORIES:
+            with engine.connect() as conn:
+                expected = list(conn.scalars(
+                    text(f"SELECT id FROM {table} WHERE user_id = :user_id ORDER BY {column} DESC"),
+                    {"user_id": user_id}
+                ))
+
+            first, last = [], []
+            for _ in range(repeat):
+                ids, timings = await walk(client, path, auth, limit)
+                first.append(timings[0])
+                last.append(timings[-1])
+            if ids != expected:
+                print(f"MISMATCH   {path}: {len(ids)} ids paged, {len(expected)} expected")
+                failures.append(path)
+
+            offset_first, offset_last = offset_pages(url, table, column, user_id, limit, len(expected), repeat)
+            print(
+                f"{path:24s} {len(expected):6d} {len(timings):6d} {median_us(first):9.1f} {median_us(last):9.1f} "
+                f"{median_us(offset_first):13.1f} {median_us(offset_last):12.1f}"
+            )
+            ratio = statistics.median(last) / statistics.median(first)
+            if ratio > max_ratio:
+                print(f"DEEP PAGE  {path}: last page {ratio:.1f}x the first")
+                failures.append(path)
+    engine.dispose()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--days", type=int, default=3000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-ratio", type=float, default=2.0)
+    args = parser.parse_args()
+
+    url = f"sqlite:///{tempfile.mkdtemp()}/history.db"
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("HASH_POOL_SIZE", "0")
+
+    from benchmarks.seed import seed_database
+    t0 = time.perf_counter()
+    user_ids = seed_database(url, args.users, args.days)
+    print(f"seeded {args.users:,} users x {args.days} days in {time.perf_counter() - t0:.1f}s")
+
+    failures = asyncio.run(run(url, user_ids[0], args.limit, args.repeat, args.max_ratio))
+    if failures:
+        print(f"FAIL: {', '.join(failures)}")
+        raise SystemExit(1)
+    print(f"OK: every row paged exactly once; deep keyset pages within {args.max_ratio}x of the first")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Latency of /health and /user/dashboard-summary while /auth/login is
+being hammered, e.g. after a deploy logs everyone out.
+
+    python -m benchmarks.bench_login_storm --storm-clients 64 --duration 15
+    HASH_POOL_SIZE=0 python -m benchmarks.bench_login_storm   # inline hashing
+
+The server runs as a uvicorn subprocess against a throwaway SQLite
+database and inherits this process's environment (HASH_POOL_SIZE,
+HASH_MAX_PENDING, ARGON2_* ...).
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from benchmarks.common import free_port, percentile, request, start_server, stop_server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--storm-clients", type=int, default=32)
+    parser.add_argument("--probe-clients", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    port = free_port()
+    tmp = tempfile.mkdtemp()
+    proc = start_server(port, f"sqlite:///{tmp}/bench.db")
+
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        accounts = []
+        for i in range(args.users):
+            creds = {"email": f"storm{i}@bench.io", "password": "hunter22"}
+            status, data, _ = request(conn, "POST", "/auth/register", {**creds, "username": f"storm{i}"})
+            assert status == 200, data
+            accounts.append((creds, json.loads(data)["access_token"]))
+
+        stop = threading.Event()
+        login_status = Counter()
+        probes = {"/health": [], "/user/dashboard-summary": []}
+        lock = threading.Lock()
+
+        def storm(n):
+            c = http.client.HTTPConnection("127.0.0.1", port)
+            creds = accounts[n % len(accounts)][0]
+            while not stop.is_set():
+                status, _, _ = request(c, "POST", "/auth/login", creds)
+                with lock:
+                    login_status[status] += 1
+
+        def probe(n):
+            c = http.client.HTTPConnection("127.0.0.1", port)
+            auth = {"Authorization": f"Bearer {accounts[n % len(accounts)][1]}"}
+            while not stop.is_set():
+                for path in probes:
+                    status, data, elapsed = request(c, "GET", path, headers=auth)
+                    assert status == 200, data
+                    with lock:
+                        probes[path].append(elapsed)
+
+        threads = [threading.Thread(target=storm, args=(i,)) for i in range(args.storm_clients)]
+        threads += [threading.Thread(target=probe, args=(i,)) for i in range(args.probe_clients)]
+        for t in threads:
+            t.start()
+        time.sleep(args.duration)
+        stop.set()
+        for t in threads:
+            t.join()
+    finally:
+        stop_server(proc)
+
+    print(f"HASH_POOL_SIZE={os.getenv('HASH_POOL_SIZE', 'default')} "
+          f"storm_clients={args.storm_clients} duration={args.duration}s")
+    print("login responses: " + ", ".join(f"{k}={v}" for k, v in sorted(login_status.items())))
+    for path, samples in probes.items():
+        print(
+            f"{path:28s} n={len(samples):6d} "
+            f"p50={statistics.median(samples) * 1000:8.1f}ms "
+            f"p99={percentile(samples, 99) * 1000:8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Per-request cost of the metrics layer: MetricsMiddleware around a bare
+ASGI app (so the baseline is a few microseconds and the difference is
+the middleware itself), and the engine hooks around a SQLite
+statement, each measured with and without instrumentation. The two
+variants run in alternating short batches and each keeps its fastest
+batch, so noise from other processes does not land on one side only.
+
+    python -m benchmarks.bench_metrics_overhead --batches 2000
+
+The budget is for a whole request: the middleware plus the statement
+hooks for --statements statements (2, the median of the pinned route
+budgets), and defaults to the required "a few microseconds".
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import create_engine, text
+
+from utils.instrumentation import MetricsMiddleware, QueryStats, _active, instrument_engine
+
+
+class _Route:
+    path = "/ping/{item}"
+
+
+async def bare_app(scope, receive, send):
+    # What the router leaves behind for the middleware to label with
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def time_requests(apps: dict, batches: int, batch: int) -> dict:
+    """Fastest per-request seconds for each app, batches interleaved."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/ping/7", "raw_path": b"/ping/7",
+        "root_path": "", "query_string": b"", "headers": [],
+        "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    best = {}
+    for _ in range(batches):
+        for key, app in apps.items():
+            start = time.perf_counter()
+            for _ in range(batch):
+                await app(dict(scope), receive, send)
+            best[key] = min(best.get(key, float("inf")), (time.perf_counter() - start) / batch)
+    return best
+
+
+def time_queries(batches: int, batch: int) -> dict:
+    """Fastest per-statement seconds with and without the hooks."""
+    engines = {False: create_engine("sqlite://"), True: create_engine("sqlite://")}
+    instrument_engine(engines[True])
+    conns = {key: engine.connect() for key, engine in engines.items()}
+    stmt = text("SELECT 1")
+    # Counted as inside a request, the way the app runs them
+    token = _active.set((QueryStats(),))
+    best = {}
+    try:
+        for _ in range(batches):
+            for key, conn in conns.items():
+                start = time.perf_counter()
+                for _ in range(batch):
+                    conn.execute(stmt)
+                best[key] = min(best.get(key, float("inf")), (time.perf_counter() - start) / batch)
+    finally:
+        _active.reset(token)
+        for conn in conns.values():
+            conn.close()
+        for engine in engines.values():
+            engine.dispose()
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batches", type=int, default=1000)
+    parser.add_argument("--batch", type=int, default=200)
+    parser.add_argument("--statements", type=int, default=2)
+    parser.add_argument("--budget-us", type=float, default=5.0)
+    args = parser.parse_args()
+
+    apps = {False: bare_app, True: MetricsMiddleware(bare_app)}
+    best = asyncio.run(time_requests(apps, args.batches, args.batch))
+    base, timed = best[False], best[True]
+    request_delta = (timed - base) * 1e6
+    print(f"request: {base * 1e6:7.1f}us plain, {timed * 1e6:7.1f}us with middleware")
+
+    best = time_queries(args.batches, args.batch)
+    base, timed = best[False], best[True]
+    query_delta = (timed - base) * 1e6
+    print(f"query:   {base * 1e6:7.1f}us plain, {timed * 1e6:7.1f}us with hooks")
+
+    total = request_delta + args.statements * query_delta
+    print(f"overhead: {request_delta:.2f}us per request, {query_delta:.2f}us per query")
+    print(f"request with {args.statements} statements: {total:.2f}us")
+    assert total < args.budget_us, f"instrumentation costs {total:.2f}us per request > {args.budget_us}us"
+    print(f"OK: within {args.budget_us}us per request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Drive main:app with a request mix shaped like the frontend against a
+seeded database and report latency percentiles and throughput per
+route.
+
+    python -m benchmarks.bench_mix --users 500 --days 365 --clients 16 --duration 30
+    python -m benchmarks.bench_mix --save-baseline baseline.json
+    python -m benchmarks.bench_mix --baseline baseline.json --threshold 25
+
+With --baseline the run exits non-zero when any route's --metric
+(p95 by default) is more than --threshold percent above the baseline,
+when a route failed more requests than in the baseline, or when a route
+in the baseline had no successful request at all.
+"""
+import argparse
+import http.client
+import json
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import date
+
+from benchmarks.common import free_port, percentile, request, start_server, stop_server
+from benchmarks.seed import SEED_PASSWORD, seed_database, seed_email
+
+# (name, weight, method, path or callable(rng) -> path, needs auth)
+MIX = [
+    ("dashboard-summary", 30, "GET", "/user/dashboard-summary", True),
+    ("profile", 10, "GET", "/auth/profile", True),
+    ("steps", 15, "POST", lambda rng: f"/activity/steps?steps={rng.randrange(15000)}", True),
+    ("leaderboard", 10, "GET", "/user/leaderboard?limit=50", False),
+    ("leaderboard-me", 5, "GET", "/user/leaderboard/me", True),
+    ("streak-calendar", 15, "GET", "/user/streak-calendar", True),
+    ("points-history", 10, "GET", "/user/points-history?bucket=week", True),
+    ("login", 5, "POST", "/auth/login", False),
+]
+METRICS = ("p50", "p95", "p99")
+
+
+def run_mix(port, users, clients, duration):
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def client(n):
+        rng = random.Random(n)
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        creds = {"email": seed_email(n % users), "password": SEED_PASSWORD}
+        status, data, _ = request(conn, "POST", "/auth/login", creds)
+        assert status == 200, data
+        auth = {"Authorization": f"Bearer {json.loads(data)['access_token']}"}
+
+        names, weights = zip(*((m[0], m[1]) for m in MIX))
+        routes = {m[0]: m for m in MIX}
+        while not stop.is_set():
+            name, _, method, path, needs_auth = routes[rng.choices(names, weights)[0]]
+            if callable(path):
+                path = path(rng)
+            body = creds if name == "login" else None
+            status, _, elapsed = request(conn, method, path, body, headers=auth if needs_auth else None)
+            with lock:
+                if status == 200:
+                    samples[name].append(elapsed)
+                else:
+                    errors[name] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    results = {}
+    for name, *_ in MIX:
+        s = samples.get(name, [])
+        results[name] = {
+            "requests": len(s),
+            "errors": errors.get(name, 0),
+            "rps": len(s) / duration,
+            **{m: percentile(s, int(m[1:])) * 1000 for m in METRICS},
+        }
+    return results
+
+
+def report(results):
+    print(f"{'route':20s} {'n':>7s} {'err':>5s} {'req/s':>8s} " + " ".join(f"{m + ' ms':>9s}" for m in METRICS))
+    for name, r in results.items():
+        print(
+            f"{name:20s} {r['requests']:7d} {r['errors']:5d} {r['rps']:8.1f} "
+            + " ".join(f"{r[m]:9.1f}" for m in METRICS)
+        )
+
+
+def compare(results, baseline, metric, threshold) -> list:
+    regressions = []
+    print(f"\n{metric} vs baseline (fail above +{threshold:.0f}%, on new errors or no successes)")
+    for name, r in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:20s} no baseline")
+            continue
+        flags = []
+        if r["requests"] == 0:
+            # Every request failed or none ran; the latency has nothing to say
+            flags.append("NO SUCCESSFUL REQUESTS")
+            line = f"{name:20s} {'-':>9s}"
+        elif base.get(metric):
+            change = (r[metric] - base[metric]) / base[metric] * 100
+            if change > threshold:
+                flags.append("REGRESSION")
+            line = f"{name:20s} {base[metric]:9.1f} -> {r[metric]:9.1f} ms ({change:+6.1f}%)"
+        else:
+            line = f"{name:20s} {'-':>9s} -> {r[metric]:9.1f} ms"
+        if r["errors"] > base.get("errors", 0):
+            flags.append(f"ERRORS {base.get('errors', 0)} -> {r['errors']}")
+        print(" ".join([line, *flags]))
+        if flags:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--database-url", default=None, help="defaults to a fresh SQLite file")
+    parser.add_argument("--skip-seed", action="store_true", help="reuse an already seeded --database-url")
+    parser.add_argument("--save-baseline", default=None)
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--metric", choices=METRICS, default="p95")
+    parser.add_argument("--threshold", type=float, default=25.0, help="allowed slowdown in percent")
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/mix.db"
+    if not args.skip_seed:
+        t0 = time.perf_counter()
+        seed_database(url, args.users, args.days)
+        print(f"seeded {args.users:,} users x {args.days} days in {time.perf_counter() - t0:.1f}s")
+
+    port = free_port()
+    proc = start_server(port, url)
+    try:
+        results = run_mix(port, args.users, args.clients, args.duration)
+    finally:
+        stop_server(proc)
+
+    print(f"clients={args.clients} duration={args.duration}s users={args.users} days={args.days}")
+    report(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({
+                "created": date.today().isoformat(),
+                "config": {k: getattr(args, k) for k in ("users", "days", "clients", "duration")},
+                "routes": results,
+            }, f, indent=2)
+        print(f"baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["routes"], args.metric, args.threshold)
+        if regressions:
+            print(f"FAIL: {', '.join(regressions)} regressed")
+            sys.exit(1)
+        print("OK: no route regressed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Response rendering cost on the largest bodies: FastAPI's default path
+(response_model validation or jsonable_encoder, then the stdlib JSON
+encoder) against orjson via json_response, on the exact content each
+route produces against a seeded database. Also checks that both render
+the same JSON and that large bodies come back gzipped with a weak ETag
+that still revalidates.
+
+    python -m benchmarks.bench_serialization --users 3000 --days 365
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+import time
+
+# (name, path); every route is called as the first seeded user
+ROUTES = [
+    ("leaderboard", "/user/leaderboard?limit=500"),
+    ("leaderboard-me", "/user/leaderboard/me?k=50"),
+    ("points-history", "/user/points-history?bucket=day"),
+    ("streak-calendar", "/user/streak-calendar"),
+    ("dashboard-summary", "/user/dashboard-summary"),
+]
+
+
+async def best_of(rounds, n, fn):
+    # fn may be sync or a coroutine function (serialize_response is async)
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(n):
+            result = fn()
+            if asyncio.iscoroutine(result):
+                await result
+        best = min(best, (time.perf_counter() - start) / n)
+    return best
+
+
+async def run(rounds, n):
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+
+    import routes.user
+    from benchmarks.common import ASGIClient
+    from benchmarks.seed import SEED_PASSWORD, seed_email
+    from main import app
+    from utils.responses import json_response
+
+    fields = {route.path: route.response_field for route in app.routes if hasattr(route, "response_field")}
+    captured = {}
+
+    def capture(content, headers=None, status_code=200):
+        captured["content"] = content
+        return json_response(content, headers=headers, status_code=status_code)
+
+    routes.user.json_response = capture
+    failures = []
+    async with ASGIClient(app) as client:
+        status, data = await client.request("POST", "/auth/login", {"email": seed_email(0), "password": SEED_PASSWORD})
+        assert status == 200, data
+        auth = {"Authorization": f"Bearer {json.loads(data)['access_token']}"}
+
+        print(f"{'route':18s} {'bytes':>8s} {'gzip':>7s} {'default us':>11s} {'orjson us':>10s} {'speedup':>8s}")
+        for name, path in ROUTES:
+            captured.clear()
+            status, body = await client.request("GET", path, None, auth)
+            assert status == 200 and "content" in captured, (path, status)
+            content = captured["content"]
+            field = fields[path.partition("?")[0]]
+
+            async def default_render():
+                value = await serialize_response(field=field, response_content=content)
+                return JSONResponse(value).body
+
+            def orjson_render():
+                return json_response(content).body
+
+            before = await best_of(rounds, n, default_render)
+            after = await best_of(rounds, n, orjson_render)
+
+            if json.loads(await default_render()) != json.loads(orjson_render()):
+                print(f"MISMATCH   {name}: default and orjson bodies differ")
+                failures.append(name)
+            print(
+                f"{name:18s} {len(body):8d} {len(gzip.compress(body)):7d} "
+                f"{before * 1e6:11.1f} {after * 1e6:10.1f} {before / after:7.1f}x"
+            )
+
+        # Large bodies are gzipped; the ETag turns weak but still matches
+        headers = {**auth, "Accept-Encoding": "gzip"}
+        status, body, response_headers = await client.request("GET", ROUTES[0][1], None, headers, with_headers=True)
+        assert status == 200, status
+        if response_headers.get("content-encoding") != "gzip" or not response_headers.get("etag", "").startswith("W/"):
+            print(f"NOT GZIPPED leaderboard: {response_headers}")
+            failures.append("gzip")
+        else:
+            status, _ = await client.request("GET", ROUTES[0][1], None, {**headers, "If-None-Match": response_headers["etag"]})
+            if status != 304:
+                print(f"NOT 304    gzipped leaderboard with its weak ETag: {status}")
+                failures.append("gzip-etag")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    url = f"sqlite:///{tempfile.mkdtemp()}/serialization.db"
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("HASH_POOL_SIZE", "0")
+
+    from benchmarks.seed import seed_database
+    t0 = time.perf_counter()
+    seed_database(url, args.users, args.days)
+    print(f"seeded {args.users:,} users x {args.days} days in {time.perf_counter() - t0:.1f}s")
+
+    failures = asyncio.run(run(args.rounds, args.iterations))
+    if failures:
+        print(f"FAIL: {', '.join(failures)}")
+        raise SystemExit(1)
+    print("OK: identical JSON from both renderers; gzip and weak ETags work")
+
+
+if __name__ == "__main__":
+    main()
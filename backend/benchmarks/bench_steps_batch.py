@@ -0,0 +1,70 @@
+"""
+One 90-day POST /activity/steps/batch call versus 90 single
+POST /activity/steps calls, as a wearable backfill would do today.
+
+    python -m benchmarks.bench_steps_batch --days 90 --rounds 5
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import tempfile
+from datetime import date, timedelta
+
+from benchmarks.common import free_port, request, start_server, stop_server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL") or f"sqlite:///{tempfile.mkdtemp()}/batch.db"
+    env = {"HASH_POOL_SIZE": "0", "ARGON2_MEMORY_COST": "1024", "ARGON2_TIME_COST": "1"}
+
+    port = free_port()
+    proc = start_server(port, database_url, env=env)
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        suffix = random.randrange(10 ** 9)
+        status, data, _ = request(conn, "POST", "/auth/register", {
+            "email": f"watch{suffix}@bench.io",
+            "username": f"watch{suffix}",
+            "password": "hunter22"
+        })
+        assert status == 200, data
+        auth = {"Authorization": f"Bearer {json.loads(data)['access_token']}"}
+
+        today = date.today()
+        singles, batches = [], []
+        for _ in range(args.rounds):
+            total = 0.0
+            for _ in range(args.days):
+                status, data, elapsed = request(
+                    conn, "POST", f"/activity/steps?steps={random.randrange(12000)}", headers=auth
+                )
+                assert status == 200, data
+                total += elapsed
+            singles.append(total)
+
+            entries = [
+                {"date": (today - timedelta(days=d)).isoformat(), "steps": random.randrange(12000)}
+                for d in range(args.days)
+            ]
+            status, data, elapsed = request(conn, "POST", "/activity/steps/batch", {"entries": entries}, headers=auth)
+            assert status == 200, data
+            batches.append(elapsed)
+    finally:
+        stop_server(proc)
+
+    single = statistics.median(singles)
+    batch = statistics.median(batches)
+    print(f"{args.days} single calls: {single * 1000:8.1f}ms")
+    print(f"1 batch call:      {batch * 1000:8.1f}ms  ({single / batch:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Per-request cost of decode_token with and without the verified-token cache.
+Rejection of expired, tampered and refresh tokens is covered by
+tests/test_token_cache.py.
+
+    python -m benchmarks.bench_token_cache
+"""
+import timeit
+
+from utils.security import create_access_token, decode_token, token_cache
+
+ROUNDS = 20000
+
+
+def main():
+    token = create_access_token({"sub": "bench-user"})
+
+    def uncached():
+        token_cache.clear()
+        decode_token(token)
+
+    def cached():
+        decode_token(token)
+
+    decode_token(token)
+    cold = timeit.timeit(uncached, number=ROUNDS) / ROUNDS
+    warm = timeit.timeit(cached, number=ROUNDS) / ROUNDS
+
+    print(f"decode_token uncached: {cold * 1e6:8.2f} us/request")
+    print(f"decode_token cached:   {warm * 1e6:8.2f} us/request")
+    print(f"saving:                {(cold - warm) * 1e6:8.2f} us/request ({cold / warm:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Randomized check of the workout streak engine: completions are saved
+on random days (past ones included) through apply_workout_completion,
+then verify_workout_streaks recomputes everything from history and
+must find no mismatch. Each save must also stay within a fixed
+statement budget however long the user's history is.
+
+    python -m benchmarks.check_streak_engine --users 20 --days 120 --ops 3000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Stats lock, old points read and upsert, at most four engine
+# statements (lookup, two run writes, a re-query), the stats UPDATE
+SAVE_BUDGET = 8
+
+
+async def run(users, days, ops, seed):
+    from sqlalchemy import select
+
+    from benchmarks.seed import DAYS_OF_WEEK, seed_database
+    from crud.stats import apply_workout_completion, ensure_user_stats, lock_user_stats
+    from crud.upsert import upsert
+    from crud.workout_streaks import verify_workout_streaks
+    from database import DATABASE_URL, SessionLocal, engine
+    from models.workout import WorkoutCompletion
+    from utils.instrumentation import QueryBudgetExceeded, query_budget
+
+    user_ids = seed_database(DATABASE_URL, users, days, seed=seed)
+    async with SessionLocal() as db:
+        # Seeding leaves stats empty; the rebuild also writes the runs
+        await ensure_user_stats(db)
+        initial = await verify_workout_streaks(db)
+
+    rng = random.Random(seed)
+    first_day = date.today() - timedelta(days=days)
+    failures = [f"after rebuild: {m}" for m in initial]
+    max_queries = 0
+
+    start = time.perf_counter()
+    async with SessionLocal() as db:
+        for _ in range(ops):
+            user_id = rng.choice(user_ids)
+            # Bias towards few distinct days so runs merge and split often
+            day = first_day + timedelta(days=rng.randrange(days + 1))
+            points = rng.choice([0, 0, 5, 10])
+            try:
+                with query_budget(SAVE_BUDGET, f"save {day}") as stats_counter:
+                    stats = await lock_user_stats(db, user_id)
+                    old_points = await db.scalar(select(WorkoutCompletion.points_awarded).where(
+                        WorkoutCompletion.user_id == user_id,
+                        WorkoutCompletion.completion_date == day
+                    )) or 0
+                    await db.execute(upsert(
+                        db,
+                        WorkoutCompletion,
+                        {
+                            "user_id": user_id,
+                            "completion_date": day,
+                            "day_of_week": DAYS_OF_WEEK[day.weekday()],
+                            "completed_exercises": {},
+                            "points_awarded": points,
+                            "version": 1
+                        },
+                        index_elements=["user_id", "completion_date"],
+                        update_columns=["completed_exercises", "points_awarded"],
+                        increment_columns=["version"]
+                    ))
+                    await apply_workout_completion(db, user_id, day, old_points, points, stats=stats)
+                    await db.commit()
+                max_queries = max(max_queries, stats_counter.queries)
+            except QueryBudgetExceeded as e:
+                failures.append(str(e))
+                await db.rollback()
+    elapsed = time.perf_counter() - start
+
+    async with SessionLocal() as db:
+        for user_id, field, stored, actual in await verify_workout_streaks(db):
+            failures.append(f"{user_id} {field}: stored {stored}, actual {actual}")
+    await engine.dispose()
+    return elapsed, max_queries, failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--ops", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/streaks.db"
+
+    elapsed, max_queries, failures = asyncio.run(run(args.users, args.days, args.ops, args.seed))
+    print(f"{args.ops:,} saves in {elapsed:.1f}s ({args.ops / elapsed:,.0f}/s), at most {max_queries} statements each")
+    for failure in failures[:50]:
+        print(f"FAIL  {failure}")
+    if failures:
+        print(f"FAIL: {len(failures)} problem(s)")
+        sys.exit(1)
+    print("OK: persisted streaks match a full recompute")
+
+
+if __name__ == "__main__":
+    main()
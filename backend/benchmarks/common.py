@@ -0,0 +1,133 @@
+"""
+Helpers shared by the HTTP benchmarks: run uvicorn as a subprocess and
+time requests with keep-alive connections from the standard library,
+or call an ASGI app in-process when the caller needs to share its
+context (e.g. to count queries).
+"""
+import asyncio
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def request(conn, method, path, body=None, headers=None):
+    headers = dict(headers or {})
+    payload = None
+    if body is not None:
+        payload = json.dumps(body)
+        headers["Content-Type"] = "application/json"
+    start = time.perf_counter()
+    conn.request(method, path, body=payload, headers=headers)
+    response = conn.getresponse()
+    data = response.read()
+    return response.status, data, time.perf_counter() - start
+
+
+def percentile(samples, pct):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def start_server(port, database_url, app="main:app", env=None):
+    env = dict(os.environ, DATABASE_URL=database_url, **(env or {}))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app,
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            if request(conn, "GET", "/health")[0] == 200:
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("server did not start")
+
+
+def stop_server(proc):
+    proc.terminate()
+    proc.wait()
+
+
+class ASGIClient:
+    """Minimal in-process ASGI client; requests run in the caller's task."""
+
+    def __init__(self, app):
+        self.app = app
+        self._lifespan = None
+        self._events = None
+
+    async def __aenter__(self):
+        self._events = asyncio.Queue()
+        started = asyncio.get_running_loop().create_future()
+
+        async def send(message):
+            if message["type"] == "lifespan.startup.complete":
+                started.set_result(None)
+            elif message["type"] == "lifespan.startup.failed":
+                started.set_exception(RuntimeError(message.get("message", "startup failed")))
+
+        self._lifespan = asyncio.create_task(
+            self.app({"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}, self._events.get, send)
+        )
+        await self._events.put({"type": "lifespan.startup"})
+        await started
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._events.put({"type": "lifespan.shutdown"})
+        await self._lifespan
+
+    async def request(self, method, path, body=None, headers=None, with_headers=False):
+        path, _, query = path.partition("?")
+        raw_headers = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+        payload = b""
+        if body is not None:
+            payload = json.dumps(body).encode()
+            raw_headers.append((b"content-type", b"application/json"))
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+            "root_path": "", "query_string": query.encode(), "headers": raw_headers,
+            "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80), "state": {},
+        }
+        sent = False
+        response = {"status": None, "body": b"", "headers": {}}
+
+        async def receive():
+            nonlocal sent
+            if sent:
+                # Stay connected until the app stops listening
+                await asyncio.Event().wait()
+            sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = {k.decode(): v.decode() for k, v in message.get("headers", [])}
+            elif message["type"] == "http.response.body":
+                response["body"] += message.get("body", b"")
+
+        await self.app(scope, receive, send)
+        if with_headers:
+            return response["status"], response["body"], response["headers"]
+        return response["status"], response["body"]
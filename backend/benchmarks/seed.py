@@ -0,0 +1,135 @@
+"""
+Fill a database with N users x M days of synthetic history using bulk
+inserts: daily activity with junk intake, workout completions, a
+workout plan and junk limits per user.
+
+    python -m benchmarks.seed --users 1000 --days 365 --database-url sqlite:///./bench.db
+
+Every user is bench<i>@bench.io with password SEED_PASSWORD. The
+user_stats table is left empty; the app rebuilds it on startup.
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, insert
+
+import migrations
+from crud.rollups import backfill_points_rollups
+from models.activity import DailyActivity
+from models.junk import UserJunkLimit
+from models.streak import Streak
+from models.user import User
+from models.workout import WorkoutCompletion, WorkoutPlan
+from utils.points import calculate_points
+from utils.security import pwd_context
+
+SEED_PASSWORD = "hunter22"
+JUNK_LIMITS = {"low": 2, "medium": 1, "high": 1}
+DAYS_OF_WEEK = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+PLAN = {
+    day: {"name": f"Day {i + 1}", "exercises": ["Squats", "Push Ups", "Plank"]}
+    for i, day in enumerate(DAYS_OF_WEEK)
+}
+
+_BATCH = 20000
+
+
+def seed_email(i: int) -> str:
+    return f"bench{i}@bench.io"
+
+
+def seed_database(url: str, users: int, days: int, score: bool = True, seed: int = 0) -> list:
+    """
+    Seed ``url`` and return the new user ids. With score=False every
+    daily_activity row is left at 0 points, as if the rules had changed.
+    """
+    rng = random.Random(seed)
+    engine = create_engine(url)
+    # One hash for everyone; hashing per user would dominate seeding
+    password_hash = pwd_context.hash(SEED_PASSWORD)
+    first_day = date.today() - timedelta(days=days)
+    user_ids = [str(uuid.uuid4()) for _ in range(users)]
+
+    with engine.begin() as conn:
+        migrations.upgrade(conn)
+        conn.execute(insert(User.__table__), [
+            {"id": uid, "email": seed_email(i), "username": f"bench{i}", "password_hash": password_hash}
+            for i, uid in enumerate(user_ids)
+        ])
+        conn.execute(insert(Streak.__table__), [
+            {"user_id": uid, "current_streak": 0, "longest_streak": 0, "last_active_date": None}
+            for uid in user_ids
+        ])
+        conn.execute(insert(WorkoutPlan.__table__), [
+            {"id": str(uuid.uuid4()), "user_id": uid, "plan": PLAN}
+            for uid in user_ids
+        ])
+        conn.execute(insert(UserJunkLimit.__table__), [
+            {"id": str(uuid.uuid4()), "user_id": uid, "junk_type": junk_type, "max_quantity": limit}
+            for uid in user_ids for junk_type, limit in JUNK_LIMITS.items()
+        ])
+
+    with engine.begin() as conn:
+        activity, completions = [], []
+        for uid in user_ids:
+            for d in range(days):
+                day = first_day + timedelta(days=d)
+                steps = rng.randrange(12000)
+                junk_type = rng.choice(list(JUNK_LIMITS)) if rng.random() < 0.3 else None
+                junk_quantity = rng.randrange(4) if junk_type else 0
+                activity.append({
+                    "id": str(uuid.uuid4()),
+                    "user_id": uid,
+                    "activity_date": day,
+                    "steps": steps,
+                    "junk_type": junk_type,
+                    "junk_quantity": junk_quantity,
+                    "points": calculate_points(
+                        steps=steps,
+                        junk_quantity=junk_quantity,
+                        max_allowed=JUNK_LIMITS.get(junk_type, 0)
+                    ) if score else 0,
+                })
+                if rng.random() < 0.6:
+                    completions.append({
+                        "id": str(uuid.uuid4()),
+                        "user_id": uid,
+                        "completion_date": day,
+                        "day_of_week": DAYS_OF_WEEK[day.weekday()],
+                        "completed_exercises": {f"{DAYS_OF_WEEK[day.weekday()]}-0": True},
+                        "points_awarded": rng.choice([0, 5, 10, 20]),
+                    })
+            if len(activity) >= _BATCH:
+                conn.execute(insert(DailyActivity.__table__), activity)
+                activity = []
+            if len(completions) >= _BATCH:
+                conn.execute(insert(WorkoutCompletion.__table__), completions)
+                completions = []
+        if activity:
+            conn.execute(insert(DailyActivity.__table__), activity)
+        if completions:
+            conn.execute(insert(WorkoutCompletion.__table__), completions)
+
+        backfill_points_rollups(conn)
+
+    engine.dispose()
+    return user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--database-url", required=True)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    seed_database(args.database_url, args.users, args.days)
+    print(f"seeded {args.users:,} users x {args.days} days in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+The pre-async request path (sync engine, sync Session, threadpool
+handlers) for /user/dashboard-summary, kept only as a baseline for
+bench_async_vs_sync. Not part of the application.
+"""
+from datetime import date
+
+from fastapi import Depends, FastAPI, Header, HTTPException
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import Session, sessionmaker
+
+from database import DATABASE_URL
+from models.user import User
+from models.workout import WorkoutPlan, WorkoutCompletion
+from utils.security import decode_token
+
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False}
+    if DATABASE_URL.startswith("sqlite")
+    else {}
+)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+app = FastAPI(title="Ritual (sync reference)")
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_current_user(
+    authorization: str = Header(None),
+    db: Session = Depends(get_db)
+) -> User:
+    payload = decode_token(authorization.removeprefix("Bearer ").strip())
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid access token")
+    user = db.query(User).filter(User.id == payload.get("sub")).first()
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    return user
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok"}
+
+
+@app.get("/user/dashboard-summary")
+def get_dashboard_summary(
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    today = date.today()
+    plan_obj = db.query(WorkoutPlan).filter(WorkoutPlan.user_id == user.id).first()
+    completion = db.query(WorkoutCompletion).filter(
+        WorkoutCompletion.user_id == user.id,
+        WorkoutCompletion.completion_date == today
+    ).first()
+    total_points = db.query(func.sum(WorkoutCompletion.points_awarded))\
+        .filter(WorkoutCompletion.user_id == user.id)\
+        .scalar() or 0
+    return {
+        "profile": {
+            "user_id": user.id,
+            "username": user.username,
+            "email": user.email,
+            "avatar_url": user.avatar_url,
+            "bio": user.bio,
+        },
+        "workout_plan": plan_obj.plan if plan_obj else {},
+        "completed_exercises": completion.completed_exercises if completion else {},
+        "points_summary": {
+            "total_points": total_points,
+            "today_points": completion.points_awarded if completion else 0
+        }
+    }
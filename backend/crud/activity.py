@@ -1,26 +1,32 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.activity import DailyActivity
 from models.streak import Streak
 from schemas import ActivityCreate
 from crud.junk import get_max_allowed_junk
+from crud.rollups import apply_rollups
+from crud.stats import apply_activity_points, lock_user_stats
+from crud.upsert import upsert
 from utils.points import calculate_points
 from utils.streaks import update_streak
 
-def log_daily_activity(
-    db: Session,
+async def log_daily_activity(
+    db: AsyncSession,
     user_id,
     data: ActivityCreate
 ):
-    # Prevent duplicate entry
-    existing = db.query(DailyActivity).filter_by(
-        user_id=user_id,
-        activity_date=data.activity_date
-    ).first()
+    """
+    Record one day's activity in a single short transaction. Writers
+    for a user queue on their stats row (a row lock on Postgres, BEGIN
+    IMMEDIATE on SQLite) before anything is read, and a second entry
+    for the same date is refused by the unique (user_id, activity_date)
+    key rather than a pre-read. Nothing is retried: a failed commit
+    may still have been applied, so the error goes to the caller.
+    """
+    stats = await lock_user_stats(db, user_id)
 
-    if existing:
-        raise ValueError("Activity already logged for this date")
-
-    max_allowed = get_max_allowed_junk(
+    # Served from the per-user cache after the first lookup
+    max_allowed = await get_max_allowed_junk(
         db, user_id, data.junk_type
     )
 
@@ -30,24 +36,47 @@ def log_daily_activity(
         max_allowed=max_allowed
     )
 
-    activity = DailyActivity(
-        user_id=user_id,
-        activity_date=data.activity_date,
-        steps=data.steps,
-        junk_type=data.junk_type,
-        junk_quantity=data.junk_quantity,
-        points=points
+    activity = await db.scalar(
+        upsert(
+            db,
+            DailyActivity,
+            {
+                "user_id": user_id,
+                "activity_date": data.activity_date,
+                "steps": data.steps,
+                "junk_type": data.junk_type,
+                "junk_quantity": data.junk_quantity,
+                "points": points
+            },
+            index_elements=["user_id", "activity_date"],
+            update_columns=[]
+        ).returning(DailyActivity)
     )
-    db.add(activity)
 
-    streak = db.query(Streak).filter_by(
-        user_id=user_id
-    ).first()
+    if activity is None:
+        # The row already exists; release the lock before reporting it
+        await db.rollback()
+        raise ValueError("Activity already logged for this date")
+
+    await apply_activity_points(db, user_id, points, stats=stats)
+    await apply_rollups(db, [(user_id, data.activity_date, {
+        "steps": data.steps,
+        "activity_points": points,
+    })])
+
+    streak = await db.scalar(
+        select(Streak).where(Streak.user_id == user_id).with_for_update()
+    )
+    if streak is None:
+        streak = Streak(user_id=user_id, current_streak=0, longest_streak=0)
+        db.add(streak)
 
-    is_active = data.steps >= 5000 or data.junk_quantity <= max_allowed
-    update_streak(streak, data.activity_date, is_active)
+    # Backfilled days never move the streak backwards, as in the
+    # steps batch endpoint
+    if streak.last_active_date is None or data.activity_date > streak.last_active_date:
+        is_active = data.steps >= 5000 or data.junk_quantity <= max_allowed
+        update_streak(streak, data.activity_date, is_active)
 
-    db.commit()
-    db.refresh(activity)
+    await db.commit()
 
     return activity
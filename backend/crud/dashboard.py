@@ -0,0 +1,50 @@
+from datetime import date
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.user_stats import UserStats
+from models.workout import WorkoutCompletion, WorkoutPlan
+
+
+def _subqueries(user_id, today: date, full: bool) -> list:
+    completion_today = and_(
+        WorkoutCompletion.user_id == user_id,
+        WorkoutCompletion.completion_date == today
+    )
+
+    def scalar(name, column, *where):
+        return select(column).where(*where).scalar_subquery().label(name)
+
+    columns = [
+        scalar("plan_version", WorkoutPlan.version, WorkoutPlan.user_id == user_id),
+        scalar("completion_version", WorkoutCompletion.version, completion_today),
+        scalar("total_points", UserStats.workout_points, UserStats.user_id == user_id),
+    ]
+    if full:
+        columns += [
+            scalar("workout_plan", WorkoutPlan.plan, WorkoutPlan.user_id == user_id),
+            scalar("completed_exercises", WorkoutCompletion.completed_exercises, completion_today),
+            scalar("today_points", WorkoutCompletion.points_awarded, completion_today),
+        ]
+    return columns
+
+
+def dashboard_query(user_id, today: date, full: bool = True):
+    """
+    Plan, today's completion and the running total as scalar subqueries
+    of one FROM-less SELECT: a single round trip that still returns a
+    row (of NULLs) when the user has none of them. With full=False only
+    the version stamps are read, for ETag checks.
+    """
+    return select(*_subqueries(user_id, today, full))
+
+
+async def get_dashboard_data(db: AsyncSession, user_id, today: date, full: bool = True):
+    return (await db.execute(dashboard_query(user_id, today, full))).one()
+
+
+def dashboard_version(user, today: date, data) -> tuple:
+    # Everything the summary depends on; the profile comes from the user
+    return (
+        user.id, user.username, user.email, user.avatar_url, user.bio, today,
+        data.plan_version, data.completion_version, data.total_points
+    )
@@ -0,0 +1,122 @@
+"""
+Full-history export as NDJSON or CSV, for one user or everyone. Every
+table is read through a streaming cursor, yield_per rows at a time, and
+each batch is encoded and handed on before the next is fetched, so
+memory stays flat however long the history is.
+
+Every record carries its kind in "record": activity, workout, plan,
+activity_streak and workout_streak_run. CSV puts all kinds under one
+header (EXPORT_COLUMNS) and leaves the columns a kind lacks empty;
+plan and completed_exercises are JSON strings there.
+"""
+import csv
+import io
+import os
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.activity import DailyActivity
+from models.streak import Streak, WorkoutStreakRun
+from models.workout import WorkoutCompletion, WorkoutPlan
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+# Rows fetched and encoded per batch
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# (record, user column, order column, {field: column}); ordered by the
+# (user_id, date) indexes so each table is one index walk
+_SOURCES = [
+    ("activity", DailyActivity.user_id, DailyActivity.activity_date, {
+        "date": DailyActivity.activity_date,
+        "steps": DailyActivity.steps,
+        "junk_type": DailyActivity.junk_type,
+        "junk_quantity": DailyActivity.junk_quantity,
+        "points": DailyActivity.points,
+    }),
+    ("workout", WorkoutCompletion.user_id, WorkoutCompletion.completion_date, {
+        "date": WorkoutCompletion.completion_date,
+        "day_of_week": WorkoutCompletion.day_of_week,
+        "completed_exercises": WorkoutCompletion.completed_exercises,
+        "points": WorkoutCompletion.points_awarded,
+    }),
+    ("plan", WorkoutPlan.user_id, None, {
+        "plan": WorkoutPlan.plan,
+    }),
+    ("activity_streak", Streak.user_id, None, {
+        "current_streak": Streak.current_streak,
+        "longest_streak": Streak.longest_streak,
+        "last_active_date": Streak.last_active_date,
+    }),
+    ("workout_streak_run", WorkoutStreakRun.user_id, WorkoutStreakRun.start_date, {
+        "date": WorkoutStreakRun.start_date,
+        "end_date": WorkoutStreakRun.end_date,
+        "length": WorkoutStreakRun.length,
+    }),
+]
+
+EXPORT_COLUMNS = ["record", "user_id"] + list(dict.fromkeys(
+    field for _, _, _, fields in _SOURCES for field in fields
+))
+_JSON_FIELDS = {"plan", "completed_exercises"}
+
+
+async def _batches(db: AsyncSession, user_id=None):
+    """(record, field names, rows) per fetched batch, table by table."""
+    for record, user_column, order_column, fields in _SOURCES:
+        query = select(user_column, *fields.values())
+        if user_id is not None:
+            query = query.where(user_column == user_id)
+        query = query.order_by(user_column, *([order_column] if order_column is not None else []))
+        names = ("record", "user_id", *fields)
+
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield record, names, rows
+
+
+def _encode_ndjson(record, names, rows) -> bytes:
+    return b"".join(
+        orjson.dumps(dict(zip(names, (record, *row))), option=orjson.OPT_APPEND_NEWLINE)
+        for row in rows
+    )
+
+
+def _drain(buffer: io.StringIO) -> bytes:
+    chunk = buffer.getvalue().encode()
+    buffer.seek(0)
+    buffer.truncate()
+    return chunk
+
+
+def _encode_csv(record, names, rows, buffer: io.StringIO, writer) -> bytes:
+    positions = [EXPORT_COLUMNS.index(name) for name in names]
+    json_positions = [i for i, name in enumerate(names) if name in _JSON_FIELDS]
+    for row in rows:
+        values = [record, *row]
+        for i in json_positions:
+            values[i] = orjson.dumps(values[i]).decode()
+        line = [""] * len(EXPORT_COLUMNS)
+        for position, value in zip(positions, values):
+            line[position] = "" if value is None else value
+        writer.writerow(line)
+    return _drain(buffer)
+
+
+async def stream_export(db: AsyncSession, fmt: str, user_id=None):
+    """
+    Encoded chunks of the export, one per fetched batch; the whole
+    database when user_id is None. Pass a session that stays open until
+    the generator is exhausted.
+    """
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        yield _drain(buffer)
+        async for record, names, rows in _batches(db, user_id):
+            yield _encode_csv(record, names, rows, buffer, writer)
+    else:
+        async for record, names, rows in _batches(db, user_id):
+            yield _encode_ndjson(record, names, rows)
@@ -0,0 +1,54 @@
+"""
+Keyset-paginated history, newest first. A user has at most one row per
+date (unique (user_id, date) indexes), so the date alone is a total
+order and each page is one range scan of that index: latency does not
+grow with depth the way OFFSET does.
+"""
+from datetime import date
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.activity import DailyActivity
+from models.workout import WorkoutCompletion
+
+
+async def _page(db: AsyncSession, date_column, columns, user_column, user_id,
+                limit: int, start: date | None, end: date | None, before: date | None):
+    query = select(date_column, *columns).where(user_column == user_id)
+    if start is not None:
+        query = query.where(date_column >= start)
+    if end is not None:
+        query = query.where(date_column <= end)
+    if before is not None:
+        query = query.where(date_column < before)
+
+    # One extra row tells whether another page follows
+    rows = (await db.execute(
+        query.order_by(date_column.desc()).limit(limit + 1)
+    )).all()
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1][0]
+    return rows, None
+
+
+async def get_activity_history(db: AsyncSession, user_id, limit: int,
+                               start: date | None = None, end: date | None = None,
+                               before: date | None = None):
+    """(rows, last date when more pages follow) of daily activity."""
+    return await _page(
+        db,
+        DailyActivity.activity_date,
+        (DailyActivity.id, DailyActivity.steps, DailyActivity.junk_type, DailyActivity.junk_quantity, DailyActivity.points),
+        DailyActivity.user_id, user_id, limit, start, end, before
+    )
+
+
+async def get_workout_history(db: AsyncSession, user_id, limit: int,
+                              start: date | None = None, end: date | None = None,
+                              before: date | None = None):
+    """(rows, last date when more pages follow) of workout completions."""
+    return await _page(
+        db,
+        WorkoutCompletion.completion_date,
+        (WorkoutCompletion.id, WorkoutCompletion.day_of_week, WorkoutCompletion.completed_exercises, WorkoutCompletion.points_awarded),
+        WorkoutCompletion.user_id, user_id, limit, start, end, before
+    )
@@ -1,17 +1,110 @@
-from sqlalchemy.orm import Session
+import os
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.junk import UserJunkLimit
+from models.user_stats import UserStats
+from crud.upsert import upsert
+from utils.cache import TTLCache
 
-def get_max_allowed_junk(
-    db: Session,
+# Written on a user's first GET /activity/junk-limits
+DEFAULT_JUNK_LIMITS = {"low": 2, "medium": 1, "high": 1}
+
+# user id -> (junk_limits_version, {junk_type: max_quantity}). Edits in
+# this process invalidate their entry; the TTL bounds how long another
+# worker's edit can go unseen
+junk_limits_cache = TTLCache(
+    maxsize=int(os.getenv("JUNK_LIMIT_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("JUNK_LIMIT_CACHE_TTL_SECONDS", "30"))
+)
+
+
+async def get_junk_limits(db: AsyncSession, user_id) -> tuple:
+    """(version, {junk_type: max_quantity}) for the user, cached."""
+    cached = junk_limits_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    # One query: the version stamp with every limit row
+    rows = (await db.execute(
+        select(
+            UserStats.junk_limits_version,
+            UserJunkLimit.junk_type,
+            UserJunkLimit.max_quantity
+        )
+        .select_from(UserStats)
+        .outerjoin(UserJunkLimit, UserJunkLimit.user_id == UserStats.user_id)
+        .where(UserStats.user_id == user_id)
+    )).all()
+    version = rows[0][0] if rows else None
+    limits = {
+        junk_type: max_quantity
+        for _, junk_type, max_quantity in rows
+        if junk_type is not None
+    }
+
+    junk_limits_cache.set(user_id, (version, limits))
+    return version, limits
+
+
+async def get_max_allowed_junk(
+    db: AsyncSession,
     user_id,
     junk_type: str | None
 ) -> int:
     if not junk_type:
         return 0
 
-    limit = db.query(UserJunkLimit).filter_by(
-        user_id=user_id,
-        junk_type=junk_type
-    ).first()
+    _, limits = await get_junk_limits(db, user_id)
+    return limits.get(junk_type, 0)
+
+
+async def create_default_junk_limits(db: AsyncSession, user_id):
+    # A concurrent first read may have written them already
+    await db.execute(upsert(
+        db,
+        UserJunkLimit,
+        [
+            {"user_id": user_id, "junk_type": junk_type, "max_quantity": max_quantity}
+            for junk_type, max_quantity in DEFAULT_JUNK_LIMITS.items()
+        ],
+        index_elements=["user_id", "junk_type"],
+        update_columns=[]
+    ))
+    await db.commit()
+    junk_limits_cache.invalidate(user_id)
+
+
+async def replace_junk_limits(db: AsyncSession, user_id, limits: dict) -> int:
+    """
+    Replace the user's whole set of limits in one transaction and
+    return the new version stamp. Commits.
+    """
+    # Bumping the version locks the stats row, as lock_user_stats would,
+    # so it also queues this behind the user's other writes
+    version = await db.scalar(
+        update(UserStats)
+        .where(UserStats.user_id == user_id)
+        .values(junk_limits_version=UserStats.junk_limits_version + 1)
+        .returning(UserStats.junk_limits_version),
+        execution_options={"synchronize_session": False}
+    )
+
+    await db.execute(delete(UserJunkLimit).where(
+        UserJunkLimit.user_id == user_id,
+        UserJunkLimit.junk_type.not_in(list(limits))
+    ))
+    await db.execute(upsert(
+        db,
+        UserJunkLimit,
+        [
+            {"user_id": user_id, "junk_type": junk_type, "max_quantity": max_quantity}
+            for junk_type, max_quantity in limits.items()
+        ],
+        index_elements=["user_id", "junk_type"],
+        update_columns=["max_quantity"]
+    ))
 
-    return limit.max_quantity if limit else 0
+    await db.commit()
+    # Only committed limits reach the cache
+    junk_limits_cache.invalidate(user_id)
+    return version
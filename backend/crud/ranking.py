@@ -0,0 +1,160 @@
+import asyncio
+import os
+import time
+import uuid
+from datetime import date
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.rollup import PointsRollup
+from models.user import User
+from models.user_stats import UserStats
+from crud.rollups import bucket_start
+from utils.rank_index import RankIndex
+
+# Full reload interval; picks up writes made by other worker processes
+RANK_INDEX_REFRESH_SECONDS = float(os.getenv("RANK_INDEX_REFRESH_SECONDS", "300"))
+
+WINDOWS = ("all", "week", "month")
+
+rank_indexes = {window: RankIndex() for window in WINDOWS}
+_reload_lock = asyncio.Lock()
+# Index versions are per process; this keeps two workers' ETags apart
+_process_token = uuid.uuid4().hex
+
+
+def _window_start(window: str, today: date):
+    return None if window == "all" else bucket_start(today, window)
+
+
+def _window_points_query(window: str, start):
+    if window == "all":
+        query = select(UserStats.user_id, UserStats.workout_points)
+    else:
+        # Every user, with this week's or month's workout points or 0
+        query = select(
+            UserStats.user_id,
+            func.coalesce(PointsRollup.workout_points, 0)
+        ).outerjoin(PointsRollup, and_(
+            PointsRollup.user_id == UserStats.user_id,
+            PointsRollup.bucket == window,
+            PointsRollup.bucket_start == start
+        ))
+    return query
+
+
+async def load_rank_index(db: AsyncSession, window: str) -> RankIndex:
+    start = _window_start(window, date.today())
+    query = _window_points_query(window, start)
+
+    index = rank_indexes[window]
+    index.track_changes()
+    index.replace(dict((await db.execute(query)).all()), tag=start)
+    # A save recorded while the query ran may or may not be in its
+    # snapshot, and its delta went to the scores just replaced; read
+    # those users again until no more arrive
+    while changed := index.take_changes():
+        index.update(dict((await db.execute(
+            query.where(UserStats.user_id.in_(changed))
+        )).all()))
+    return index
+
+
+async def get_rank_index(db: AsyncSession, window: str) -> RankIndex:
+    """
+    The window's index, reloaded from the database when it has never
+    been loaded, its week or month has rolled over, or it is older
+    than RANK_INDEX_REFRESH_SECONDS.
+    """
+    index = rank_indexes[window]
+
+    def stale():
+        return (
+            index.loaded_at is None
+            or index.tag != _window_start(window, date.today())
+            or time.monotonic() - index.loaded_at > RANK_INDEX_REFRESH_SECONDS
+        )
+
+    if stale():
+        async with _reload_lock:
+            if stale():
+                await load_rank_index(db, window)
+    return index
+
+
+def record_workout_points(user_id, completion_date: date, delta: int):
+    """
+    Apply a committed workout points change to every loaded index whose
+    window contains completion_date. Deltas commute, so concurrent
+    saves may land in any order.
+    """
+    if not delta:
+        return
+    for window, index in rank_indexes.items():
+        if index.loaded_at is None:
+            continue
+        if index.tag != _window_start(window, completion_date):
+            # A reload for the new week or month may have missed it
+            index.note_change(user_id)
+            continue
+        index.add(user_id, delta)
+
+
+def record_new_user(user_id):
+    """List a just-registered user, with no points, on every loaded index."""
+    for index in rank_indexes.values():
+        if index.loaded_at is not None:
+            index.setdefault(user_id, 0)
+
+
+async def get_window_points(db: AsyncSession, user_id, window: str, index: RankIndex) -> int:
+    """The user's points for the window the index was loaded for."""
+    if window == "all":
+        points = await db.scalar(select(UserStats.workout_points).where(UserStats.user_id == user_id))
+    else:
+        points = await db.scalar(select(PointsRollup.workout_points).where(
+            PointsRollup.user_id == user_id,
+            PointsRollup.bucket == window,
+            PointsRollup.bucket_start == index.tag
+        ))
+    return points or 0
+
+
+def touch_rank_indexes():
+    """Mark every leaderboard page changed, e.g. after a profile edit."""
+    for index in rank_indexes.values():
+        index.touch()
+
+
+def leaderboard_version(index: RankIndex, *params) -> tuple:
+    # Everything a leaderboard page depends on, for its ETag
+    return (_process_token, index.tag, index.version, *params)
+
+
+async def get_ranked_users(db: AsyncSession, entries) -> list:
+    """Attach profile fields to (rank, user_id, points) index entries."""
+    result = await db.execute(
+        select(
+            User.id,
+            User.username,
+            User.avatar_url,
+            UserStats.longest_workout_streak
+        )
+        .join(UserStats, UserStats.user_id == User.id)
+        .where(User.id.in_([user_id for _, user_id, _ in entries]))
+    )
+    profiles = {user_id: rest for user_id, *rest in result}
+
+    ranked = []
+    for rank, user_id, points in entries:
+        if user_id not in profiles:
+            continue
+        username, avatar_url, highest_streak = profiles[user_id]
+        ranked.append({
+            "rank": rank,
+            "user_id": user_id,
+            "username": username,
+            "avatar_url": avatar_url,
+            "points": points,
+            "highest_streak": highest_streak or 0
+        })
+    return ranked
@@ -0,0 +1,132 @@
+import time
+
+import numpy as np
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from crud.rollups import apply_rollups
+from models.activity import DailyActivity
+from models.junk import UserJunkLimit
+from models.user_stats import UserStats
+from utils.points import calculate_points
+from utils.points_vectorized import calculate_points_array
+
+_update_points = (
+    update(DailyActivity.__table__)
+    .where(DailyActivity.__table__.c.id == bindparam("row_id"))
+    .values(points=bindparam("new_points"))
+)
+
+_shift_activity_points = (
+    update(UserStats.__table__)
+    .where(UserStats.__table__.c.user_id == bindparam("stats_user_id"))
+    .values(activity_points=UserStats.__table__.c.activity_points + bindparam("delta"))
+)
+
+
+async def load_junk_limits(db: AsyncSession) -> dict:
+    rows = await db.execute(select(
+        UserJunkLimit.user_id,
+        UserJunkLimit.junk_type,
+        UserJunkLimit.max_quantity
+    ))
+    return {(user_id, junk_type): max_quantity for user_id, junk_type, max_quantity in rows}
+
+
+async def rescore_daily_activity(
+    db: AsyncSession,
+    chunk_size: int = 50000,
+    dry_run: bool = False,
+    verify: bool = False,
+    progress=None
+) -> dict:
+    """
+    Recompute DailyActivity.points for every row with the current rules.
+
+    Rows are read in primary-key order, chunk_size at a time (keyset, so
+    memory stays bounded and each chunk commits on its own), scored with
+    NumPy and written back with one executemany UPDATE of the rows whose
+    points changed. With verify=True every chunk is also scored by the
+    scalar calculate_points and must match exactly. The users' running
+    activity_points totals and points rollups move by the same amounts
+    in the same commit.
+    """
+    limits = await load_junk_limits(db)
+    scanned = changed = 0
+    last_id = None
+    started = time.perf_counter()
+
+    while True:
+        query = select(
+            DailyActivity.id,
+            DailyActivity.user_id,
+            DailyActivity.activity_date,
+            DailyActivity.steps,
+            DailyActivity.junk_type,
+            DailyActivity.junk_quantity,
+            DailyActivity.points
+        ).order_by(DailyActivity.id).limit(chunk_size)
+        if last_id is not None:
+            query = query.where(DailyActivity.id > last_id)
+
+        rows = (await db.execute(query)).all()
+        if not rows:
+            break
+
+        ids, user_ids, dates, steps, junk_types, junk_quantities, points = zip(*rows)
+        steps = np.fromiter((s or 0 for s in steps), dtype=np.int64, count=len(rows))
+        junk = np.fromiter((q or 0 for q in junk_quantities), dtype=np.int64, count=len(rows))
+        old_points = np.fromiter((p or 0 for p in points), dtype=np.int64, count=len(rows))
+        # Same lookup as crud.junk.get_max_allowed_junk, from the preloaded table
+        max_allowed = np.fromiter(
+            (limits.get((u, t), 0) if t else 0 for u, t in zip(user_ids, junk_types)),
+            dtype=np.int64,
+            count=len(rows)
+        )
+
+        new_points = calculate_points_array(steps, junk, max_allowed)
+
+        if verify:
+            expected = [
+                calculate_points(steps=int(s), junk_quantity=int(q), max_allowed=int(m))
+                for s, q, m in zip(steps, junk, max_allowed)
+            ]
+            mismatches = np.flatnonzero(new_points != np.array(expected, dtype=np.int64))
+            if mismatches.size:
+                i = int(mismatches[0])
+                raise AssertionError(
+                    f"vectorized score {new_points[i]} != scalar {expected[i]} for row {ids[i]}"
+                )
+
+        dirty = np.flatnonzero(new_points != old_points)
+        if dirty.size and not dry_run:
+            await db.execute(_update_points, [
+                {"row_id": ids[i], "new_points": int(new_points[i])}
+                for i in dirty
+            ])
+            deltas = {}
+            for i in dirty:
+                deltas[user_ids[i]] = deltas.get(user_ids[i], 0) + int(new_points[i] - old_points[i])
+            shifts = [
+                {"stats_user_id": uid, "delta": delta}
+                for uid, delta in deltas.items() if delta
+            ]
+            if shifts:
+                await db.execute(_shift_activity_points, shifts)
+            await apply_rollups(db, [
+                (user_ids[i], dates[i], {"activity_points": int(new_points[i] - old_points[i])})
+                for i in dirty
+            ])
+        await db.commit()
+
+        scanned += len(rows)
+        changed += int(dirty.size)
+        last_id = ids[-1]
+        if progress:
+            progress(scanned, changed)
+
+    return {
+        "scanned": scanned,
+        "changed": changed,
+        "seconds": time.perf_counter() - started,
+    }
@@ -0,0 +1,187 @@
+from datetime import date, timedelta
+from sqlalchemy import delete, func, insert, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.activity import DailyActivity
+from models.rollup import PointsRollup
+from models.workout import WorkoutCompletion
+from crud.upsert import upsert
+
+BUCKETS = ("day", "week", "month")
+METRICS = ("steps", "activity_points", "workout_points")
+
+
+def bucket_start(d: date, bucket: str) -> date:
+    if bucket == "day":
+        return d
+    if bucket == "week":
+        return d - timedelta(days=d.weekday())
+    if bucket == "month":
+        return d.replace(day=1)
+    raise ValueError(f"Unknown bucket: {bucket}")
+
+
+def rollup_rows(changes) -> list:
+    """
+    Turn (user_id, day, {metric: delta}) changes into one row per
+    (user, bucket, bucket_start), summing changes that share a bucket.
+    """
+    merged = {}
+    for user_id, day, deltas in changes:
+        for bucket in BUCKETS:
+            key = (user_id, bucket, bucket_start(day, bucket))
+            row = merged.get(key)
+            if row is None:
+                row = merged[key] = dict.fromkeys(METRICS, 0)
+            for metric, delta in deltas.items():
+                row[metric] += delta
+
+    return [
+        {"user_id": user_id, "bucket": bucket, "bucket_start": start, **row}
+        for (user_id, bucket, start), row in sorted(merged.items())
+        if any(row.values())
+    ]
+
+
+async def apply_rollups(db: AsyncSession, changes):
+    """
+    Add point and step deltas to every bucket they fall in. Must run in
+    the same transaction as the write that produced them.
+    """
+    rows = rollup_rows(changes)
+    if not rows:
+        return
+    # executemany keeps one cached statement however many buckets change
+    await db.execute(upsert(
+        db,
+        PointsRollup,
+        None,
+        index_elements=["user_id", "bucket", "bucket_start"],
+        update_columns=[],
+        increment_columns=METRICS
+    ), rows)
+
+
+async def apply_steps_rollups(db: AsyncSession, user_id, day: date, steps: int):
+    """
+    Add the change from the stored steps for (user_id, day) to ``steps``
+    to every bucket, reading the stored count inside the statement
+    itself. Run it under lock_user_stats, before the new count is
+    written.
+    """
+    stored = select(DailyActivity.steps).where(
+        DailyActivity.user_id == user_id,
+        DailyActivity.activity_date == day
+    ).scalar_subquery()
+    delta = literal(steps) - func.coalesce(stored, 0)
+    # Unchanged days write nothing, as rollup_rows skips empty deltas
+    rows = union_all(*(
+        select(
+            literal(user_id),
+            literal(bucket),
+            literal(bucket_start(day, bucket)),
+            delta,
+            literal(0),
+            literal(0)
+        ).where(delta != 0)
+        for bucket in BUCKETS
+    ))
+    await db.execute(upsert(
+        db,
+        PointsRollup,
+        None,
+        index_elements=["user_id", "bucket", "bucket_start"],
+        update_columns=[],
+        increment_columns=METRICS
+    ).from_select(["user_id", "bucket", "bucket_start", *METRICS], rows))
+
+
+async def get_points_history(
+    db: AsyncSession,
+    user_id,
+    bucket: str,
+    start: date,
+    end: date
+):
+    result = await db.execute(
+        select(
+            PointsRollup.bucket_start,
+            PointsRollup.steps,
+            PointsRollup.activity_points,
+            PointsRollup.workout_points
+        ).where(
+            PointsRollup.user_id == user_id,
+            PointsRollup.bucket == bucket,
+            PointsRollup.bucket_start >= bucket_start(start, bucket),
+            PointsRollup.bucket_start <= end
+        ).order_by(PointsRollup.bucket_start)
+    )
+    return result.all()
+
+
+def backfill_points_rollups(conn) -> int:
+    """
+    Regenerate points_rollups from daily_activity and workout_completions
+    on a synchronous connection. History is read one user at a time, so
+    memory is bounded by the busiest user. Returns the rows written.
+    """
+    history = union_all(
+        select(
+            DailyActivity.user_id.label("user_id"),
+            DailyActivity.activity_date.label("day"),
+            DailyActivity.steps.label("steps"),
+            DailyActivity.points.label("activity_points"),
+            literal(0).label("workout_points")
+        ),
+        select(
+            WorkoutCompletion.user_id,
+            WorkoutCompletion.completion_date,
+            literal(0),
+            literal(0),
+            WorkoutCompletion.points_awarded
+        )
+    ).subquery()
+
+    conn.execute(delete(PointsRollup))
+    result = conn.execute(
+        select(history)
+        .order_by(history.c.user_id)
+        .execution_options(yield_per=10000)
+    )
+
+    written = 0
+    pending = []
+    changes = []
+    current = None
+
+    def flush_user():
+        nonlocal written
+        pending.extend(rollup_rows(changes))
+        changes.clear()
+        if len(pending) >= 10000:
+            conn.execute(insert(PointsRollup), pending)
+            written += len(pending)
+            pending.clear()
+
+    for user_id, day, steps, activity_points, workout_points in result:
+        if user_id != current:
+            flush_user()
+            current = user_id
+        changes.append((user_id, day, {
+            "steps": steps or 0,
+            "activity_points": activity_points or 0,
+            "workout_points": workout_points or 0,
+        }))
+    flush_user()
+    if pending:
+        conn.execute(insert(PointsRollup), pending)
+        written += len(pending)
+
+    return written
+
+
+async def rebuild_points_rollups(db: AsyncSession) -> int:
+    written = await db.run_sync(
+        lambda session: backfill_points_rollups(session.connection())
+    )
+    await db.commit()
+    return written
@@ -0,0 +1,236 @@
+from datetime import date
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.activity import DailyActivity
+from models.user import User
+from models.user_stats import UserStats
+from models.workout import WorkoutCompletion
+from crud.workout_streaks import backfill_workout_streak_runs, mark_workout_day, summarize_runs
+
+
+async def get_or_create_stats(db: AsyncSession, user_id) -> UserStats:
+    stats = await db.get(UserStats, user_id)
+    if stats is None:
+        stats = UserStats(
+            user_id=user_id,
+            workout_points=0,
+            workout_streak=0,
+            longest_workout_streak=0,
+            last_workout_date=None,
+            workout_active_days=0,
+            workout_active_points=0,
+            activity_points=0,
+            junk_limits_version=0
+        )
+        db.add(stats)
+    return stats
+
+
+async def lock_user_stats(db: AsyncSession, user_id) -> UserStats:
+    """
+    Serialize writers for one user for the rest of the transaction by
+    touching their stats row first: a row lock on Postgres, the database
+    write lock on SQLite. Reads that follow are then race-free.
+    """
+    stats = await db.scalar(
+        update(UserStats)
+        .where(UserStats.user_id == user_id)
+        .values(workout_points=UserStats.workout_points)
+        .returning(UserStats),
+        execution_options={"synchronize_session": False, "populate_existing": True}
+    )
+    if stats is None:
+        stats = await get_or_create_stats(db, user_id)
+    return stats
+
+
+async def apply_workout_completion(
+    db: AsyncSession,
+    user_id,
+    completion_date: date,
+    old_points: int,
+    new_points: int,
+    stats: UserStats | None = None
+) -> UserStats:
+    """
+    Fold a single workout completion write into the user's stats row.
+    Must be called before the surrounding commit so both land together.
+    Pass the row returned by lock_user_stats to avoid reloading it.
+    """
+    if stats is None:
+        stats = await get_or_create_stats(db, user_id)
+    stats.workout_points = (stats.workout_points or 0) + new_points - old_points
+
+    was_active = old_points > 0
+    is_active = new_points > 0
+    stats.workout_active_points = (
+        (stats.workout_active_points or 0)
+        + (new_points if is_active else 0)
+        - (old_points if was_active else 0)
+    )
+    if was_active == is_active:
+        return stats
+
+    stats.workout_active_days = (
+        (stats.workout_active_days or 0) + (1 if is_active else -1)
+    )
+    # Any day, past ones included, may start, extend, merge or split runs
+    await mark_workout_day(db, stats, completion_date, is_active)
+
+    return stats
+
+
+async def apply_activity_points(
+    db: AsyncSession,
+    user_id,
+    delta: int,
+    stats: UserStats | None = None
+) -> UserStats:
+    """
+    Fold a change in the user's daily activity points into their stats
+    row. Callers hold lock_user_stats and read the old points first.
+    """
+    if stats is None:
+        stats = await get_or_create_stats(db, user_id)
+    stats.activity_points = (stats.activity_points or 0) + delta
+    return stats
+
+
+async def rebuild_user_stats(db: AsyncSession) -> int:
+    """
+    Regenerate every user's stats row and workout streak runs from history.
+    Returns the number of rows written.
+    """
+    points_map = {}
+    active_points_map = {}
+    totals = await db.execute(
+        select(
+            WorkoutCompletion.user_id,
+            func.sum(WorkoutCompletion.points_awarded),
+            func.sum(case(
+                (WorkoutCompletion.points_awarded > 0, WorkoutCompletion.points_awarded),
+                else_=0
+            ))
+        ).group_by(WorkoutCompletion.user_id)
+    )
+    for uid, points, active_points in totals:
+        points_map[uid] = points
+        active_points_map[uid] = active_points
+
+    activity_points_map = dict((await db.execute(
+        select(DailyActivity.user_id, func.sum(DailyActivity.points))
+        .group_by(DailyActivity.user_id)
+    )).all())
+
+    # Rewrites the streak runs too; the streak columns come from them
+    streaks = await db.run_sync(
+        lambda session: backfill_workout_streak_runs(session.connection())
+    )
+
+    await db.execute(delete(UserStats))
+
+    user_ids = list(await db.scalars(select(User.id)))
+    if user_ids:
+        await db.execute(insert(UserStats), [
+            {
+                "user_id": uid,
+                "workout_points": points_map.get(uid) or 0,
+                **streaks.get(uid, summarize_runs([])),
+                "workout_active_points": active_points_map.get(uid) or 0,
+                "activity_points": activity_points_map.get(uid) or 0,
+            }
+            for uid in user_ids
+        ])
+    await db.commit()
+
+    return len(user_ids)
+
+
+RECONCILED_COLUMNS = ["workout_points", "workout_active_points", "workout_active_days", "activity_points"]
+
+
+async def _history_totals(db: AsyncSession, user_id=None) -> dict:
+    """{user_id: {column: SUM() over the history tables}}, for one user or all."""
+    workout_query = select(
+        WorkoutCompletion.user_id,
+        func.sum(WorkoutCompletion.points_awarded),
+        func.sum(case(
+            (WorkoutCompletion.points_awarded > 0, WorkoutCompletion.points_awarded),
+            else_=0
+        )),
+        func.sum(case((WorkoutCompletion.points_awarded > 0, 1), else_=0))
+    ).group_by(WorkoutCompletion.user_id)
+    activity_query = select(
+        DailyActivity.user_id, func.sum(DailyActivity.points)
+    ).group_by(DailyActivity.user_id)
+    if user_id is not None:
+        workout_query = workout_query.where(WorkoutCompletion.user_id == user_id)
+        activity_query = activity_query.where(DailyActivity.user_id == user_id)
+
+    actual = {}
+    for uid, points, active_points, active_days in await db.execute(workout_query):
+        actual[uid] = {
+            "workout_points": points or 0,
+            "workout_active_points": active_points or 0,
+            "workout_active_days": active_days or 0,
+        }
+    for uid, points in await db.execute(activity_query):
+        actual.setdefault(uid, {})["activity_points"] = points or 0
+    return actual
+
+
+async def reconcile_user_stats(db: AsyncSession, repair: bool = True) -> list:
+    """
+    Compare every stats row's running totals with SUM()s over the history
+    tables and, with repair=True, overwrite the ones that drifted.
+    Returns one (user_id, column, stored, actual) tuple per difference.
+
+    The first pass reads without locks, so a write landing mid-scan can
+    look like drift. Each suspect is re-checked in its own transaction
+    under lock_user_stats, and only drift that survives is reported and
+    repaired.
+    """
+    actual = await _history_totals(db)
+    stored = await db.stream(
+        select(UserStats.user_id, *(getattr(UserStats, c) for c in RECONCILED_COLUMNS))
+        .execution_options(yield_per=10000)
+    )
+    suspects = []
+    async for uid, *values in stored:
+        expected = actual.get(uid, {})
+        if any((value or 0) != expected.get(column, 0) for column, value in zip(RECONCILED_COLUMNS, values)):
+            suspects.append(uid)
+    await db.rollback()
+
+    drift = []
+    for uid in suspects:
+        stats = await lock_user_stats(db, uid)
+        expected = (await _history_totals(db, uid)).get(uid, {})
+        fixed = {}
+        for column in RECONCILED_COLUMNS:
+            value, want = getattr(stats, column), expected.get(column, 0)
+            if (value or 0) != want:
+                drift.append((uid, column, value, want))
+                fixed[column] = want
+        if repair and fixed:
+            await db.execute(
+                update(UserStats).where(UserStats.user_id == uid).values(**fixed)
+            )
+            await db.commit()
+        else:
+            await db.rollback()
+
+    return drift
+
+
+async def ensure_user_stats(db: AsyncSession) -> bool:
+    """
+    Rebuild the stats table when it is empty but users exist, e.g. on
+    first boot after upgrading. Returns True when a rebuild ran.
+    """
+    has_stats = await db.scalar(select(UserStats.user_id).limit(1))
+    has_users = await db.scalar(select(User.id).limit(1))
+    if has_stats is None and has_users is not None:
+        await rebuild_user_stats(db)
+        return True
+    return False
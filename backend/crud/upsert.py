@@ -0,0 +1,40 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def upsert(
+    db: AsyncSession,
+    model,
+    rows,
+    index_elements,
+    update_columns,
+    increment_columns=()
+):
+    """
+    Build a dialect-aware INSERT ... ON CONFLICT (index_elements)
+    DO UPDATE statement for SQLite or Postgres. update_columns are
+    overwritten, increment_columns are added to the stored value; with
+    neither, existing rows are left alone (DO NOTHING).
+    Callers may chain .returning(...) before executing it, or pass
+    rows=None and execute it with a list of parameter dicts.
+    """
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        insert = postgresql.insert
+    elif dialect == "sqlite":
+        insert = sqlite.insert
+    else:
+        raise NotImplementedError(f"upsert is not supported on {dialect}")
+
+    stmt = insert(model)
+    if rows is not None:
+        stmt = stmt.values(rows)
+    set_ = {column: stmt.excluded[column] for column in update_columns}
+    for column in increment_columns:
+        set_[column] = getattr(model, column) + stmt.excluded[column]
+    if not set_:
+        return stmt.on_conflict_do_nothing(index_elements=index_elements)
+    return stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_=set_
+    )
@@ -1,16 +1,17 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.user import User
 from models.streak import Streak
+from models.user_stats import UserStats
 
-def create_user(db: Session, email: str, username: str, password_hash: str):
+async def create_user(db: AsyncSession, email: str, username: str, password_hash: str):
     user = User(
         email=email,
         username=username,
         password_hash=password_hash
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
 
     # Initialize streak for user
     streak = Streak(
@@ -20,6 +21,7 @@ def create_user(db: Session, email: str, username: str, password_hash: str):
         last_active_date=None
     )
     db.add(streak)
-    db.commit()
+    db.add(UserStats(user_id=user.id))
+    await db.commit()
 
     return user
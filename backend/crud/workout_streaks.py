@@ -0,0 +1,327 @@
+"""
+The workout streak engine. A day counts when its completion awarded
+points; each maximal run of consecutive counted days is one row of
+workout_streak_runs, and the user's stats row carries the summary
+every endpoint reads: the current streak (the latest run), the longest
+run and the last counted day.
+
+Marking any day, past ones included, touches at most the two runs next
+to it: one indexed lookup and one or two writes. Only shrinking the
+latest or the longest run needs one more indexed query.
+"""
+from datetime import date, timedelta
+from sqlalchemy import delete, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.streak import WorkoutStreakRun
+from models.user import User
+from models.user_stats import UserStats
+from models.workout import WorkoutCompletion
+
+_DAY = timedelta(days=1)
+
+
+def runs_from_dates(dates) -> list:
+    """(start, end, length) runs for ascending, distinct active days."""
+    runs = []
+    for d in dates:
+        if runs and d == runs[-1][1] + _DAY:
+            start, _, length = runs[-1]
+            runs[-1] = (start, d, length + 1)
+        else:
+            runs.append((d, d, 1))
+    return runs
+
+
+def summarize_runs(runs) -> dict:
+    """The stats columns implied by a user's runs, oldest first."""
+    return {
+        "workout_streak": runs[-1][2] if runs else 0,
+        "longest_workout_streak": max((length for _, _, length in runs), default=0),
+        "last_workout_date": runs[-1][1] if runs else None,
+        "workout_active_days": sum(length for _, _, length in runs),
+    }
+
+
+async def _activate(db: AsyncSession, stats: UserStats, day: date):
+    user_id = stats.user_id
+    neighbours = (await db.execute(
+        select(WorkoutStreakRun.start_date, WorkoutStreakRun.end_date, WorkoutStreakRun.length)
+        .where(
+            WorkoutStreakRun.user_id == user_id,
+            or_(WorkoutStreakRun.end_date == day - _DAY, WorkoutStreakRun.start_date == day + _DAY)
+        )
+    )).all()
+    left = next((run for run in neighbours if run.end_date == day - _DAY), None)
+    right = next((run for run in neighbours if run.start_date == day + _DAY), None)
+
+    this_run = WorkoutStreakRun.user_id == user_id
+    if left and right:
+        # Bridges two runs: the left one absorbs the day and the right one
+        start, end, length = left.start_date, right.end_date, left.length + 1 + right.length
+        await db.execute(delete(WorkoutStreakRun).where(this_run, WorkoutStreakRun.start_date == right.start_date))
+        await db.execute(
+            update(WorkoutStreakRun)
+            .where(this_run, WorkoutStreakRun.start_date == start)
+            .values(end_date=end, length=length)
+        )
+    elif left:
+        start, end, length = left.start_date, day, left.length + 1
+        await db.execute(
+            update(WorkoutStreakRun)
+            .where(this_run, WorkoutStreakRun.start_date == start)
+            .values(end_date=end, length=length)
+        )
+    elif right:
+        start, end, length = day, right.end_date, right.length + 1
+        await db.execute(
+            update(WorkoutStreakRun)
+            .where(this_run, WorkoutStreakRun.start_date == right.start_date)
+            .values(start_date=start, length=length)
+        )
+    else:
+        start, end, length = day, day, 1
+        await db.execute(insert(WorkoutStreakRun).values(
+            user_id=user_id, start_date=start, end_date=end, length=length
+        ))
+
+    # Runs only grow here, so the summary follows from this run alone
+    stats.longest_workout_streak = max(stats.longest_workout_streak or 0, length)
+    if stats.last_workout_date is None or end >= stats.last_workout_date:
+        stats.workout_streak = length
+        stats.last_workout_date = end
+
+
+async def _deactivate(db: AsyncSession, stats: UserStats, day: date):
+    user_id = stats.user_id
+    run = (await db.execute(
+        select(WorkoutStreakRun.start_date, WorkoutStreakRun.end_date, WorkoutStreakRun.length)
+        .where(WorkoutStreakRun.user_id == user_id, WorkoutStreakRun.start_date <= day)
+        .order_by(WorkoutStreakRun.start_date.desc())
+        .limit(1)
+    )).first()
+    if run is None or run.end_date < day:
+        # Not part of any run; verify_workout_streaks reports such drift
+        return
+
+    this_run = (WorkoutStreakRun.user_id == user_id, WorkoutStreakRun.start_date == run.start_date)
+    if run.start_date == run.end_date:
+        await db.execute(delete(WorkoutStreakRun).where(*this_run))
+    elif day == run.start_date:
+        await db.execute(
+            update(WorkoutStreakRun).where(*this_run)
+            .values(start_date=day + _DAY, length=run.length - 1)
+        )
+    elif day == run.end_date:
+        await db.execute(
+            update(WorkoutStreakRun).where(*this_run)
+            .values(end_date=day - _DAY, length=run.length - 1)
+        )
+    else:
+        # Splits the run around the day
+        await db.execute(
+            update(WorkoutStreakRun).where(*this_run)
+            .values(end_date=day - _DAY, length=(day - run.start_date).days)
+        )
+        await db.execute(insert(WorkoutStreakRun).values(
+            user_id=user_id,
+            start_date=day + _DAY,
+            end_date=run.end_date,
+            length=(run.end_date - day).days
+        ))
+
+    if run.end_date == stats.last_workout_date:
+        if day < run.end_date:
+            stats.workout_streak = (run.end_date - day).days
+        elif run.start_date < day:
+            stats.workout_streak = run.length - 1
+            stats.last_workout_date = day - _DAY
+        else:
+            # The latest run is gone; the one before it takes over
+            previous = (await db.execute(
+                select(WorkoutStreakRun.end_date, WorkoutStreakRun.length)
+                .where(WorkoutStreakRun.user_id == user_id)
+                .order_by(WorkoutStreakRun.end_date.desc())
+                .limit(1)
+            )).first()
+            stats.workout_streak = previous.length if previous else 0
+            stats.last_workout_date = previous.end_date if previous else None
+
+    if run.length >= (stats.longest_workout_streak or 0):
+        stats.longest_workout_streak = await db.scalar(
+            select(func.coalesce(func.max(WorkoutStreakRun.length), 0))
+            .where(WorkoutStreakRun.user_id == user_id)
+        )
+
+
+async def mark_workout_day(db: AsyncSession, stats: UserStats, day: date, active: bool):
+    """
+    Record that ``day`` became active or inactive for the stats row's
+    user, updating their runs and streak columns. Callers hold
+    lock_user_stats and only call this when the day's state changed.
+    """
+    if active:
+        await _activate(db, stats, day)
+    else:
+        await _deactivate(db, stats, day)
+
+
+def backfill_workout_streak_runs(conn) -> dict:
+    """
+    Regenerate workout_streak_runs from workout_completions on a
+    synchronous connection, one user at a time. Returns each user's
+    summarize_runs() columns.
+    """
+    conn.execute(delete(WorkoutStreakRun))
+    active_days = conn.execute(
+        select(WorkoutCompletion.user_id, WorkoutCompletion.completion_date)
+        .where(WorkoutCompletion.points_awarded > 0)
+        .order_by(WorkoutCompletion.user_id, WorkoutCompletion.completion_date)
+        .execution_options(yield_per=10000)
+    )
+
+    summaries = {}
+    pending = []
+    dates = []
+    current = None
+
+    def flush_user():
+        if current is None:
+            return
+        runs = runs_from_dates(dates)
+        summaries[current] = summarize_runs(runs)
+        pending.extend(
+            {"user_id": current, "start_date": start, "end_date": end, "length": length}
+            for start, end, length in runs
+        )
+        dates.clear()
+        if len(pending) >= 10000:
+            conn.execute(insert(WorkoutStreakRun), pending)
+            pending.clear()
+
+    for user_id, day in active_days:
+        if user_id != current:
+            flush_user()
+            current = user_id
+        dates.append(day)
+    flush_user()
+    if pending:
+        conn.execute(insert(WorkoutStreakRun), pending)
+
+    return summaries
+
+
+def _first_run(runs):
+    return f"{runs[0][0]}..{runs[0][1]}" if runs else None
+
+
+_STREAK_COLUMNS = ["workout_streak", "longest_workout_streak", "last_workout_date", "workout_active_days"]
+
+
+async def _stored_streak_state(db: AsyncSession, user_ids):
+    """Active days and persisted runs per user, for a batch of users."""
+    dates = {user_id: [] for user_id in user_ids}
+    for user_id, day in await db.execute(
+        select(WorkoutCompletion.user_id, WorkoutCompletion.completion_date)
+        .where(WorkoutCompletion.user_id.in_(user_ids), WorkoutCompletion.points_awarded > 0)
+        .order_by(WorkoutCompletion.user_id, WorkoutCompletion.completion_date)
+    ):
+        dates[user_id].append(day)
+
+    stored_runs = {user_id: [] for user_id in user_ids}
+    for user_id, start, end, length in await db.execute(
+        select(
+            WorkoutStreakRun.user_id,
+            WorkoutStreakRun.start_date,
+            WorkoutStreakRun.end_date,
+            WorkoutStreakRun.length
+        )
+        .where(WorkoutStreakRun.user_id.in_(user_ids))
+        .order_by(WorkoutStreakRun.user_id, WorkoutStreakRun.start_date)
+    ):
+        stored_runs[user_id].append((start, end, length))
+
+    return dates, stored_runs
+
+
+def _compare_streaks(user_id, dates, persisted, stored):
+    """(differences, actual runs, actual stats columns) for one user."""
+    runs = runs_from_dates(dates)
+    found = []
+    if persisted != runs:
+        only_stored = [run for run in persisted if run not in runs]
+        only_actual = [run for run in runs if run not in persisted]
+        found.append((user_id, "runs", _first_run(only_stored), _first_run(only_actual)))
+    expected = summarize_runs(runs)
+    if stored is not None:
+        for column in _STREAK_COLUMNS:
+            if stored[column] != expected[column]:
+                found.append((user_id, column, stored[column], expected[column]))
+    return found, runs, expected
+
+
+async def _repair_streaks(db: AsyncSession, user_id) -> list:
+    """
+    Re-check one user under lock_user_stats and rewrite their runs and
+    streak columns if they still differ, so a completion saved since
+    the unlocked scan is neither reported nor reverted.
+    """
+    # crud.stats builds on this module, so it is imported here
+    from crud.stats import lock_user_stats
+
+    stats = await lock_user_stats(db, user_id)
+    dates, stored_runs = await _stored_streak_state(db, [user_id])
+    stored = {column: getattr(stats, column) for column in _STREAK_COLUMNS}
+    found, runs, expected = _compare_streaks(user_id, dates[user_id], stored_runs[user_id], stored)
+    if not found:
+        await db.rollback()
+        return found
+
+    await db.execute(delete(WorkoutStreakRun).where(WorkoutStreakRun.user_id == user_id))
+    if runs:
+        await db.execute(insert(WorkoutStreakRun), [
+            {"user_id": user_id, "start_date": start, "end_date": end, "length": length}
+            for start, end, length in runs
+        ])
+    for column, value in expected.items():
+        setattr(stats, column, value)
+    await db.commit()
+    return found
+
+
+async def verify_workout_streaks(db: AsyncSession, repair: bool = False, batch_size: int = 500) -> list:
+    """
+    Recompute every user's runs and streak columns from their workout
+    history and compare them with the persisted state, a batch of users
+    at a time. With repair=True the users that differ are re-checked
+    and rewritten one at a time, each under their stats lock.
+    Returns one (user_id, field, stored, actual) tuple per difference;
+    for "runs" the values are the first run found on only one side.
+    """
+    user_ids = list(await db.scalars(select(User.id).order_by(User.id)))
+
+    mismatches = []
+    for i in range(0, len(user_ids), batch_size):
+        batch = user_ids[i:i + batch_size]
+        dates, stored_runs = await _stored_streak_state(db, batch)
+        stored_stats = {
+            user_id: dict(zip(_STREAK_COLUMNS, values))
+            for user_id, *values in await db.execute(
+                select(UserStats.user_id, *(getattr(UserStats, c) for c in _STREAK_COLUMNS))
+                .where(UserStats.user_id.in_(batch))
+            )
+        }
+
+        suspects = []
+        for user_id in batch:
+            found, _, _ = _compare_streaks(user_id, dates[user_id], stored_runs[user_id], stored_stats.get(user_id))
+            if found and repair:
+                suspects.append(user_id)
+            else:
+                mismatches.extend(found)
+
+        if suspects:
+            await db.rollback()
+            for user_id in suspects:
+                mismatches.extend(await _repair_streaks(db, user_id))
+
+    return mismatches
@@ -1,23 +1,145 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from utils.instrumentation import instrument_engine
 
 DATABASE_URL = os.getenv(
     "DATABASE_URL",
     "sqlite:///./database.db"
 )
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}
-    if DATABASE_URL.startswith("sqlite")
-    else {}
+# -------------------------
+# ENGINE CONFIGURATION
+# -------------------------
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# Writers queue on SQLite's single write lock by polling it; under a
+# burst of writes to one database the wait can pass a few seconds, so
+# allow as long as a caller would wait for a pooled connection
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "30000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+IS_SQLITE_MEMORY = IS_SQLITE and (
+    DATABASE_URL in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in DATABASE_URL
 )
 
-SessionLocal = sessionmaker(
-    autocommit=False,
+# Pings catch connections a server or proxy dropped while idle; a
+# SQLite file cannot drop them, so there it is only a wasted round trip
+DB_POOL_PRE_PING = os.getenv(
+    "DB_POOL_PRE_PING", "false" if IS_SQLITE else "true"
+).lower() in ("1", "true", "yes")
+
+
+def _async_url(url: str) -> str:
+    # Same DATABASE_URL as before, routed to an async driver
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+# -------------------------
+# POOL METRICS
+# -------------------------
+_pool_counters = {
+    "checkouts": 0,
+    "checkout_timeouts": 0,
+    "checkout_wait_seconds_total": 0.0,
+    "checkout_wait_seconds_max": 0.0,
+}
+_pool_counters_lock = threading.Lock()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long callers wait for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            with _pool_counters_lock:
+                _pool_counters["checkout_timeouts"] += 1
+            raise
+        waited = time.perf_counter() - start
+        with _pool_counters_lock:
+            _pool_counters["checkouts"] += 1
+            _pool_counters["checkout_wait_seconds_total"] += waited
+            if waited > _pool_counters["checkout_wait_seconds_max"]:
+                _pool_counters["checkout_wait_seconds_max"] = waited
+        return conn
+
+
+def _engine_kwargs() -> dict:
+    if IS_SQLITE_MEMORY:
+        # A single shared connection; pool sizing does not apply
+        return {}
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+engine = create_async_engine(_async_url(DATABASE_URL), **_engine_kwargs())
+instrument_engine(engine)
+
+
+if IS_SQLITE:
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers proceed while a writer holds the lock, and
+        # busy_timeout makes writers wait instead of failing immediately
+        cursor = dbapi_connection.cursor()
+        if not IS_SQLITE_MEMORY:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.close()
+        # The driver opens a transaction right before its first write.
+        # BEGIN IMMEDIATE takes the write lock up front, waiting on
+        # busy_timeout; a deferred BEGIN reads a snapshot first and
+        # fails at once if another writer commits before it can write
+        dbapi_connection.isolation_level = "IMMEDIATE"
+
+
+def pool_stats() -> dict:
+    pool = engine.pool
+    with _pool_counters_lock:
+        stats = dict(_pool_counters)
+    stats["checked_out"] = pool.checkedout() if hasattr(pool, "checkedout") else 0
+    stats["pool_size"] = pool.size() if hasattr(pool, "size") else 1
+    stats["overflow"] = pool.overflow() if hasattr(pool, "overflow") else 0
+    return stats
+
+
+SessionLocal = async_sessionmaker(
+    engine,
+    class_=AsyncSession,
     autoflush=False,
-    bind=engine
+    # Loaded attributes stay usable after commit without lazy IO
+    expire_on_commit=False
 )
+
+# -------------------------
+# DATABASE DEPENDENCY
+# -------------------------
+async def get_db():
+    async with SessionLocal() as db:
+        yield db
 ####
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
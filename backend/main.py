@@ -1,20 +1,29 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from database import Base, engine
+from database import engine, SessionLocal
 from models.user import User
 from models.activity import DailyActivity
 from models.junk import UserJunkLimit
 from models.streak import Streak
 from models.workout import WorkoutPlan, WorkoutCompletion
+from models.user_stats import UserStats
+from crud.stats import ensure_user_stats
+from crud.ranking import WINDOWS, load_rank_index
+from migrations import run_migrations
+from utils.security import shutdown_hash_pool
 from routes.auth import router as auth_router
 from routes.activity import router as activity_router
 from routes.user import router as user_router
+from routes.metrics import router as metrics_router
+from utils.instrumentation import MetricsMiddleware
+from utils.responses import GZIP_MIN_SIZE, CompressionMiddleware
 
 # -------------------------
 # APP INIT
 # -------------------------
-app = FastAPI(title="Ritual")
+app = FastAPI(title="Ritual", default_response_class=ORJSONResponse)
 
 # -------------------------
 # CORS CONFIG (IMPORTANT)
@@ -30,12 +39,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# -------------------------
+# COMPRESSION (gzip for bodies of GZIP_MIN_SIZE bytes and up)
+# -------------------------
+if GZIP_MIN_SIZE > 0:
+    app.add_middleware(CompressionMiddleware, minimum_size=GZIP_MIN_SIZE)
+
+# -------------------------
+# METRICS (outermost, so it times everything below)
+# -------------------------
+app.add_middleware(MetricsMiddleware)
+
 # -------------------------
 # DATABASE INIT
-# -------------------------s
+# -------------------------
 @app.on_event("startup")
-def startup():
-    Base.metadata.create_all(bind=engine)
+async def startup():
+    await run_migrations(engine)
+
+    # Backfill the leaderboard aggregate on first boot after upgrading
+    async with SessionLocal() as db:
+        await ensure_user_stats(db)
+        # Rankings live in memory and are rebuilt from the database
+        for window in WINDOWS:
+            await load_rank_index(db, window)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    shutdown_hash_pool()
+    await engine.dispose()
 
 # -------------------------
 # ROUTES
@@ -43,10 +76,11 @@ def startup():
 app.include_router(auth_router)
 app.include_router(activity_router)
 app.include_router(user_router)
+app.include_router(metrics_router)
 
 # -------------------------
 # HEALTH CHECK
 # -------------------------
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok"}
@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import gzip
+import sys
+
+from database import engine, SessionLocal
+from crud.export import EXPORT_FORMATS, stream_export
+from crud.stats import ensure_user_stats, rebuild_user_stats, reconcile_user_stats
+from crud.rescore import rescore_daily_activity
+from crud.rollups import rebuild_points_rollups
+from crud.workout_streaks import verify_workout_streaks
+from migrations import migration_status, run_migrations
+
+
+async def migrate(args):
+    if args.status:
+        for version, name, applied in await migration_status(engine):
+            print(f"[{'x' if applied else ' '}] {name}")
+        return
+
+    applied = await run_migrations(engine, target=args.target)
+    print(f"Applied {len(applied)} migration(s)" + (f": {applied}" if applied else ""))
+    async with SessionLocal() as db:
+        if await ensure_user_stats(db):
+            print("Rebuilt empty stats table")
+
+
+async def rebuild_stats(args):
+    await run_migrations(engine)
+    async with SessionLocal() as db:
+        count = await rebuild_user_stats(db)
+        rollups = await rebuild_points_rollups(db)
+    print(f"Rebuilt stats for {count} users and {rollups} points rollups")
+
+
+async def reconcile_stats(args):
+    await run_migrations(engine)
+    async with SessionLocal() as db:
+        drift = await reconcile_user_stats(db, repair=not args.dry_run)
+    for user_id, column, stored, actual in drift:
+        print(f"  {user_id} {column}: stored {stored}, actual {actual}")
+    users = len({user_id for user_id, *_ in drift})
+    if not drift:
+        print("Stats totals match history")
+    elif args.dry_run:
+        print(f"Found drift for {users} users")
+    else:
+        print(f"Repaired drift for {users} users")
+
+
+async def verify_streaks(args):
+    await run_migrations(engine)
+    async with SessionLocal() as db:
+        mismatches = await verify_workout_streaks(db, repair=args.repair)
+    for user_id, field, stored, actual in mismatches:
+        print(f"  {user_id} {field}: stored {stored}, actual {actual}")
+    users = len({user_id for user_id, *_ in mismatches})
+    if not mismatches:
+        print("Workout streaks match history")
+    elif args.repair:
+        print(f"Repaired workout streaks for {users} users")
+    else:
+        print(f"Found workout streak mismatches for {users} users")
+        raise SystemExit(1)
+
+
+async def export(args):
+    await run_migrations(engine)
+    if args.output == "-":
+        out = gzip.GzipFile(fileobj=sys.stdout.buffer, mode="wb") if args.gzip else sys.stdout.buffer
+    else:
+        out = gzip.open(args.output, "wb") if args.gzip else open(args.output, "wb")
+
+    try:
+        async with SessionLocal() as db:
+            async for chunk in stream_export(db, args.format):
+                out.write(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+        else:
+            out.flush()
+    if args.output != "-":
+        print(f"Exported every user's history to {args.output}")
+
+
+async def rescore(args):
+    await run_migrations(engine)
+
+    def progress(scanned, changed):
+        print(f"  {scanned:,} rows scanned, {changed:,} changed", flush=True)
+
+    async with SessionLocal() as db:
+        result = await rescore_daily_activity(
+            db,
+            chunk_size=args.chunk_size,
+            dry_run=args.dry_run,
+            verify=args.verify,
+            progress=progress
+        )
+    print(
+        f"{'Would rescore' if args.dry_run else 'Rescored'} {result['changed']:,} of "
+        f"{result['scanned']:,} rows in {result['seconds']:.1f}s"
+    )
+
+
+async def run(args):
+    try:
+        await args.func(args)
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ritual maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = commands.add_parser(
+        "migrate",
+        help="Apply pending schema migrations"
+    )
+    migrate_parser.add_argument("--target", type=int, default=None, help="stop after this version")
+    migrate_parser.add_argument("--status", action="store_true", help="list migrations and exit")
+    migrate_parser.set_defaults(func=migrate)
+
+    commands.add_parser(
+        "rebuild-stats",
+        help="Regenerate the leaderboard aggregate, streak runs and points rollups from history"
+    ).set_defaults(func=rebuild_stats)
+
+    reconcile_parser = commands.add_parser(
+        "reconcile-stats",
+        help="Check running point totals against history and repair drift"
+    )
+    reconcile_parser.add_argument("--dry-run", action="store_true", help="report drift without repairing")
+    reconcile_parser.set_defaults(func=reconcile_stats)
+
+    verify_parser = commands.add_parser(
+        "verify-streaks",
+        help="Recompute workout streaks from history and report mismatches"
+    )
+    verify_parser.add_argument("--repair", action="store_true", help="rewrite the users that differ")
+    verify_parser.set_defaults(func=verify_streaks)
+
+    export_parser = commands.add_parser(
+        "export",
+        help="Stream every user's history as NDJSON or CSV"
+    )
+    export_parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    export_parser.add_argument("--output", default="-", help="file to write, - for stdout")
+    export_parser.add_argument("--gzip", action="store_true", help="compress while writing")
+    export_parser.set_defaults(func=export)
+
+    rescore_parser = commands.add_parser(
+        "rescore",
+        help="Recompute daily activity points with the current rules"
+    )
+    rescore_parser.add_argument("--chunk-size", type=int, default=50000)
+    rescore_parser.add_argument("--dry-run", action="store_true", help="count changes without writing")
+    rescore_parser.add_argument("--verify", action="store_true", help="check every row against calculate_points")
+    rescore_parser.set_defaults(func=rescore)
+
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
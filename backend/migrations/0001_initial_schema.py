@@ -0,0 +1,67 @@
+"""
+Baseline schema, frozen as the tables stood before versioned
+migrations: later model changes belong in later migrations, never
+here. Existing databases keep their tables untouched; fresh databases
+get every baseline table in one step.
+"""
+from sqlalchemy import JSON, Column, Date, DateTime, ForeignKey, Integer, MetaData, String, Table
+
+metadata = MetaData()
+
+Table(
+    "users", metadata,
+    Column("id", String, primary_key=True),
+    Column("email", String, unique=True, nullable=False, index=True),
+    Column("username", String, unique=True, nullable=False),
+    Column("password_hash", String, nullable=False),
+    Column("bio", String, nullable=True),
+    Column("avatar_url", String, nullable=True),
+    Column("created_at", DateTime, nullable=False),
+)
+
+Table(
+    "daily_activity", metadata,
+    Column("id", String, primary_key=True),
+    Column("user_id", String, ForeignKey("users.id"), index=True, nullable=False),
+    Column("activity_date", Date, nullable=False),
+    Column("steps", Integer),
+    Column("points", Integer),
+)
+
+Table(
+    "user_junk_limits", metadata,
+    Column("id", String, primary_key=True),
+    Column("user_id", String, ForeignKey("users.id"), index=True),
+    Column("junk_type", String, nullable=False),
+    Column("max_quantity", Integer, nullable=False),
+)
+
+Table(
+    "streaks", metadata,
+    Column("user_id", String, ForeignKey("users.id"), primary_key=True),
+    Column("current_streak", Integer),
+    Column("longest_streak", Integer),
+    Column("last_active_date", Date, nullable=True),
+)
+
+Table(
+    "workout_plans", metadata,
+    Column("id", String, primary_key=True),
+    Column("user_id", String, ForeignKey("users.id"), unique=True, index=True),
+    Column("plan", JSON, nullable=False),
+)
+
+Table(
+    "workout_completions", metadata,
+    Column("id", String, primary_key=True),
+    Column("user_id", String, ForeignKey("users.id"), index=True),
+    Column("completion_date", Date, nullable=False),
+    Column("day_of_week", String, nullable=False),
+    Column("completed_exercises", JSON, nullable=False),
+    Column("points_awarded", Integer),
+    Column("created_at", DateTime),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn)
@@ -0,0 +1,42 @@
+"""
+Create user_stats where it is missing (ensure_user_stats fills it at
+startup), and add the active-day totals to one created before they
+existed, backfilled from workout_completions.
+"""
+from sqlalchemy import Column, Date, ForeignKey, Index, Integer, MetaData, String, Table, text
+
+from migrations.ops import add_column, has_column
+
+metadata = MetaData()
+# As first introduced; the columns below and later migrations extend it
+user_stats = Table(
+    "user_stats", metadata,
+    Column("user_id", String, ForeignKey("users.id"), primary_key=True),
+    Column("workout_points", Integer, nullable=False),
+    Column("workout_streak", Integer, nullable=False),
+    Column("longest_workout_streak", Integer, nullable=False),
+    Column("last_workout_date", Date, nullable=True),
+    Index("ix_user_stats_workout_points", "workout_points"),
+)
+# Only referenced by the foreign key, never created here
+Table("users", metadata, Column("id", String, primary_key=True))
+
+
+def upgrade(conn):
+    user_stats.create(conn, checkfirst=True)
+    if has_column(conn, "user_stats", "workout_active_days"):
+        return
+
+    add_column(conn, "user_stats", "workout_active_days", "INTEGER NOT NULL DEFAULT 0")
+    add_column(conn, "user_stats", "workout_active_points", "INTEGER NOT NULL DEFAULT 0")
+    conn.execute(text("""
+        UPDATE user_stats SET
+            workout_active_days = (
+                SELECT COUNT(*) FROM workout_completions wc
+                WHERE wc.user_id = user_stats.user_id AND wc.points_awarded > 0
+            ),
+            workout_active_points = (
+                SELECT COALESCE(SUM(wc.points_awarded), 0) FROM workout_completions wc
+                WHERE wc.user_id = user_stats.user_id AND wc.points_awarded > 0
+            )
+    """))
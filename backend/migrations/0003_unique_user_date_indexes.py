@@ -0,0 +1,51 @@
+"""
+Every hot lookup filters on user plus date (or junk type). Remove
+duplicate rows, then enforce one row per key with unique composite
+indexes that also serve those lookups.
+"""
+from sqlalchemy import delete
+from sqlalchemy.sql import column, table
+
+from migrations.ops import create_unique_index, dedupe, drop_index
+
+daily_activity = table(
+    "daily_activity",
+    column("id"), column("user_id"), column("activity_date"),
+    column("steps"), column("points"),
+)
+workout_completions = table(
+    "workout_completions",
+    column("id"), column("user_id"), column("completion_date"),
+    column("created_at"), column("points_awarded"),
+)
+user_junk_limits = table(
+    "user_junk_limits",
+    column("id"), column("user_id"), column("junk_type"),
+)
+user_stats = table("user_stats", column("user_id"))
+
+
+def upgrade(conn):
+    dedupe(
+        conn, daily_activity, ["user_id", "activity_date"],
+        keep_order=[daily_activity.c.steps.desc(), daily_activity.c.points.desc()]
+    )
+    removed_completions = dedupe(
+        conn, workout_completions, ["user_id", "completion_date"],
+        keep_order=[workout_completions.c.created_at.desc(), workout_completions.c.id]
+    )
+    dedupe(
+        conn, user_junk_limits, ["user_id", "junk_type"],
+        keep_order=[user_junk_limits.c.id]
+    )
+
+    create_unique_index(conn, "uq_daily_activity_user_date", "daily_activity", ["user_id", "activity_date"])
+    create_unique_index(conn, "uq_workout_completions_user_date", "workout_completions", ["user_id", "completion_date"])
+    create_unique_index(conn, "uq_user_junk_limits_user_type", "user_junk_limits", ["user_id", "junk_type"])
+    # Superseded by the unique index above
+    drop_index(conn, "ix_workout_completions_user_date")
+
+    if removed_completions:
+        # Totals and streaks counted the duplicates; an empty table is
+        # rebuilt from workout_completions by ensure_user_stats at startup
+        conn.execute(delete(user_stats))
@@ -0,0 +1,10 @@
+"""
+Store the junk intake that log_daily_activity already scores, so
+points can be recomputed from the row itself when the rules change.
+"""
+from migrations.ops import add_column
+
+
+def upgrade(conn):
+    add_column(conn, "daily_activity", "junk_type", "VARCHAR")
+    add_column(conn, "daily_activity", "junk_quantity", "INTEGER NOT NULL DEFAULT 0")
@@ -0,0 +1,20 @@
+"""
+Add the running daily activity points total to user_stats and backfill
+it from daily_activity, so profile reads stop summing history.
+"""
+from sqlalchemy import text
+
+from migrations.ops import add_column, has_column
+
+
+def upgrade(conn):
+    if has_column(conn, "user_stats", "activity_points"):
+        return
+
+    add_column(conn, "user_stats", "activity_points", "INTEGER NOT NULL DEFAULT 0")
+    conn.execute(text("""
+        UPDATE user_stats SET activity_points = (
+            SELECT COALESCE(SUM(da.points), 0) FROM daily_activity da
+            WHERE da.user_id = user_stats.user_id
+        )
+    """))
@@ -0,0 +1,26 @@
+"""
+Create the per-user day/week/month points rollups and fill them from
+existing history, so charts read buckets instead of raw rows.
+"""
+from sqlalchemy import Column, Date, ForeignKey, Integer, MetaData, String, Table, select
+
+from crud.rollups import backfill_points_rollups
+
+metadata = MetaData()
+points_rollups = Table(
+    "points_rollups", metadata,
+    Column("user_id", String, ForeignKey("users.id"), primary_key=True),
+    Column("bucket", String, primary_key=True),
+    Column("bucket_start", Date, primary_key=True),
+    Column("steps", Integer, nullable=False),
+    Column("activity_points", Integer, nullable=False),
+    Column("workout_points", Integer, nullable=False),
+)
+# Only referenced by the foreign key, never created here
+Table("users", metadata, Column("id", String, primary_key=True))
+
+
+def upgrade(conn):
+    points_rollups.create(conn, checkfirst=True)
+    if conn.scalar(select(points_rollups.c.user_id).limit(1)) is None:
+        backfill_points_rollups(conn)
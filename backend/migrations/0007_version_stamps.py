@@ -0,0 +1,11 @@
+"""
+Version stamps bumped on every write, so polled GET endpoints can
+answer If-None-Match from one small lookup.
+"""
+from migrations.ops import add_column
+
+
+def upgrade(conn):
+    add_column(conn, "workout_plans", "version", "INTEGER NOT NULL DEFAULT 1")
+    add_column(conn, "workout_completions", "version", "INTEGER NOT NULL DEFAULT 1")
+    add_column(conn, "user_stats", "junk_limits_version", "INTEGER NOT NULL DEFAULT 0")
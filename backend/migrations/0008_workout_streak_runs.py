@@ -0,0 +1,26 @@
+"""
+Persist each user's runs of consecutive workout days, so streak edits
+on any day are incremental instead of a walk over their history.
+"""
+from sqlalchemy import Column, Date, ForeignKey, Index, Integer, MetaData, String, Table, select
+
+from crud.workout_streaks import backfill_workout_streak_runs
+
+metadata = MetaData()
+workout_streak_runs = Table(
+    "workout_streak_runs", metadata,
+    Column("user_id", String, ForeignKey("users.id"), primary_key=True),
+    Column("start_date", Date, primary_key=True),
+    Column("end_date", Date, nullable=False),
+    Column("length", Integer, nullable=False),
+    Index("uq_workout_streak_runs_user_end", "user_id", "end_date", unique=True),
+    Index("ix_workout_streak_runs_user_length", "user_id", "length"),
+)
+# Only referenced by the foreign key, never created here
+Table("users", metadata, Column("id", String, primary_key=True))
+
+
+def upgrade(conn):
+    workout_streak_runs.create(conn, checkfirst=True)
+    if conn.scalar(select(workout_streak_runs.c.user_id).limit(1)) is None:
+        backfill_workout_streak_runs(conn)
@@ -0,0 +1,80 @@
+"""
+Versioned schema migrations.
+
+Each module named ``NNNN_description.py`` in this package defines
+``upgrade(conn)``, which receives a synchronous SQLAlchemy Connection.
+Versions are applied once, in order, inside a single transaction and
+recorded in the ``schema_migrations`` table.
+"""
+import importlib
+import logging
+import pkgutil
+import re
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select, text
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary constant so concurrent app workers on Postgres take turns
+_ADVISORY_LOCK_KEY = 7_310_221
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def discover():
+    found = []
+    for info in pkgutil.iter_modules(__path__):
+        match = re.match(r"^(\d{4})_\w+$", info.name)
+        if match:
+            found.append((int(match.group(1)), info.name))
+    return sorted(found)
+
+
+def applied_versions(conn) -> set:
+    schema_migrations.create(conn, checkfirst=True)
+    return set(conn.scalars(select(schema_migrations.c.version)))
+
+
+def upgrade(conn, target=None) -> list:
+    """Apply pending migrations up to ``target`` (all when None)."""
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+
+    done = applied_versions(conn)
+    applied = []
+    for version, name in discover():
+        if target is not None and version > target:
+            break
+        if version in done:
+            continue
+
+        logger.info(f"Applying migration {name}")
+        module = importlib.import_module(f"{__name__}.{name}")
+        module.upgrade(conn)
+        conn.execute(schema_migrations.insert().values(
+            version=version,
+            name=name,
+            applied_at=datetime.utcnow()
+        ))
+        applied.append(version)
+
+    return applied
+
+
+async def run_migrations(engine, target=None) -> list:
+    async with engine.begin() as conn:
+        return await conn.run_sync(upgrade, target)
+
+
+async def migration_status(engine) -> list:
+    async with engine.begin() as conn:
+        done = await conn.run_sync(applied_versions)
+    return [(version, name, version in done) for version, name in discover()]
@@ -0,0 +1,52 @@
+"""Small, idempotent DDL helpers shared by migration modules."""
+from sqlalchemy import and_, delete, func, inspect, select, text
+
+
+def has_table(conn, table_name: str) -> bool:
+    return inspect(conn).has_table(table_name)
+
+
+def has_column(conn, table_name: str, column_name: str) -> bool:
+    return any(
+        c["name"] == column_name
+        for c in inspect(conn).get_columns(table_name)
+    )
+
+
+def add_column(conn, table_name: str, column_name: str, ddl: str):
+    # ddl is the column type and constraints, e.g. "INTEGER NOT NULL DEFAULT 0"
+    if not has_column(conn, table_name, column_name):
+        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl}"))
+
+
+def create_unique_index(conn, name: str, table_name: str, columns):
+    conn.execute(text(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {name} "
+        f"ON {table_name} ({', '.join(columns)})"
+    ))
+
+
+def drop_index(conn, name: str):
+    conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def dedupe(conn, table, key_columns, keep_order) -> int:
+    """
+    Delete all but one row per key. The row kept is the first one
+    under ``keep_order``. Returns the number of rows deleted.
+    """
+    keys = [table.c[name] for name in key_columns]
+    groups = conn.execute(
+        select(*keys).group_by(*keys).having(func.count() > 1)
+    ).all()
+
+    removed = 0
+    for values in groups:
+        match = and_(*(col == value for col, value in zip(keys, values)))
+        ids = conn.scalars(
+            select(table.c.id).where(match).order_by(*keep_order)
+        ).all()
+        conn.execute(delete(table).where(table.c.id.in_(ids[1:])))
+        removed += len(ids) - 1
+
+    return removed
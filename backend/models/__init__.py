@@ -1,14 +1,19 @@
 from .user import User
 from .activity import DailyActivity
 from .junk import UserJunkLimit
-from .streak import Streak
+from .streak import Streak, WorkoutStreakRun
 from .workout import WorkoutPlan, WorkoutCompletion
+from .user_stats import UserStats
+from .rollup import PointsRollup
 
 __all__ = [
     "User",
     "DailyActivity",
     "UserJunkLimit",
     "Streak",
+    "WorkoutStreakRun",
     "WorkoutPlan",
     "WorkoutCompletion",
+    "UserStats",
+    "PointsRollup",
 ]
\ No newline at end of file
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, Integer, Date, ForeignKey
+from sqlalchemy import Column, String, Integer, Date, ForeignKey, Index
 from database import Base
 
 class DailyActivity(Base):
@@ -11,5 +11,12 @@ class DailyActivity(Base):
     activity_date = Column(Date, nullable=False)
     steps = Column(Integer, default=0)
 
+    junk_type = Column(String, nullable=True)
+    junk_quantity = Column(Integer, nullable=False, default=0)
+
     # Calculated by backend only
     points = Column(Integer, default=0)
+
+    __table_args__ = (
+        Index("uq_daily_activity_user_date", "user_id", "activity_date", unique=True),
+    )
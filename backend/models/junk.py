@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, Integer, ForeignKey
+from sqlalchemy import Column, String, Integer, ForeignKey, Index
 from database import Base
 
 class UserJunkLimit(Base):
@@ -10,3 +10,7 @@ class UserJunkLimit(Base):
 
     junk_type = Column(String, nullable=False)
     max_quantity = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("uq_user_junk_limits_user_type", "user_id", "junk_type", unique=True),
+    )
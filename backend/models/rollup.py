@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, Integer, Date, ForeignKey
+from database import Base
+
+class PointsRollup(Base):
+    __tablename__ = "points_rollups"
+
+    # One row per user per bucket: "day", "week" (ISO, starting Monday)
+    # or "month"; the primary key doubles as the history range index
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    bucket = Column(String, primary_key=True)
+    bucket_start = Column(Date, primary_key=True)
+
+    # Maintained by backend on every activity and workout write
+    steps = Column(Integer, nullable=False, default=0)
+    activity_points = Column(Integer, nullable=False, default=0)
+    workout_points = Column(Integer, nullable=False, default=0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Date, ForeignKey
+from sqlalchemy import Column, String, Integer, Date, ForeignKey, Index
 from database import Base
 
 class Streak(Base):
@@ -9,3 +9,19 @@ class Streak(Base):
     current_streak = Column(Integer, default=0)
     longest_streak = Column(Integer, default=0)
     last_active_date = Column(Date, nullable=True)
+
+
+class WorkoutStreakRun(Base):
+    __tablename__ = "workout_streak_runs"
+
+    # One row per maximal run of consecutive active workout days,
+    # maintained by crud.workout_streaks on every completion write
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    start_date = Column(Date, primary_key=True)
+    end_date = Column(Date, nullable=False)
+    length = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("uq_workout_streak_runs_user_end", "user_id", "end_date", unique=True),
+        Index("ix_workout_streak_runs_user_length", "user_id", "length"),
+    )
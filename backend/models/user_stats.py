@@ -0,0 +1,25 @@
+from sqlalchemy import Column, String, Integer, Date, ForeignKey, Index
+from database import Base
+
+class UserStats(Base):
+    __tablename__ = "user_stats"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+
+    # Maintained by backend on every workout completion write
+    workout_points = Column(Integer, nullable=False, default=0)
+    workout_streak = Column(Integer, nullable=False, default=0)
+    longest_workout_streak = Column(Integer, nullable=False, default=0)
+    last_workout_date = Column(Date, nullable=True)
+    workout_active_days = Column(Integer, nullable=False, default=0)
+    workout_active_points = Column(Integer, nullable=False, default=0)
+
+    # Maintained by backend on every daily activity write
+    activity_points = Column(Integer, nullable=False, default=0)
+
+    # Bumped whenever the user's junk limits change
+    junk_limits_version = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_user_stats_workout_points", "workout_points"),
+    )
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Date, Integer, ForeignKey, JSON , DateTime
+from sqlalchemy import Column, String, Date, Integer, ForeignKey, JSON , DateTime, Index
 from database import Base
 
 class WorkoutPlan(Base):
@@ -19,6 +19,9 @@ class WorkoutPlan(Base):
     """
     plan = Column(JSON, nullable=False)
 
+    # Bumped on every save; feeds the GET ETags
+    version = Column(Integer, nullable=False, default=1)
+
 
 class WorkoutCompletion(Base):
     __tablename__ = "workout_completions"
@@ -39,4 +42,10 @@ class WorkoutCompletion(Base):
     completed_exercises = Column(JSON, nullable=False)
 
     points_awarded = Column(Integer, default=0)
+    # Bumped on every save; feeds the GET ETags
+    version = Column(Integer, nullable=False, default=1)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("uq_workout_completions_user_date", "user_id", "completion_date", unique=True),
+    )
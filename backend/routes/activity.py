@@ -1,75 +1,256 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from datetime import date
-from database import SessionLocal
+from typing import Optional
+from database import get_db
+from crud.activity import log_daily_activity
+from crud.history import get_activity_history
+from crud.junk import DEFAULT_JUNK_LIMITS, create_default_junk_limits, get_junk_limits, replace_junk_limits
+from crud.rollups import apply_rollups, apply_steps_rollups
+from crud.stats import apply_activity_points, lock_user_stats
+from crud.upsert import upsert
 from models.activity import DailyActivity
 from routes.auth import get_current_user
 from models.user import User
-from models.junk import UserJunkLimit 
+from models.streak import Streak
+from schemas import ActivityCreate, ActivityResponse, JunkLimitListResponse, JunkLimitsUpdate, StepsBatchRequest
+from utils.etag import etag_matches, make_etag, not_modified, set_etag
+from utils.pagination import InvalidCursor, decode_cursor, encode_cursor
+from utils.points import calculate_points
+from utils.responses import json_response
+from utils.streaks import update_streak
 
 router = APIRouter(prefix="/activity", tags=["Activity"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/steps")
-def submit_steps(
+async def submit_steps(
     steps: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    # Check if activity for today exists, update if so
     today = date.today()
-    activity = db.query(DailyActivity).filter_by(user_id=user.id, activity_date=today).first()
-    if activity:
-        activity.steps = steps
-    else:
-        activity = DailyActivity(
-            user_id=user.id,
-            activity_date=today,
-            steps=steps
+    # Queue behind other writers for this user so the stored steps the
+    # rollups diff against are still current; the rollup statement
+    # reads them itself, keeping the write transaction to three
+    # statements
+    await lock_user_stats(db, user.id)
+    await apply_steps_rollups(db, user.id, today, steps)
+
+    # Insert today's row or update its steps in one statement
+    saved = (await db.execute(
+        upsert(
+            db,
+            DailyActivity,
+            {"user_id": user.id, "activity_date": today, "steps": steps},
+            index_elements=["user_id", "activity_date"],
+            update_columns=["steps"]
+        ).returning(DailyActivity.steps, DailyActivity.activity_date)
+    )).one()
+    await db.commit()
+    return {
+        "message": "Steps saved",
+        "steps": saved.steps,
+        "date": saved.activity_date
+    }
+
+
+@router.post("/steps/batch")
+async def submit_steps_batch(
+    data: StepsBatchRequest,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # Wearable backfill: many days in one transaction
+    entries = sorted(data.entries, key=lambda e: e.date)
+
+    # Serialize with other writers for this user, then net out what
+    # the overwritten days already contributed
+    stats = await lock_user_stats(db, user.id)
+    previous = {
+        activity_date: (steps or 0, junk_type, junk_quantity or 0, points or 0)
+        for activity_date, steps, junk_type, junk_quantity, points in await db.execute(
+            select(
+                DailyActivity.activity_date,
+                DailyActivity.steps,
+                DailyActivity.junk_type,
+                DailyActivity.junk_quantity,
+                DailyActivity.points
+            ).where(
+                DailyActivity.user_id == user.id,
+                DailyActivity.activity_date.in_([entry.date for entry in entries])
+            )
         )
-        db.add(activity)
-    db.commit()
-    db.refresh(activity)
+    }
+
+    # Synced days carry no junk intake of their own; days already
+    # logged keep theirs, scored against the user's limits
+    _, limits = await get_junk_limits(db, user.id)
+    rows = []
+    active = {}
+    for entry in entries:
+        _, junk_type, junk_quantity, _ = previous.get(entry.date, (0, None, 0, 0))
+        max_allowed = limits.get(junk_type, 0) if junk_type else 0
+        rows.append({
+            "user_id": user.id,
+            "activity_date": entry.date,
+            "steps": entry.steps,
+            "points": calculate_points(
+                steps=entry.steps,
+                junk_quantity=junk_quantity,
+                max_allowed=max_allowed
+            )
+        })
+        active[entry.date] = entry.steps >= 5000 or junk_quantity <= max_allowed
+
+    await db.execute(upsert(
+        db,
+        DailyActivity,
+        rows,
+        index_elements=["user_id", "activity_date"],
+        update_columns=["steps", "points"]
+    ))
+    changes = []
+    for row in rows:
+        old_steps, _, _, old_points = previous.get(row["activity_date"], (0, None, 0, 0))
+        changes.append((user.id, row["activity_date"], {
+            "steps": row["steps"] - old_steps,
+            "activity_points": row["points"] - old_points,
+        }))
+    await apply_activity_points(
+        db, user.id, sum(c[2]["activity_points"] for c in changes), stats=stats
+    )
+    await apply_rollups(db, changes)
+
+    # Advance the streak once, oldest day first; days at or before
+    # the last counted one were already applied
+    streak = await db.scalar(
+        select(Streak).where(Streak.user_id == user.id).with_for_update()
+    )
+    if streak:
+        for entry in entries:
+            if streak.last_active_date is None or entry.date > streak.last_active_date:
+                update_streak(streak, entry.date, active[entry.date])
+
+    await db.commit()
     return {
         "message": "Steps saved",
+        "saved": len(rows),
+        "entries": [
+            {
+                "date": row["activity_date"],
+                "steps": row["steps"],
+                "points": row["points"]
+            }
+            for row in rows
+        ]
+    }
+
+
+@router.post("/log", response_model=ActivityResponse)
+async def log_activity(
+    data: ActivityCreate,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # One entry per day, scored with its junk intake; a second entry
+    # for the same date is refused rather than merged
+    try:
+        activity = await log_daily_activity(db, user.id, data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "activity_date": activity.activity_date,
         "steps": activity.steps,
-        "date": activity.activity_date
+        "junk_type": activity.junk_type,
+        "junk_quantity": activity.junk_quantity,
+        "points": activity.points
     }
 
 
 @router.get("/junk-limits")
-def get_user_junk_limits(
-    db: Session = Depends(get_db),
+async def get_user_junk_limits(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
-    limits = (
-        db.query(UserJunkLimit)
-        .filter(UserJunkLimit.user_id == user.id)
-        .all()
-    )
+    # Served from the per-user cache; one query when it is cold
+    version, limits = await get_junk_limits(db, user.id)
+    etag = make_etag("junk-limits", user.id, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-    
     if not limits:
-        defaults = [
-            UserJunkLimit(user_id=user.id, junk_type="low", max_quantity=2),
-            UserJunkLimit(user_id=user.id, junk_type="medium", max_quantity=1),
-            UserJunkLimit(user_id=user.id, junk_type="high", max_quantity=1),
+        # Defaults stand in for "never set", so the version stays put
+        await create_default_junk_limits(db, user.id)
+        limits = DEFAULT_JUNK_LIMITS
+
+    set_etag(response, etag)
+    return {
+        "limits": [
+            {
+                "junk_type": junk_type,
+                "max_quantity": max_quantity,
+            }
+            for junk_type, max_quantity in limits.items()
         ]
-        db.add_all(defaults)
-        db.commit()
-        limits = defaults
+    }
+
+
+@router.put("/junk-limits", response_model=JunkLimitListResponse)
+async def replace_user_junk_limits(
+    data: JunkLimitsUpdate,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    # The whole set: types left out are removed
+    limits = {limit.junk_type: limit.max_quantity for limit in data.limits}
+    version = await replace_junk_limits(db, user.id, limits)
+
+    set_etag(response, make_etag("junk-limits", user.id, version))
     return {
         "limits": [
             {
-                "junk_type": l.junk_type,
-                "max_quantity": l.max_quantity,
+                "junk_type": junk_type,
+                "max_quantity": max_quantity,
             }
-            for l in limits
+            for junk_type, max_quantity in limits.items()
         ]
     }
+
+
+@router.get("/history")
+async def get_activity_history_page(
+    limit: int = Query(50, ge=1, le=200),
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    try:
+        before = decode_cursor(cursor) if cursor else None
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # Newest first, one index range scan per page however deep it is
+    rows, last = await get_activity_history(db, user.id, limit, start, end, before)
+    return json_response({
+        "items": [
+            {
+                "id": row_id,
+                "date": activity_date,
+                "steps": steps,
+                "junk_type": junk_type,
+                "junk_quantity": junk_quantity,
+                "points": points
+            }
+            for activity_date, row_id, steps, junk_type, junk_quantity, points in rows
+        ],
+        "next_cursor": encode_cursor(last) if last else None
+    })
@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, Header
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy import inspect, select
 import logging
+import os
 
-from database import SessionLocal
+from crud.ranking import record_new_user, touch_rank_indexes
+from database import get_db
 from models.user import User
-from models.activity import DailyActivity
 from models.streak import Streak
+from models.user_stats import UserStats
 from schemas import (
     RegisterRequest,
     LoginRequest,
@@ -16,33 +19,46 @@ from schemas import (
     UserProfileUpdate
 )
 from utils.security import (
+    HashingBusy,
     hash_password,
-    verify_password,
+    verify_and_update_password,
     create_access_token,
     create_refresh_token,
     decode_token
 )
+from utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 # -------------------------
-# DATABASE DEPENDENCY
+# CURRENT USER CACHE
 # -------------------------
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Detached User snapshots keyed by the JWT subject; hit/miss
+# counters are available through user_cache.stats()
+user_cache = TTLCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+)
+
+
+def _detached_copy(user: User) -> User:
+    # A fresh instance not owned by any session, so every request
+    # can merge it into its own session without sharing state
+    copy = User(**{
+        attr.key: getattr(user, attr.key)
+        for attr in inspect(User).column_attrs
+    })
+    make_transient_to_detached(copy)
+    return copy
 
 # -------------------------
 # CURRENT USER DEPENDENCY
 # -------------------------
-def get_current_user(
+async def get_current_user(
     authorization: str = Header(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> User:
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Missing or invalid token")
@@ -54,35 +70,54 @@ def get_current_user(
         raise HTTPException(status_code=401, detail="Invalid access token")
 
     user_id = payload.get("sub")
-    user = db.query(User).filter(User.id == user_id).first()
+
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        # load=False attaches the snapshot without a SELECT
+        return await db.merge(cached, load=False)
+
+    user = await db.scalar(select(User).where(User.id == user_id))
 
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
+    user_cache.set(user_id, _detached_copy(user))
     return user
 
+def _server_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Server busy, please retry",
+        headers={"Retry-After": "1"}
+    )
+
 # -------------------------
 # REGISTER
 # -------------------------
 @router.post("/register", response_model=TokenResponse)
-def register(data: RegisterRequest, db: Session = Depends(get_db)):
-    if db.query(User).filter(User.email == data.email).first():
+async def register(data: RegisterRequest, db: AsyncSession = Depends(get_db)):
+    if await db.scalar(select(User.id).where(User.email == data.email)):
         raise HTTPException(status_code=400, detail="Email already exists")
 
-    if db.query(User).filter(User.username == data.username).first():
+    if await db.scalar(select(User.id).where(User.username == data.username)):
         raise HTTPException(status_code=400, detail="Username already exists")
 
+    try:
+        password_hash = await hash_password(data.password)
+    except HashingBusy:
+        raise _server_busy()
+
     user = User(
         email=data.email,
         username=data.username,
-        password_hash=hash_password(data.password),
+        password_hash=password_hash,
         bio="",
         avatar_url=None
     )
 
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
 
     # Initialize streak
     db.add(
@@ -93,7 +128,11 @@ def register(data: RegisterRequest, db: Session = Depends(get_db)):
             last_active_date=None
         )
     )
-    db.commit()
+    # Initialize leaderboard stats
+    db.add(UserStats(user_id=user.id))
+    await db.commit()
+    # Loaded leaderboards list every user, so they gain this one at 0
+    record_new_user(user.id)
 
     logger.info(f"User registered: {user.username}")
 
@@ -109,12 +148,26 @@ def register(data: RegisterRequest, db: Session = Depends(get_db)):
 # LOGIN
 # -------------------------
 @router.post("/login", response_model=TokenResponse)
-def login(data: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == data.email).first()
+async def login(data: LoginRequest, db: AsyncSession = Depends(get_db)):
+    user = await db.scalar(select(User).where(User.email == data.email))
 
-    if not user or not verify_password(data.password, user.password_hash):
+    if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    try:
+        valid, new_hash = await verify_and_update_password(data.password, user.password_hash)
+    except HashingBusy:
+        raise _server_busy()
+
+    if not valid:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    # Transparently move old hashes to the current Argon2 parameters
+    if new_hash:
+        user.password_hash = new_hash
+        await db.commit()
+        user_cache.invalidate(user.id)
+
     logger.info(f"User logged in: {user.username}")
 
     return {
@@ -129,16 +182,16 @@ def login(data: LoginRequest, db: Session = Depends(get_db)):
 # REFRESH TOKEN
 # -------------------------
 @router.post("/refresh", response_model=TokenResponse)
-def refresh_access_token(
+async def refresh_access_token(
     data: RefreshTokenRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     payload = decode_token(data.refresh_token)
 
     if not payload or payload.get("type") != "refresh":
         raise HTTPException(status_code=401, detail="Invalid refresh token")
 
-    user = db.query(User).filter(User.id == payload.get("sub")).first()
+    user = await db.scalar(select(User).where(User.id == payload.get("sub")))
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
@@ -154,18 +207,15 @@ def refresh_access_token(
 # GET PROFILE
 # -------------------------
 @router.get("/profile", response_model=UserProfileResponse)
-def get_profile(
+async def get_profile(
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    total_points = (
-        db.query(func.sum(DailyActivity.points))
-        .filter(DailyActivity.user_id == user.id)
-        .scalar()
-        or 0
-    )
+    # Running total kept by every daily activity write
+    stats = await db.get(UserStats, user.id)
+    total_points = stats.activity_points if stats else 0
 
-    streak = db.query(Streak).filter(Streak.user_id == user.id).first()
+    streak = await db.get(Streak, user.id)
 
     return {
         "user_id": user.id,
@@ -183,10 +233,10 @@ def get_profile(
 # UPDATE PROFILE
 # -------------------------
 @router.put("/profile", response_model=UserProfileResponse)
-def update_profile(
+async def update_profile(
     data: UserProfileUpdate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     if data.bio is not None:
         user.bio = data.bio
@@ -194,17 +244,17 @@ def update_profile(
     if data.avatar_url is not None:
         user.avatar_url = data.avatar_url
 
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    user_cache.invalidate(user.id)
+    # Avatars are shown on leaderboard pages
+    touch_rank_indexes()
 
-    total_points = (
-        db.query(func.sum(DailyActivity.points))
-        .filter(DailyActivity.user_id == user.id)
-        .scalar()
-        or 0
-    )
+    # Running total kept by every daily activity write
+    stats = await db.get(UserStats, user.id)
+    total_points = stats.activity_points if stats else 0
 
-    streak = db.query(Streak).filter(Streak.user_id == user.id).first()
+    streak = await db.get(Streak, user.id)
 
     return {
         "user_id": user.id,
@@ -0,0 +1,39 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from crud.junk import junk_limits_cache
+from database import pool_stats
+from routes.auth import user_cache
+from utils.metrics import registry
+from utils.security import token_cache
+
+router = APIRouter(tags=["Metrics"])
+
+# -------------------------
+# SCRAPE-TIME GAUGES
+# -------------------------
+registry.gauge(
+    "db_pool",
+    "Connection pool state and checkout counters (see database.pool_stats)",
+    labels=("stat",),
+    read=lambda: {(name,): value for name, value in pool_stats().items()}
+)
+registry.gauge(
+    "cache",
+    "In-process cache size and hit/miss counts",
+    labels=("cache", "stat"),
+    read=lambda: {
+        (name, stat): value
+        for name, cache in (("user", user_cache), ("token", token_cache), ("junk_limits", junk_limits_cache))
+        for stat, value in cache.stats().items()
+    }
+)
+
+# -------------------------
+# PROMETHEUS SCRAPE
+# -------------------------
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(
+        registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
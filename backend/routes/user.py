@@ -1,63 +1,79 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from calendar import monthrange
+from datetime import date, timedelta
+from typing import Optional
 from models.workout import WorkoutPlan, WorkoutCompletion
 from models.user import User 
 from models.streak import Streak
-from schemas import WorkoutPlanUpdate, WorkoutPlanResponse, WorkoutCompletionUpdate, WorkoutCompletionResponse, LeaderboardResponse
+from models.user_stats import UserStats
+from models.rollup import PointsRollup
+from schemas import WorkoutPlanUpdate, WorkoutPlanResponse, WorkoutCompletionUpdate, WorkoutCompletionResponse, LeaderboardResponse, LeaderboardMeResponse
 from routes.auth import get_current_user
-from database import SessionLocal
+from database import SessionLocal, get_db
+from crud.export import EXPORT_FORMATS, EXPORT_MEDIA_TYPES, stream_export
+from crud.history import get_workout_history
+from crud.dashboard import dashboard_version, get_dashboard_data
+from crud.rollups import BUCKETS, apply_rollups, get_points_history
+from crud.ranking import WINDOWS, get_rank_index, get_ranked_users, get_window_points, leaderboard_version, record_workout_points
+from crud.stats import apply_workout_completion, lock_user_stats
+from crud.upsert import upsert
+from utils.etag import etag_headers, etag_matches, make_etag, not_modified, set_etag
+from utils.pagination import InvalidCursor, decode_cursor, encode_cursor
+from utils.responses import json_response
 
 router = APIRouter(prefix="/user", tags=["User"])
 
-# -------------------------
-# DB DEPENDENCY
-# -------------------------
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # -------------------------
 # GET WORKOUT PLAN
 # -------------------------
 @router.get("/workout-plan", response_model=WorkoutPlanResponse)
-def get_workout_plan(
+async def get_workout_plan(
+    request: Request,
+    response: Response,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    plan = db.query(WorkoutPlan).filter(
-        WorkoutPlan.user_id == user.id
-    ).first()
+    if request.headers.get("if-none-match"):
+        # Revalidation reads the version stamp only
+        version = await db.scalar(select(WorkoutPlan.version).where(
+            WorkoutPlan.user_id == user.id
+        ))
+        etag = make_etag("workout-plan", user.id, version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
 
-    if not plan:
-        return {"workout_plan": {}}
+    row = (await db.execute(select(WorkoutPlan.plan, WorkoutPlan.version).where(
+        WorkoutPlan.user_id == user.id
+    ))).first()
+    plan, version = row if row else ({}, None)
 
-    return {"workout_plan": plan.plan}
+    set_etag(response, make_etag("workout-plan", user.id, version))
+    return {"workout_plan": plan}
 
 # -------------------------
 # SAVE / UPDATE WORKOUT PLAN
 # -------------------------
 @router.put("/workout-plan")
-def save_workout_plan(
+async def save_workout_plan(
     data: WorkoutPlanUpdate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     serialized_plan = {
         day: workout.model_dump()
         for day, workout in data.workout_plan.items()
     }
 
-    existing = db.query(WorkoutPlan).filter(
+    existing = await db.scalar(select(WorkoutPlan).where(
         WorkoutPlan.user_id == user.id
-    ).first()
+    ))
 
     if existing:
         existing.plan = serialized_plan
+        existing.version = WorkoutPlan.version + 1
     else:
         db.add(
             WorkoutPlan(
@@ -66,7 +82,7 @@ def save_workout_plan(
             )
         )
 
-    db.commit()
+    await db.commit()
 
     return {"message": "Workout plan saved successfully"}
 
@@ -74,15 +90,15 @@ def save_workout_plan(
 # GET TODAY'S WORKOUT COMPLETION
 # -------------------------
 @router.get("/workout-completion", response_model=WorkoutCompletionResponse)
-def get_workout_completion(
+async def get_workout_completion(
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     today = date.today()
-    completion = db.query(WorkoutCompletion).filter(
+    completion = await db.scalar(select(WorkoutCompletion).where(
         WorkoutCompletion.user_id == user.id,
         WorkoutCompletion.completion_date == today
-    ).first()
+    ))
 
     if not completion:
         return {"completed_exercises": {}}
@@ -93,161 +109,230 @@ def get_workout_completion(
 # SAVE TODAY'S WORKOUT COMPLETION
 # -------------------------
 @router.put("/workout-completion")
-def save_workout_completion(
-    data: dict,
+async def save_workout_completion(
+    data: WorkoutCompletionUpdate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     today = date.today()
-    completed = data.get("completed_exercises", {})
-    points = data.get("points", 0)
+    completed = data.completed_exercises
+    points = data.points
     # Always set day_of_week
     day_of_week = today.strftime("%A").lower()  # e.g. 'monday'
-    record = db.query(WorkoutCompletion).filter_by(
-        user_id=user.id,
-        completion_date=today
-    ).first()
-    if record:
-        record.completed_exercises = completed
-        record.points_awarded = points
-        record.day_of_week = day_of_week
-    else:
-        record = WorkoutCompletion(
-            user_id=user.id,
-            completion_date=today,
-            day_of_week=day_of_week,
-            completed_exercises=completed,
-            points_awarded=points
-        )
-        db.add(record)
-    db.commit()
+
+    # Concurrent saves for this user queue here, so the previous
+    # points read below cannot go stale before the upsert
+    stats = await lock_user_stats(db, user.id)
+    old_points = await db.scalar(select(WorkoutCompletion.points_awarded).where(
+        WorkoutCompletion.user_id == user.id,
+        WorkoutCompletion.completion_date == today
+    )) or 0
+
+    await db.execute(upsert(
+        db,
+        WorkoutCompletion,
+        {
+            "user_id": user.id,
+            "completion_date": today,
+            "day_of_week": day_of_week,
+            "completed_exercises": completed,
+            "points_awarded": points,
+            "version": 1
+        },
+        index_elements=["user_id", "completion_date"],
+        update_columns=["day_of_week", "completed_exercises", "points_awarded"],
+        increment_columns=["version"]
+    ))
+    # Keep the leaderboard aggregate in the same transaction
+    await apply_workout_completion(db, user.id, today, old_points, points, stats=stats)
+    await apply_rollups(db, [(user.id, today, {"workout_points": points - old_points})])
+    await db.commit()
+    # Only committed points reach the in-memory rankings
+    record_workout_points(user.id, today, points - old_points)
     return {
         "points_awarded": points
     }
 
 
 @router.get("/points-summary")
-def get_points_summary(
+async def get_points_summary(
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    total = db.query(func.sum(WorkoutCompletion.points_awarded))\
-              .filter(WorkoutCompletion.user_id == user.id)\
-              .scalar() or 0
+    stats = await db.get(UserStats, user.id)
+    today = await db.get(PointsRollup, (user.id, "day", date.today()))
 
     return {
-        "total_points": total,
-        "today_points": 0  # extend later
+        "total_points": stats.workout_points if stats else 0,
+        "today_points": today.workout_points if today else 0
     }
 
+@router.get("/points-history")
+async def get_user_points_history(
+    bucket: str = Query("day", pattern=f"^({'|'.join(BUCKETS)})$"),
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    end = end or date.today()
+    # A year back, or as far as the calendar goes
+    start = start or end - min(timedelta(days=365), end - date.min)
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+    # One range scan over the (user_id, bucket, bucket_start) key
+    rows = await get_points_history(db, user.id, bucket, start, end)
+    return json_response({
+        "bucket": bucket,
+        "from": start,
+        "to": end,
+        "history": [
+            {
+                "start": bucket_start,
+                "steps": steps,
+                "activity_points": activity_points,
+                "workout_points": workout_points
+            }
+            for bucket_start, steps, activity_points, workout_points in rows
+        ]
+    })
+
+@router.get("/workout-history")
+async def get_user_workout_history(
+    limit: int = Query(50, ge=1, le=200),
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+    cursor: Optional[str] = None,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    try:
+        before = decode_cursor(cursor) if cursor else None
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # Keyset page over the (user_id, completion_date) key, newest first
+    rows, last = await get_workout_history(db, user.id, limit, start, end, before)
+    return json_response({
+        "items": [
+            {
+                "id": row_id,
+                "date": completion_date,
+                "day_of_week": day_of_week,
+                "completed_exercises": completed_exercises,
+                "points": points_awarded
+            }
+            for completion_date, row_id, day_of_week, completed_exercises, points_awarded in rows
+        ],
+        "next_cursor": encode_cursor(last) if last else None
+    })
+
 @router.get("/leaderboard", response_model=LeaderboardResponse)
-def get_leaderboard(db: Session = Depends(get_db)):
-    users = db.query(User).all()
+async def get_leaderboard(
+    request: Request,
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    window: str = Query("all", pattern=f"^({'|'.join(WINDOWS)})$"),
+    db: AsyncSession = Depends(get_db)
+):
+    index = await get_rank_index(db, window)
 
-    points_map = dict(
-        db.query(
-            WorkoutCompletion.user_id,
-            func.sum(WorkoutCompletion.points_awarded)
-        )
-        .group_by(WorkoutCompletion.user_id)
-        .all()
-    )
+    # Taken before the page is read, so a racing write can only make
+    # the ETag older than the body, never newer
+    etag = make_etag("leaderboard", *leaderboard_version(index, window, offset, limit))
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-    completions = db.query(WorkoutCompletion)\
-        .filter(WorkoutCompletion.points_awarded > 0)\
-        .order_by(WorkoutCompletion.user_id, WorkoutCompletion.completion_date)\
-        .all()
-
-    streaks = {}
-
-    for c in completions:
-        uid = c.user_id
-        if uid not in streaks:
-            streaks[uid] = {"current": 1, "longest": 1, "last": c.completion_date}
-        else:
-            last = streaks[uid]["last"]
-            if (c.completion_date - last).days == 1:
-                streaks[uid]["current"] += 1
-            else:
-                streaks[uid]["current"] = 1
-
-            streaks[uid]["longest"] = max(
-                streaks[uid]["longest"],
-                streaks[uid]["current"]
-            )
-            streaks[uid]["last"] = c.completion_date
+    # Assembled in the documented shape already, so skip re-validation
+    return json_response({
+        "leaderboard": await get_ranked_users(db, index.page(offset, limit))
+    }, headers=etag_headers(etag))
+
+@router.get("/leaderboard/me", response_model=LeaderboardMeResponse)
+async def get_my_leaderboard_position(
+    k: int = Query(5, ge=0, le=50),
+    window: str = Query("all", pattern=f"^({'|'.join(WINDOWS)})$"),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    index = await get_rank_index(db, window)
 
-    leaderboard = []
+    position = index.around(user.id, k)
+    if position is None:
+        # Registered through another worker since the last reload; their
+        # stored points may already include saves made there
+        index.setdefault(user.id, await get_window_points(db, user.id, window, index))
+        position = index.around(user.id, k)
+    rank, points, neighbours = position
+
+    return json_response({
+        "window": window,
+        "rank": rank,
+        "points": points,
+        "total_users": len(index),
+        "neighbours": await get_ranked_users(db, neighbours)
+    })
 
-    for user in users:
-        leaderboard.append({
-            "user_id": user.id,
-            "username": user.username,
-            "avatar_url": user.avatar_url,
-            "points": points_map.get(user.id, 0),
-            "highest_streak": streaks.get(user.id, {}).get("longest", 0)
-        })
-
-    leaderboard.sort(key=lambda x: x["points"], reverse=True)
-    return {"leaderboard": leaderboard}
 @router.get("/streak-calendar")
-def get_streak_calendar(
+async def get_streak_calendar(
+    month: Optional[int] = Query(None, ge=1, le=12),
+    year: Optional[int] = Query(None, ge=1, le=9999),
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    # Fetch all completions for this user, ordered by date
-    completions = db.query(WorkoutCompletion).filter_by(user_id=user.id).order_by(WorkoutCompletion.completion_date).all()
-    calendar = []
-    current_streak = 0
-    longest_streak = 0
-    temp_streak = 0
-    total_active_days = 0
-    total_points = 0
-    last_completed = None
-    for c in completions:
-        is_active = c.points_awarded > 0
-        calendar.append({
-            "date": c.completion_date.isoformat(),
-            "points": c.points_awarded,
-            "completed": is_active
-        })
-        if is_active:
-            total_active_days += 1
-            total_points += c.points_awarded
-            if last_completed is None or (c.completion_date - last_completed).days == 1:
-                temp_streak += 1
-            else:
-                temp_streak = 1
-            longest_streak = max(longest_streak, temp_streak)
-            last_completed = c.completion_date
-        else:
-            temp_streak = 0
-    # Calculate current streak from the end
-    current_streak = 0
-    for c in reversed(completions):
-        if c.points_awarded > 0:
-            if last_completed and (last_completed - c.completion_date).days <= 1:
-                current_streak += 1
-                last_completed = c.completion_date
-            elif last_completed is None:
-                current_streak += 1
-                last_completed = c.completion_date
-            else:
-                break
-    return {
+    today = date.today()
+    month = month or today.month
+    year = year or today.year
+
+    # Only the requested month is read, via (user_id, completion_date)
+    # The month's last day, so December 9999 needs no date after it
+    start = date(year, month, 1)
+    end = date(year, month, monthrange(year, month)[1])
+    completions = await db.execute(select(
+        WorkoutCompletion.completion_date,
+        WorkoutCompletion.points_awarded
+    ).where(
+        WorkoutCompletion.user_id == user.id,
+        WorkoutCompletion.completion_date >= start,
+        WorkoutCompletion.completion_date <= end
+    ).order_by(WorkoutCompletion.completion_date))
+
+    calendar = [
+        {
+            "date": completion_date.isoformat(),
+            "points": points_awarded,
+            "completed": points_awarded > 0
+        }
+        for completion_date, points_awarded in completions
+    ]
+
+    # Totals come from the persisted summary, not from history
+    stats = await db.get(UserStats, user.id)
+    return json_response({
         "calendar": calendar,
-        "currentStreak": current_streak,
-        "longestStreak": longest_streak,
-        "totalActiveDays": total_active_days,
-        "totalPoints": total_points
-    }
+        "currentStreak": stats.workout_streak if stats else 0,
+        "longestStreak": stats.longest_workout_streak if stats else 0,
+        "totalActiveDays": stats.workout_active_days if stats else 0,
+        "totalPoints": stats.workout_active_points if stats else 0
+    })
 
 @router.get("/dashboard-summary")
-def get_dashboard_summary(
+async def get_dashboard_summary(
+    request: Request,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     today = date.today()
+    if request.headers.get("if-none-match"):
+        # Revalidation reads the version stamps only
+        versions = await get_dashboard_data(db, user.id, today, full=False)
+        etag = make_etag("dashboard", *dashboard_version(user, today, versions))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
     # Profile (minimal)
     profile = {
         "user_id": user.id,
@@ -256,26 +341,34 @@ def get_dashboard_summary(
         "avatar_url": user.avatar_url,
         "bio": user.bio,
     }
-    # Workout plan
-    plan_obj = db.query(WorkoutPlan).filter(WorkoutPlan.user_id == user.id).first()
-    workout_plan = plan_obj.plan if plan_obj else {}
-    # Today's completion
-    completion = db.query(WorkoutCompletion).filter(
-        WorkoutCompletion.user_id == user.id,
-        WorkoutCompletion.completion_date == today
-    ).first()
-    completed_exercises = completion.completed_exercises if completion else {}
-    today_points = completion.points_awarded if completion else 0
-    # Points summary
-    total_points = db.query(func.sum(WorkoutCompletion.points_awarded))\
-        .filter(WorkoutCompletion.user_id == user.id)\
-        .scalar() or 0
-    return {
+    # Plan, today's completion and the running total in one round trip
+    data = await get_dashboard_data(db, user.id, today)
+    etag = make_etag("dashboard", *dashboard_version(user, today, data))
+    return json_response({
         "profile": profile,
-        "workout_plan": workout_plan,
-        "completed_exercises": completed_exercises,
+        "workout_plan": data.workout_plan or {},
+        "completed_exercises": data.completed_exercises or {},
         "points_summary": {
-            "total_points": total_points,
-            "today_points": today_points
+            "total_points": data.total_points or 0,
+            "today_points": data.today_points or 0
         }
-    }
\ No newline at end of file
+    }, headers=etag_headers(etag))
+
+
+@router.get("/export")
+async def export_user_history(
+    fmt: str = Query("ndjson", alias="format", pattern=f"^({'|'.join(EXPORT_FORMATS)})$"),
+    user: User = Depends(get_current_user)
+):
+    # The body outlives this handler, so it reads through its own
+    # session; gzip is applied per chunk for clients that accept it
+    async def body():
+        async with SessionLocal() as db:
+            async for chunk in stream_export(db, fmt, user.id):
+                yield chunk
+
+    return StreamingResponse(
+        body(),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="ritual-export.{fmt}"'}
+    )
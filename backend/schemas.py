@@ -68,10 +68,44 @@ class UserProfileResponse(BaseModel):
 # -------------------------
 # JUNK LIMIT SCHEMAS
 # -------------------------
+JUNK_LIMITS_MAX_TYPES = 20
+
+
 class JunkLimitCreate(BaseModel):
     junk_type: str
     max_quantity: int
 
+    @field_validator('junk_type')
+    @classmethod
+    def validate_junk_type(cls, v):
+        v = v.strip().lower()
+        if not v or len(v) > 32:
+            raise ValueError('Junk type must be 1 to 32 characters')
+        return v
+
+    @field_validator('max_quantity')
+    @classmethod
+    def validate_max_quantity(cls, v):
+        if v < 0:
+            raise ValueError('Max quantity cannot be negative')
+        return v
+
+
+class JunkLimitsUpdate(BaseModel):
+    limits: List[JunkLimitCreate]
+
+    @field_validator('limits')
+    @classmethod
+    def validate_limits(cls, v):
+        if not v:
+            raise ValueError('At least one limit is required')
+        if len(v) > JUNK_LIMITS_MAX_TYPES:
+            raise ValueError(f'At most {JUNK_LIMITS_MAX_TYPES} junk types')
+        types = [limit.junk_type for limit in v]
+        if len(set(types)) != len(types):
+            raise ValueError('Duplicate junk types')
+        return v
+
 # -------------------------
 # DAILY ACTIVITY SCHEMAS
 # -------------------------
@@ -81,6 +115,55 @@ class ActivityCreate(BaseModel):
     junk_type: Optional[str] = None
     junk_quantity: int = 0
 
+    @field_validator('activity_date')
+    @classmethod
+    def validate_activity_date(cls, v):
+        if v > date.today():
+            raise ValueError('Cannot log activity for future dates')
+        return v
+
+    @field_validator('steps', 'junk_quantity')
+    @classmethod
+    def validate_counts(cls, v):
+        if v < 0:
+            raise ValueError('Counts cannot be negative')
+        return v
+
+# -------------------------
+# STEPS SYNC SCHEMAS
+# -------------------------
+STEPS_BATCH_MAX_ENTRIES = 366
+
+
+class StepsEntry(BaseModel):
+    date: date
+    steps: int
+
+    @field_validator('steps')
+    @classmethod
+    def validate_steps(cls, v):
+        if v < 0:
+            raise ValueError('Steps cannot be negative')
+        return v
+
+
+class StepsBatchRequest(BaseModel):
+    entries: List[StepsEntry]
+
+    @field_validator('entries')
+    @classmethod
+    def validate_entries(cls, v):
+        if not v:
+            raise ValueError('At least one entry is required')
+        if len(v) > STEPS_BATCH_MAX_ENTRIES:
+            raise ValueError(f'At most {STEPS_BATCH_MAX_ENTRIES} entries per batch')
+        dates = [entry.date for entry in v]
+        if len(set(dates)) != len(dates):
+            raise ValueError('Duplicate dates in batch')
+        if max(dates) > date.today():
+            raise ValueError('Cannot sync steps for future dates')
+        return v
+
 # -------------------------
 # RESPONSE SCHEMAS
 # -------------------------
@@ -112,12 +195,21 @@ class WorkoutPlanResponse(BaseModel):
     workout_plan: Dict[str, WorkoutDaySchema]
 
 class WorkoutCompletionUpdate(BaseModel):
-    completed_exercises: Dict[str, bool]
+    completed_exercises: Dict[str, bool] = {}
+    points: int = 0
+
+    @field_validator('points')
+    @classmethod
+    def validate_points(cls, v):
+        if v < 0:
+            raise ValueError('Points cannot be negative')
+        return v
 
 class WorkoutCompletionResponse(BaseModel):
     completed_exercises: Dict[str, bool]
 
 class LeaderboardUser(BaseModel):
+    rank: int
     user_id: str
     username: str
     avatar_url: Optional[str]
@@ -127,6 +219,13 @@ class LeaderboardUser(BaseModel):
 class LeaderboardResponse(BaseModel):
     leaderboard: list[LeaderboardUser]
 
+class LeaderboardMeResponse(BaseModel):
+    window: str
+    rank: int
+    points: int
+    total_users: int
+    neighbours: list[LeaderboardUser]
+
 
 # -------------------------
 # JUNK USAGE SCHEMAS
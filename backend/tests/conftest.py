@@ -0,0 +1,52 @@
+"""
+Shared fixtures. The app reads DATABASE_URL when it is imported, so
+the session points it at a fresh SQLite file before any test imports
+it; tests stay apart by registering their own users.
+
+Async tests and fixtures run on anyio's pytest plugin (anyio ships
+with Starlette), on asyncio.
+"""
+import json
+import os
+import tempfile
+import uuid
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/tests.db"
+os.environ.setdefault("HASH_POOL_SIZE", "0")
+os.environ.setdefault("SLOW_QUERY_THRESHOLD_MS", "0")
+
+import pytest
+
+PASSWORD = "hunter22"
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="module")
+async def client(anyio_backend):
+    """The app in-process, started once per module."""
+    from benchmarks.common import ASGIClient
+    from main import app
+
+    async with ASGIClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="module")
+def register(client):
+    """Register a new user; returns their tokens, email and auth headers."""
+    async def register(prefix: str = "user") -> dict:
+        name = f"{prefix}{uuid.uuid4().hex[:8]}"
+        status, data = await client.request("POST", "/auth/register", {
+            "email": f"{name}@test.io", "username": name, "password": PASSWORD
+        })
+        assert status == 200, data
+        tokens = json.loads(data)
+        tokens["email"] = f"{name}@test.io"
+        tokens["headers"] = {"Authorization": f"Bearer {tokens['access_token']}"}
+        return tokens
+
+    return register
@@ -0,0 +1,130 @@
+"""
+POST /activity/log under contention: every writer in a round submits
+the same (user, date), so exactly one must be accepted and the rest
+refused as duplicates. Afterwards each user's rows, points, stats
+total, rollups and streak must equal a sequential replay of the
+accepted entries.
+"""
+import json
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+
+import anyio
+import pytest
+from sqlalchemy import func, select
+
+from crud.stats import reconcile_user_stats
+from database import SessionLocal
+from models.activity import DailyActivity
+from models.rollup import PointsRollup
+from models.streak import Streak
+from models.user_stats import UserStats
+from utils.points import calculate_points
+from utils.streaks import update_streak
+
+pytestmark = pytest.mark.anyio
+
+USERS = 3
+DAYS = 5
+WRITERS = 6
+JUNK_LIMITS = {"low": 2, "medium": 1, "high": 0}
+
+
+async def test_log_activity_rejects_duplicates_and_future_dates(client, register):
+    tokens = await register("log")
+    entry = {"activity_date": date.today().isoformat(), "steps": 8000, "junk_type": "low", "junk_quantity": 1}
+
+    status, data = await client.request("POST", "/activity/log", entry, tokens["headers"])
+    assert status == 200, data
+    assert json.loads(data)["points"] == calculate_points(steps=8000, junk_quantity=1, max_allowed=0)
+
+    status, data = await client.request("POST", "/activity/log", entry, tokens["headers"])
+    assert status == 400
+    assert json.loads(data)["detail"] == "Activity already logged for this date"
+
+    for bad in ({"activity_date": (date.today() + timedelta(days=1)).isoformat()}, {"steps": -1}):
+        status, _ = await client.request("POST", "/activity/log", {**entry, **bad}, tokens["headers"])
+        assert status == 422
+
+
+async def test_parallel_writers_leave_one_entry_per_day(client, register):
+    rng = random.Random(0)
+    users = {}
+    for _ in range(USERS):
+        tokens = await register("stress")
+        status, data = await client.request("PUT", "/activity/junk-limits", {"limits": [
+            {"junk_type": junk_type, "max_quantity": max_quantity}
+            for junk_type, max_quantity in JUNK_LIMITS.items()
+        ]}, tokens["headers"])
+        assert status == 200, data
+        users[tokens["user_id"]] = tokens["headers"]
+
+    accepted = defaultdict(list)
+    first_day = date.today() - timedelta(days=DAYS - 1)
+    for d in range(DAYS):
+        day = first_day + timedelta(days=d)
+        results = []
+
+        async def writer(user_id, entry):
+            status, data = await client.request("POST", "/activity/log", entry, users[user_id])
+            results.append((user_id, entry, status, data))
+
+        async with anyio.create_task_group() as tg:
+            for user_id in users:
+                for _ in range(WRITERS):
+                    junk_type = rng.choice([None, *JUNK_LIMITS])
+                    tg.start_soon(writer, user_id, {
+                        "activity_date": day.isoformat(),
+                        "steps": rng.randrange(12000),
+                        "junk_type": junk_type,
+                        "junk_quantity": rng.randrange(4) if junk_type else 0,
+                    })
+
+        wins = defaultdict(int)
+        for user_id, entry, status, data in results:
+            assert status in (200, 400), (user_id, day, status, data)
+            if status == 200:
+                wins[user_id] += 1
+                accepted[user_id].append(entry)
+        assert wins == {user_id: 1 for user_id in users}, day
+
+    async with SessionLocal() as db:
+        for user_id in users:
+            count, steps_total, points_total = (await db.execute(
+                select(func.count(), func.sum(DailyActivity.steps), func.sum(DailyActivity.points))
+                .where(DailyActivity.user_id == user_id)
+            )).one()
+            rollup_steps = await db.scalar(
+                select(func.sum(PointsRollup.steps))
+                .where(PointsRollup.user_id == user_id, PointsRollup.bucket == "day")
+            )
+            stats = await db.get(UserStats, user_id)
+            streak = await db.scalar(select(Streak).where(Streak.user_id == user_id))
+
+            # Sequential replay of what was accepted, in date order
+            expected = Streak(current_streak=0, longest_streak=0, last_active_date=None)
+            points = steps = 0
+            for entry in accepted[user_id]:
+                max_allowed = JUNK_LIMITS.get(entry["junk_type"], 0)
+                points += calculate_points(
+                    steps=entry["steps"],
+                    junk_quantity=entry["junk_quantity"],
+                    max_allowed=max_allowed
+                )
+                steps += entry["steps"]
+                update_streak(
+                    expected,
+                    date.fromisoformat(entry["activity_date"]),
+                    entry["steps"] >= 5000 or entry["junk_quantity"] <= max_allowed
+                )
+
+            assert (count, steps_total, points_total) == (DAYS, steps, points)
+            assert stats.activity_points == points
+            assert rollup_steps == steps
+            assert (streak.current_streak, streak.longest_streak, streak.last_active_date) == (
+                expected.current_streak, expected.longest_streak, expected.last_active_date
+            )
+
+        drift = await reconcile_user_stats(db, repair=False)
+    assert [d for d in drift if d[0] in users] == []
@@ -0,0 +1,106 @@
+"""
+Parallel /activity/steps and /user/workout-completion writes for one
+user and day, against a real server. Every write must succeed (a lost
+race surfaces as an IntegrityError and a 500), exactly one row per day
+must remain, and user_stats must agree with it.
+
+Runs on a fresh SQLite file, and on Postgres too when TEST_POSTGRES_URL
+points at a database the tests may write to.
+"""
+import asyncio
+import http.client
+import json
+import os
+import random
+import tempfile
+import threading
+import uuid
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from benchmarks.common import free_port, request, start_server, stop_server
+from conftest import PASSWORD
+from database import _async_url
+from models.activity import DailyActivity
+from models.user_stats import UserStats
+from models.workout import WorkoutCompletion
+
+# The load at which SQLite writers once outwaited a 5s busy timeout
+CLIENTS = 40
+WRITES = 20
+
+
+@pytest.fixture(scope="module", params=["sqlite", "postgres"])
+def server(request):
+    if request.param == "sqlite":
+        database_url = f"sqlite:///{tempfile.mkdtemp()}/upserts.db"
+    else:
+        database_url = os.getenv("TEST_POSTGRES_URL")
+        if not database_url:
+            pytest.skip("TEST_POSTGRES_URL is not set")
+
+    port = free_port()
+    proc = start_server(port, database_url, env={"HASH_POOL_SIZE": "0"})
+    yield database_url, port
+    stop_server(proc)
+
+
+async def stored_rows(database_url, user_id):
+    engine = create_async_engine(_async_url(database_url))
+    try:
+        async with async_sessionmaker(engine)() as db:
+            activity_rows = await db.scalar(
+                select(func.count()).select_from(DailyActivity).where(DailyActivity.user_id == user_id)
+            )
+            completions = (await db.scalars(
+                select(WorkoutCompletion.points_awarded).where(WorkoutCompletion.user_id == user_id)
+            )).all()
+            stats = await db.get(UserStats, user_id)
+    finally:
+        await engine.dispose()
+    return activity_rows, completions, stats
+
+
+def test_concurrent_writers_keep_one_row_per_day(server):
+    database_url, port = server
+    name = f"race{uuid.uuid4().hex[:8]}"
+    status, data, _ = request(http.client.HTTPConnection("127.0.0.1", port), "POST", "/auth/register", {
+        "email": f"{name}@test.io", "username": name, "password": PASSWORD
+    })
+    assert status == 200, data
+    body = json.loads(data)
+    auth = {"Authorization": f"Bearer {body['access_token']}"}
+
+    failures = []
+
+    def writer(n):
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        for i in range(WRITES):
+            points = random.choice([0, 5, 10, 20])
+            status, data, _ = request(conn, "PUT", "/user/workout-completion", {
+                "completed_exercises": {"monday-0": points > 0},
+                "points": points
+            }, headers=auth)
+            if status != 200:
+                failures.append((status, data[:200]))
+            status, data, _ = request(conn, "POST", f"/activity/steps?steps={n * 1000 + i}", headers=auth)
+            if status != 200:
+                failures.append((status, data[:200]))
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(CLIENTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not failures, f"{len(failures)} failed writes, e.g. {failures[:3]}"
+
+    activity_rows, completions, stats = asyncio.run(stored_rows(database_url, body["user_id"]))
+    assert activity_rows == 1
+    assert len(completions) == 1
+    points = completions[0]
+    assert stats.workout_points == points
+    assert stats.workout_active_points == max(points, 0)
+    assert stats.workout_active_days == (1 if points > 0 else 0)
+    assert stats.workout_streak == (1 if points > 0 else 0)
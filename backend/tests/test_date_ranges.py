@@ -0,0 +1,43 @@
+"""
+Date-range query parameters at the edges of the calendar answer with a
+result or a 4xx, never a 500.
+"""
+import json
+from datetime import date
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(scope="module")
+async def dated_user(register):
+    return await register("dates")
+
+
+@pytest.mark.parametrize("query", ["month=12&year=9999", "month=1&year=1", "month=2&year=2024"])
+async def test_streak_calendar_at_calendar_edges(client, dated_user, query):
+    status, data = await client.request("GET", f"/user/streak-calendar?{query}", None, dated_user["headers"])
+    assert status == 200, data
+    assert json.loads(data)["calendar"] == []
+
+
+async def test_streak_calendar_includes_the_months_days(client, dated_user):
+    status, data = await client.request("PUT", "/user/workout-completion", {
+        "completed_exercises": {"monday-0": True}, "points": 10
+    }, dated_user["headers"])
+    assert status == 200, data
+
+    today = date.today()
+    status, data = await client.request(
+        "GET", f"/user/streak-calendar?month={today.month}&year={today.year}", None, dated_user["headers"]
+    )
+    assert status == 200, data
+    assert [day["date"] for day in json.loads(data)["calendar"]] == [today.isoformat()]
+
+
+@pytest.mark.parametrize("query", ["to=0001-06-01", "from=0001-01-01&to=0001-01-01&bucket=week", "to=9999-12-31&bucket=month"])
+async def test_points_history_at_calendar_edges(client, dated_user, query):
+    status, data = await client.request("GET", f"/user/points-history?{query}", None, dated_user["headers"])
+    assert status == 200, data
+    assert json.loads(data)["history"] == []
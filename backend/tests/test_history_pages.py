@@ -0,0 +1,100 @@
+"""
+Keyset pagination of /activity/history and /user/workout-history:
+walking every page returns each of the user's rows exactly once,
+newest first, whatever the page size, even when other users and
+re-synced days share the same dates.
+"""
+import json
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from database import SessionLocal
+from models.activity import DailyActivity
+from models.workout import WorkoutCompletion
+
+pytestmark = pytest.mark.anyio
+
+# Thirty days back with a gap every fourth day
+DAYS = [date.today() - timedelta(days=back) for back in range(30) if back % 4 != 3]
+
+HISTORIES = [
+    ("/activity/history", DailyActivity.id, DailyActivity.user_id, DailyActivity.activity_date),
+    ("/user/workout-history", WorkoutCompletion.id, WorkoutCompletion.user_id, WorkoutCompletion.completion_date),
+]
+
+
+async def seed_history(client, register):
+    tokens = await register("pages")
+    entries = [{"date": day.isoformat(), "steps": 6000} for day in DAYS]
+    # The second sync repeats half the dates; they must update, not duplicate
+    for batch in (entries, entries[::2]):
+        status, data = await client.request("POST", "/activity/steps/batch", {"entries": batch}, tokens["headers"])
+        assert status == 200, data
+
+    async with SessionLocal() as db:
+        db.add_all(
+            WorkoutCompletion(
+                user_id=tokens["user_id"],
+                completion_date=day,
+                day_of_week=day.strftime("%A").lower(),
+                completed_exercises={},
+                points_awarded=10
+            )
+            for day in DAYS
+        )
+        await db.commit()
+    return tokens
+
+
+@pytest.fixture(scope="module")
+async def paged_user(client, register):
+    # A neighbour on the same dates, whose rows must never show up
+    await seed_history(client, register)
+    return await seed_history(client, register)
+
+
+async def walk(client, url, headers, limit):
+    ids, cursor = [], None
+    while True:
+        status, data = await client.request(
+            "GET", f"{url}limit={limit}" + (f"&cursor={cursor}" if cursor else ""), None, headers
+        )
+        assert status == 200, data
+        page = json.loads(data)
+        assert len(page["items"]) <= limit
+        ids.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+async def expected_ids(user_id, id_column, user_column, date_column, *where):
+    async with SessionLocal() as db:
+        return list(await db.scalars(
+            select(id_column).where(user_column == user_id, *where).order_by(date_column.desc())
+        ))
+
+
+@pytest.mark.parametrize("limit", [1, 4, len(DAYS) - 1, len(DAYS), 200])
+@pytest.mark.parametrize("path, id_column, user_column, date_column", HISTORIES, ids=[h[0] for h in HISTORIES])
+async def test_walk_pages_every_row_once(client, paged_user, limit, path, id_column, user_column, date_column):
+    ids = await walk(client, f"{path}?", paged_user["headers"], limit)
+    assert len(ids) == len(DAYS)
+    assert ids == await expected_ids(paged_user["user_id"], id_column, user_column, date_column)
+
+
+@pytest.mark.parametrize("path, id_column, user_column, date_column", HISTORIES, ids=[h[0] for h in HISTORIES])
+async def test_walk_within_a_date_range(client, paged_user, path, id_column, user_column, date_column):
+    start, end = DAYS[20], DAYS[3]
+    ids = await walk(client, f"{path}?from={start}&to={end}&", paged_user["headers"], 3)
+    assert ids == await expected_ids(
+        paged_user["user_id"], id_column, user_column, date_column, date_column >= start, date_column <= end
+    )
+
+
+@pytest.mark.parametrize("path", [h[0] for h in HISTORIES])
+async def test_bad_cursor_is_refused(client, paged_user, path):
+    status, _ = await client.request("GET", f"{path}?cursor=not-a-cursor", None, paged_user["headers"])
+    assert status == 400
@@ -0,0 +1,51 @@
+"""
+A fresh database migrated from the frozen baseline must end up with
+the schema the models declare, so a model change without its migration
+fails here.
+"""
+import tempfile
+
+from sqlalchemy import create_engine, inspect
+
+import migrations
+from database import Base
+
+
+def schema(url) -> dict:
+    engine = create_engine(url)
+    inspector = inspect(engine)
+    tables = {}
+    for table in Base.metadata.sorted_tables:
+        tables[table.name] = {
+            "columns": {c["name"]: c["nullable"] for c in inspector.get_columns(table.name)},
+            "primary_key": inspector.get_pk_constraint(table.name)["constrained_columns"],
+            "indexes": sorted(
+                (i["name"], tuple(i["column_names"]), bool(i["unique"]))
+                for i in inspector.get_indexes(table.name)
+            ),
+            "unique": sorted(tuple(u["column_names"]) for u in inspector.get_unique_constraints(table.name)),
+            "foreign_keys": sorted(
+                (tuple(fk["constrained_columns"]), fk["referred_table"])
+                for fk in inspector.get_foreign_keys(table.name)
+            ),
+        }
+    engine.dispose()
+    return tables
+
+
+def test_migrations_build_the_model_schema():
+    directory = tempfile.mkdtemp()
+    migrated = f"sqlite:///{directory}/migrated.db"
+    declared = f"sqlite:///{directory}/declared.db"
+
+    engine = create_engine(migrated)
+    with engine.begin() as conn:
+        applied = migrations.upgrade(conn)
+    engine.dispose()
+    assert applied == [version for version, _ in migrations.discover()]
+
+    engine = create_engine(declared)
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    assert schema(migrated) == schema(declared)
@@ -0,0 +1,37 @@
+"""
+The NumPy rules in utils.points_vectorized must score every row exactly
+as utils.points does, since bulk rescoring trusts them in its place.
+Rows carry a junk_type resolved to max_allowed the way
+crud.junk.get_max_allowed_junk and crud.rescore do, and steps cluster
+around the rule boundaries.
+"""
+from hypothesis import given, strategies as st
+
+from crud.junk import DEFAULT_JUNK_LIMITS
+from utils.points import calculate_points
+from utils.points_vectorized import calculate_points_array
+
+# Where the rules change: nothing, 30 points, each 1k bonus, the 50 cap
+STEP_EDGES = [0, 6000, 7000, 8000, 9000, 10000]
+
+steps = st.one_of(
+    st.builds(lambda edge, offset: max(edge + offset, 0), st.sampled_from(STEP_EDGES), st.integers(-2, 2)),
+    st.integers(0, 100_000),
+)
+# Includes a type with no stored limit, which allows none
+junk_types = st.sampled_from([None, *DEFAULT_JUNK_LIMITS, "unknown"])
+limits = st.dictionaries(st.sampled_from(list(DEFAULT_JUNK_LIMITS)), st.integers(0, 10))
+rows = st.lists(st.tuples(steps, junk_types, st.integers(0, 20)), min_size=1, max_size=50)
+
+
+@given(rows=rows, limits=limits)
+def test_vectorized_points_match_calculate_points(rows, limits):
+    step_counts = [s for s, _, _ in rows]
+    quantities = [q for _, _, q in rows]
+    max_allowed = [limits.get(t, 0) if t else 0 for _, t, _ in rows]
+
+    scored = calculate_points_array(step_counts, quantities, max_allowed)
+
+    expected = [calculate_points(s, q, m) for s, q, m in zip(step_counts, quantities, max_allowed)]
+    assert scored.tolist() == expected
+
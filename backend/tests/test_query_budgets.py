@@ -0,0 +1,141 @@
+"""
+Pinned per-route query budgets. Every route is called in-process with
+warm caches and fails when it issues more SQL statements than its
+budget, listing them. Polled GETs are also revalidated with their ETag
+and must answer 304 within a budget of their own.
+
+A route that legitimately needs more queries gets its budget raised
+here, in the same change, so the increase is reviewed.
+"""
+import itertools
+import uuid
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import PASSWORD
+from utils.instrumentation import query_budget
+
+pytestmark = pytest.mark.anyio
+
+# (method, path, body, auth, budget); run in this order by one user
+BUDGETS = [
+    ("GET", "/health", None, False, 0),
+    ("GET", "/metrics", None, False, 0),
+    ("POST", "/auth/register", "register", False, 6),
+    ("POST", "/auth/login", "login", False, 1),
+    ("GET", "/auth/profile", None, True, 2),
+    ("PUT", "/auth/profile", {"bio": "budget"}, True, 4),
+    ("POST", "/auth/refresh", "refresh", False, 1),
+    ("GET", "/user/workout-plan", None, True, 1),
+    ("PUT", "/user/workout-plan", {"workout_plan": {"monday": {"name": "Legs", "exercises": ["Squats"]}}}, True, 2),
+    ("GET", "/user/workout-completion", None, True, 1),
+    ("PUT", "/user/workout-completion", {"completed_exercises": {"monday-0": True}, "points": 10}, True, 3),
+    ("GET", "/user/points-summary", None, True, 2),
+    ("GET", "/user/points-history?bucket=week", None, True, 1),
+    ("GET", "/user/workout-history?limit=10", None, True, 1),
+    ("GET", "/user/leaderboard", None, False, 1),
+    ("GET", "/user/leaderboard?window=week", None, False, 1),
+    ("GET", "/user/leaderboard/me", None, True, 1),
+    ("GET", "/user/streak-calendar", None, True, 2),
+    ("GET", "/user/dashboard-summary", None, True, 1),
+    # One streamed query per exported table
+    ("GET", "/user/export?format=ndjson", None, True, 5),
+    ("GET", "/user/export?format=csv", None, True, 5),
+    ("POST", "/activity/steps?steps=7000", None, True, 3),
+    ("POST", "/activity/steps/batch", "batch", True, 4),
+    ("POST", "/activity/log", "log", True, 5),
+    ("GET", "/activity/history?limit=10", None, True, 1),
+    # The warm-up call writes the defaults, which empties the cache once
+    ("GET", "/activity/junk-limits", None, True, 1),
+    ("PUT", "/activity/junk-limits", {"limits": [{"junk_type": "low", "max_quantity": 3}]}, True, 3),
+    ("GET", "/activity/junk-limits", None, True, 0),
+]
+
+# (method, path, body, auth, status, budget) for requests the warm-up
+# call makes fail, e.g. a second entry for the same day
+REFUSED = [
+    ("POST", "/activity/log", "logged", True, 400, 2),
+]
+
+# (path, auth, budget) for a revalidation with a current ETag, which
+# must answer 304 from version stamps alone
+CONDITIONAL = [
+    ("/user/workout-plan", True, 1),
+    ("/user/dashboard-summary", True, 1),
+    ("/user/leaderboard", False, 0),
+    ("/user/leaderboard?window=month&limit=10", False, 0),
+    ("/activity/junk-limits", True, 0),
+]
+
+
+def new_account():
+    name = f"budget{uuid.uuid4().hex[:8]}"
+    return {"email": f"{name}@test.io", "username": name, "password": PASSWORD}
+
+
+@pytest.fixture(scope="module")
+async def budget_user(register):
+    tokens = await register("budget")
+    today = date.today()
+    log_days = itertools.count(100)
+    # A callable gives a fresh body per call, for writes that cannot repeat
+    tokens["bodies"] = {
+        "register": new_account,
+        "login": {"email": tokens["email"], "password": PASSWORD},
+        "refresh": {"refresh_token": tokens["refresh_token"]},
+        "log": lambda: {
+            "activity_date": (today - timedelta(days=next(log_days))).isoformat(),
+            "steps": 8000, "junk_type": "low", "junk_quantity": 1
+        },
+        "logged": {"activity_date": (today - timedelta(days=99)).isoformat(), "steps": 8000},
+        "batch": {"entries": [
+            {"date": (today - timedelta(days=i)).isoformat(), "steps": 6000 + i * 100}
+            for i in range(1, 31)
+        ]},
+    }
+    return tokens
+
+
+@pytest.mark.parametrize(
+    "method, path, body, needs_auth, budget", BUDGETS,
+    ids=[f"{method} {path}" for method, path, *_ in BUDGETS]
+)
+async def test_route_within_query_budget(client, budget_user, method, path, body, needs_auth, budget):
+    body = budget_user["bodies"][body] if isinstance(body, str) else body
+    headers = budget_user["headers"] if needs_auth else None
+    # Warm caches (user, token, rank index) so counts are steady-state
+    status, data = await client.request(method, path, body() if callable(body) else body, headers)
+    assert status == 200, data
+
+    body = body() if callable(body) else body
+    with query_budget(budget, f"{method} {path}"):
+        status, data = await client.request(method, path, body, headers)
+    assert status == 200, data
+
+
+@pytest.mark.parametrize(
+    "method, path, body, needs_auth, expected, budget", REFUSED,
+    ids=[f"{method} {path} ({status})" for method, path, _, _, status, _ in REFUSED]
+)
+async def test_refusal_within_query_budget(client, budget_user, method, path, body, needs_auth, expected, budget):
+    body = budget_user["bodies"][body]
+    headers = budget_user["headers"] if needs_auth else None
+    status, data = await client.request(method, path, body, headers)
+    assert status == 200, data
+
+    with query_budget(budget, f"{method} {path} ({expected})"):
+        status, data = await client.request(method, path, body, headers)
+    assert status == expected, data
+
+
+@pytest.mark.parametrize("path, needs_auth, budget", CONDITIONAL, ids=[path for path, *_ in CONDITIONAL])
+async def test_revalidation_within_query_budget(client, budget_user, path, needs_auth, budget):
+    headers = budget_user["headers"] if needs_auth else None
+    status, _, response_headers = await client.request("GET", path, None, headers, with_headers=True)
+    assert status == 200 and "etag" in response_headers
+    headers = {**(headers or {}), "If-None-Match": response_headers["etag"]}
+
+    with query_budget(budget, f"GET {path} (304)"):
+        status, _ = await client.request("GET", path, None, headers)
+    assert status == 304
@@ -0,0 +1,111 @@
+"""
+RankIndex ordering and lookups, and a leaderboard reload racing a
+workout save.
+"""
+import pytest
+
+from crud.ranking import load_rank_index
+from database import SessionLocal
+from models.user_stats import UserStats
+from utils.rank_index import RankIndex
+
+
+def make_index(scores):
+    index = RankIndex()
+    index.replace(scores, tag="t")
+    return index
+
+
+def test_ties_share_a_rank_and_order_by_user_id():
+    index = make_index({"b": 10, "a": 10, "c": 30, "d": 5})
+    assert index.page(0, 10) == [(1, "c", 30), (2, "a", 10), (2, "b", 10), (4, "d", 5)]
+    assert index.page(1, 2) == [(2, "a", 10), (2, "b", 10)]
+    assert index.page(10, 5) == []
+
+
+def test_around_windows_the_user():
+    index = make_index({f"u{i}": i for i in range(10)})
+    rank, points, window = index.around("u5", 2)
+    assert (rank, points) == (5, 5)
+    assert [user_id for _, user_id, _ in window] == ["u7", "u6", "u5", "u4", "u3"]
+
+    rank, _, window = index.around("u9", 2)
+    assert rank == 1
+    assert [user_id for _, user_id, _ in window] == ["u9", "u8", "u7"]
+    assert index.around("missing", 2) is None
+
+
+def test_set_add_and_setdefault_move_users():
+    index = make_index({"a": 10, "b": 20})
+    version = index.version
+
+    index.add("a", 15)
+    assert index.page(0, 2) == [(1, "a", 25), (2, "b", 20)]
+    index.set("b", 30)
+    assert index.get("b") == 30
+
+    index.setdefault("b", 0)
+    assert index.get("b") == 30
+    index.setdefault("c", 0)
+    assert index.around("c", 0)[:2] == (3, 0)
+    assert len(index) == 3
+    assert index.version == version + 3
+
+
+def test_replace_discards_previous_scores():
+    index = make_index({"a": 10})
+    index.replace({"b": 5}, tag="next")
+    assert index.get("a") is None
+    assert index.page(0, 5) == [(1, "b", 5)]
+    assert index.tag == "next"
+    assert index.loaded_at is not None
+
+
+def test_changes_are_tracked_only_during_a_reload():
+    index = make_index({"a": 10})
+    index.add("a", 1)
+    assert index.take_changes() == set()
+
+    index.track_changes()
+    index.add("a", 1)
+    index.setdefault("b", 0)
+    index.note_change("c")
+    index.update({"d": 1})
+    assert index.take_changes() == {"a", "b", "c"}
+    assert index.take_changes() == set()
+    index.add("a", 1)
+    assert index.take_changes() == set()
+
+
+class SaveDuringQuery:
+    """A session that lets a save run right after the reload's query."""
+
+    def __init__(self, db, save):
+        self.db = db
+        self.save = save
+
+    async def execute(self, query):
+        result = await self.db.execute(query)
+        if self.save is not None:
+            save, self.save = self.save, None
+            await save()
+        return result
+
+
+@pytest.mark.anyio
+async def test_save_during_reload_reaches_the_new_index(client, register):
+    tokens = await register("rank")
+    status, data = await client.request("GET", "/user/leaderboard", None)
+    assert status == 200, data
+
+    async def save():
+        status, data = await client.request("PUT", "/user/workout-completion", {
+            "completed_exercises": {"monday-0": True}, "points": 20
+        }, tokens["headers"])
+        assert status == 200, data
+
+    async with SessionLocal() as db:
+        index = await load_rank_index(SaveDuringQuery(db, save), "all")
+        stored = (await db.get(UserStats, tokens["user_id"])).workout_points
+    assert stored == 20
+    assert index.get(tokens["user_id"]) == 20
@@ -0,0 +1,56 @@
+"""
+reconcile_user_stats repairs totals that drifted from history, and
+never overwrites a correct total because a write landed while it was
+scanning.
+"""
+import pytest
+from sqlalchemy import update
+
+import crud.stats
+from crud.stats import reconcile_user_stats
+from database import SessionLocal
+from models.user_stats import UserStats
+
+pytestmark = pytest.mark.anyio
+
+
+async def logged_user(client, register):
+    tokens = await register("reconcile")
+    status, data = await client.request("POST", "/activity/log", {
+        "activity_date": "2024-01-01", "steps": 8000
+    }, tokens["headers"])
+    assert status == 200, data
+    return tokens["user_id"]
+
+
+async def test_repairs_drifted_totals(client, register):
+    user_id = await logged_user(client, register)
+    async with SessionLocal() as db:
+        await db.execute(update(UserStats).where(UserStats.user_id == user_id).values(activity_points=1))
+        await db.commit()
+
+        drift = await reconcile_user_stats(db, repair=False)
+        assert (user_id, "activity_points", 1, 40) in drift
+        assert (await db.get(UserStats, user_id)).activity_points == 1
+
+        drift = await reconcile_user_stats(db)
+        assert (user_id, "activity_points", 1, 40) in drift
+        assert [d for d in await reconcile_user_stats(db, repair=False) if d[0] == user_id] == []
+
+
+async def test_write_during_scan_is_not_repaired(client, register, monkeypatch):
+    user_id = await logged_user(client, register)
+    history_totals = crud.stats._history_totals
+
+    async def stale_scan(db, uid=None):
+        # The unlocked scan summed history just before another save landed
+        totals = await history_totals(db, uid)
+        if uid is None:
+            totals[user_id]["activity_points"] -= 40
+        return totals
+
+    monkeypatch.setattr(crud.stats, "_history_totals", stale_scan)
+    async with SessionLocal() as db:
+        drift = await reconcile_user_stats(db)
+        assert [d for d in drift if d[0] == user_id] == []
+        assert (await db.get(UserStats, user_id)).activity_points == 40
@@ -0,0 +1,76 @@
+"""
+decode_token caches verified payloads; the cache must never let through
+a token that verification would refuse. Each token is decoded once to
+warm the cache before it is checked.
+"""
+import time
+from datetime import timedelta
+
+import jwt
+import pytest
+
+from utils.security import (
+    SECRET_KEY,
+    ALGORITHM,
+    create_access_token,
+    create_refresh_token,
+    decode_token
+)
+
+
+def test_expired_token_is_rejected():
+    expired = create_access_token({"sub": "u"}, expires_delta=timedelta(seconds=-1))
+    assert decode_token(expired) is None
+    assert decode_token(expired) is None
+
+
+def test_cached_token_is_rejected_once_expired():
+    short = create_access_token({"sub": "u"}, expires_delta=timedelta(seconds=1))
+    assert decode_token(short)["sub"] == "u"
+    time.sleep(1.1)
+    assert decode_token(short) is None
+
+
+def test_tampered_token_is_rejected():
+    token = create_access_token({"sub": "u"})
+    assert decode_token(token)["sub"] == "u"
+
+    # Same header and signature around another payload
+    header, _, signature = token.split(".")
+    forged_body = jwt.encode(
+        {"sub": "someone-else", "exp": jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])["exp"]},
+        "wrong-key",
+        algorithm=ALGORITHM
+    ).split(".")[1]
+    assert decode_token(f"{header}.{forged_body}.{signature}") is None
+
+    assert decode_token(token[:-2] + ("AA" if token[-2:] != "AA" else "BB")) is None
+
+
+def test_refresh_token_keeps_its_type():
+    refresh = create_refresh_token({"sub": "u"})
+    assert decode_token(refresh)["type"] == "refresh"
+    assert decode_token(refresh)["type"] == "refresh"
+
+
+def test_cached_payload_cannot_be_mutated():
+    token = create_access_token({"sub": "u"})
+    decode_token(token)["sub"] = "mutated"
+    assert decode_token(token)["sub"] == "u"
+
+
+@pytest.mark.anyio
+async def test_routes_reject_tokens_of_the_wrong_type(client, register):
+    tokens = await register("tokens")
+    status, _ = await client.request("GET", "/auth/profile", None, tokens["headers"])
+    assert status == 200
+
+    # A refresh token is not a bearer token, cached or not
+    refresh = {"Authorization": f"Bearer {tokens['refresh_token']}"}
+    for _ in range(2):
+        status, _ = await client.request("GET", "/auth/profile", None, refresh)
+        assert status == 401
+
+    # Nor is an access token a refresh token
+    status, _ = await client.request("POST", "/auth/refresh", {"refresh_token": tokens["access_token"]})
+    assert status == 401
@@ -0,0 +1,154 @@
+"""
+The workout streak engine and its verifier. Saves on any day, past
+ones included, must leave runs and streak columns equal to a full
+recompute within a fixed statement budget; verify_workout_streaks
+repairs drift, and never reverts a completion saved while it was
+scanning.
+"""
+import random
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+import crud.workout_streaks
+from crud.stats import apply_workout_completion, lock_user_stats
+from crud.upsert import upsert
+from crud.workout_streaks import verify_workout_streaks
+from database import SessionLocal
+from models.streak import WorkoutStreakRun
+from models.user_stats import UserStats
+from models.workout import WorkoutCompletion
+from utils.instrumentation import query_budget
+
+pytestmark = pytest.mark.anyio
+
+
+async def worked_out_user(client, register):
+    tokens = await register("streak")
+    status, data = await client.request("PUT", "/user/workout-completion", {
+        "completed_exercises": {"monday-0": True}, "points": 10
+    }, tokens["headers"])
+    assert status == 200, data
+    return tokens["user_id"]
+
+
+async def stored_streak(db, user_id):
+    runs = (await db.execute(
+        select(WorkoutStreakRun.start_date, WorkoutStreakRun.end_date, WorkoutStreakRun.length)
+        .where(WorkoutStreakRun.user_id == user_id)
+        .order_by(WorkoutStreakRun.start_date)
+    )).all()
+    stats = await db.get(UserStats, user_id, populate_existing=True)
+    return [tuple(run) for run in runs], stats.workout_streak, stats.last_workout_date
+
+
+async def test_repairs_drifted_streak(client, register):
+    user_id = await worked_out_user(client, register)
+    today = date.today()
+    async with SessionLocal() as db:
+        await db.execute(update(UserStats).where(UserStats.user_id == user_id).values(workout_streak=5))
+        await db.commit()
+
+        assert (user_id, "workout_streak", 5, 1) in await verify_workout_streaks(db)
+        assert (user_id, "workout_streak", 5, 1) in await verify_workout_streaks(db, repair=True)
+        assert [m for m in await verify_workout_streaks(db) if m[0] == user_id] == []
+        assert await stored_streak(db, user_id) == ([(today, today, 1)], 1, today)
+
+
+async def test_save_during_scan_is_not_reverted(client, register, monkeypatch):
+    user_id = await worked_out_user(client, register)
+    today = date.today()
+    stored_streak_state = crud.workout_streaks._stored_streak_state
+    calls = []
+
+    async def stale_scan(db, user_ids):
+        # The unlocked scan read history just before today's save landed
+        dates, runs = await stored_streak_state(db, user_ids)
+        if not calls:
+            dates[user_id] = []
+        calls.append(user_ids)
+        return dates, runs
+
+    monkeypatch.setattr(crud.workout_streaks, "_stored_streak_state", stale_scan)
+    async with SessionLocal() as db:
+        mismatches = await verify_workout_streaks(db, repair=True)
+        assert [m for m in mismatches if m[0] == user_id] == []
+        assert [user_id] in calls
+        assert await stored_streak(db, user_id) == ([(today, today, 1)], 1, today)
+
+
+# Stats lock, old points read and upsert, at most four engine
+# statements (lookup, two run writes, a re-query), the stats UPDATE
+SAVE_BUDGET = 8
+
+
+async def save_day(db, user_id, day, points):
+    """A workout completion for any day, saved the way the route saves today's."""
+    with query_budget(SAVE_BUDGET, f"save {day}"):
+        stats = await lock_user_stats(db, user_id)
+        old_points = await db.scalar(select(WorkoutCompletion.points_awarded).where(
+            WorkoutCompletion.user_id == user_id,
+            WorkoutCompletion.completion_date == day
+        )) or 0
+        await db.execute(upsert(
+            db,
+            WorkoutCompletion,
+            {
+                "user_id": user_id,
+                "completion_date": day,
+                "day_of_week": day.strftime("%A").lower(),
+                "completed_exercises": {},
+                "points_awarded": points,
+                "version": 1
+            },
+            index_elements=["user_id", "completion_date"],
+            update_columns=["completed_exercises", "points_awarded"],
+            increment_columns=["version"]
+        ))
+        await apply_workout_completion(db, user_id, day, old_points, points, stats=stats)
+        await db.commit()
+
+
+def day(offset):
+    return date.today() + timedelta(days=offset)
+
+
+# (active days before, day edited, its new points, runs after as (first, last) offsets)
+EDITS = {
+    "bridges two runs": ([-6, -5, -3, -2], -4, 10, [(-6, -2)]),
+    "splits a run": ([-6, -5, -4, -3, -2], -4, 0, [(-6, -5), (-3, -2)]),
+    "extends a run back": ([-3, -2], -4, 10, [(-4, -2)]),
+    "extends the latest run": ([-3, -2], -1, 10, [(-3, -1)]),
+    "starts a past run": ([-2, -1], -5, 10, [(-5, -5), (-2, -1)]),
+    "trims a run's first day": ([-4, -3, -2], -4, 0, [(-3, -2)]),
+    "trims the latest day": ([-6, -4, -3, -2], -2, 0, [(-6, -6), (-4, -3)]),
+    "drops the latest run": ([-6, -5, -2], -2, 0, [(-6, -5)]),
+    "drops the longest run": ([-9, -8, -7, -2], -8, 0, [(-9, -9), (-7, -7), (-2, -2)]),
+}
+
+
+@pytest.mark.parametrize("before, edited, points, after", EDITS.values(), ids=EDITS.keys())
+async def test_back_dated_save_updates_runs_and_streak(register, before, edited, points, after):
+    user_id = (await register("runs"))["user_id"]
+    async with SessionLocal() as db:
+        for offset in before:
+            await save_day(db, user_id, day(offset), 10)
+        await save_day(db, user_id, day(edited), points)
+
+        runs = [(day(first), day(last), last - first + 1) for first, last in after]
+        latest = runs[-1]
+        assert await stored_streak(db, user_id) == (runs, latest[2], latest[1])
+        stats = await db.get(UserStats, user_id)
+        assert stats.longest_workout_streak == max(length for _, _, length in runs)
+        assert [m for m in await verify_workout_streaks(db) if m[0] == user_id] == []
+
+
+async def test_random_saves_match_a_full_recompute(register):
+    user_id = (await register("runs"))["user_id"]
+    rng = random.Random(0)
+    async with SessionLocal() as db:
+        # Few distinct days, so runs merge and split often
+        for _ in range(300):
+            await save_day(db, user_id, day(-rng.randrange(30)), rng.choice([0, 0, 5, 10]))
+        assert [m for m in await verify_workout_streaks(db) if m[0] == user_id] == []
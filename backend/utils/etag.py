@@ -0,0 +1,41 @@
+"""
+Strong ETags built from version stamps, and If-None-Match handling.
+
+A route computes its ETag from whatever identifies the current state of
+the resource (row versions, running totals, request parameters) and can
+answer 304 before loading or serializing the body.
+"""
+import hashlib
+
+from fastapi import Request, Response
+
+# Clients must revalidate every time, but may reuse a body on 304
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    candidates = (tag.strip() for tag in header.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def etag_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def set_etag(response: Response, etag: str):
+    response.headers.update(etag_headers(etag))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=etag_headers(etag))
@@ -0,0 +1,172 @@
+"""
+Request and database instrumentation feeding utils.metrics.
+
+MetricsMiddleware times every HTTP request and labels it with the
+matched route template (never the raw path). instrument_engine wraps
+the dialect's execute calls so each request also reports how many
+statements it issued and how long they took, and statements slower
+than SLOW_QUERY_THRESHOLD_MS are logged with the route that ran them.
+query_budget() asserts an upper bound on statements for a block.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from utils.metrics import registry
+
+# http_request_duration_seconds, http_requests_total,
+# db_queries_per_request and db_query_seconds_total
+request_metrics = registry.request_metrics()
+
+
+# 0 disables the slow-query log
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+_SLOW_QUERY_SECONDS = SLOW_QUERY_THRESHOLD_MS / 1000 if SLOW_QUERY_THRESHOLD_MS else float("inf")
+
+slow_query_logger = logging.getLogger("ritual.slow_query")
+
+
+class QueryStats:
+    """Statements counted while active; see _active."""
+    __slots__ = ("queries", "db_seconds", "scope", "statements")
+
+    def __init__(self, scope=None, record=False):
+        self.queries = 0
+        self.db_seconds = 0.0
+        # The ASGI scope being served, for labelling slow queries
+        self.scope = scope
+        self.statements = [] if record else None
+
+
+# Every counter open in this context, innermost last; the cursor hook
+# adds to all of them so a budget check can wrap a whole request
+_active: ContextVar[tuple] = ContextVar("query_stats", default=())
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def route_label(scope) -> str:
+    route = scope.get("route") if scope is not None else None
+    # Unmatched paths share one label so scanners cannot grow the series
+    return route.path if route is not None else "unmatched"
+
+
+def _current_route() -> str:
+    for stats in reversed(_active.get()):
+        if stats.scope is not None:
+            return route_label(stats.scope)
+    return "-"
+
+
+@contextmanager
+def query_budget(max_queries: int, label: str = "block"):
+    """
+    Fail with QueryBudgetExceeded when the enclosed code runs more than
+    max_queries statements. Yields the QueryStats being filled in.
+    """
+    stats = QueryStats(record=True)
+    token = _active.set(_active.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _active.reset(token)
+    if stats.queries > max_queries:
+        listing = "\n".join(f"  {i + 1}. {sql}" for i, sql in enumerate(stats.statements))
+        raise QueryBudgetExceeded(
+            f"{label} ran {stats.queries} queries, budget is {max_queries}:\n{listing}"
+        )
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware; avoids the per-request task of BaseHTTPMiddleware."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(scope)
+        token = _active.set(_active.get() + (stats,))
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _active.reset(token)
+            request_metrics.record(
+                scope["method"], route_label(scope), status, elapsed, stats.queries, stats.db_seconds
+            )
+
+
+def _record_statement(statement, elapsed, parameters, executemany):
+    for stats in _active.get():
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        if stats.statements is not None:
+            stats.statements.append(" ".join(statement.split()))
+
+    if elapsed >= _SLOW_QUERY_SECONDS:
+        # Only the SQL text, which carries placeholders; bound values
+        # can hold emails or password hashes and are never logged
+        count = len(parameters) if executemany else 1
+        slow_query_logger.warning(
+            "slow query %.1fms route=%s executemany=%s params=<%s set(s) redacted>: %s",
+            elapsed * 1000,
+            _current_route(),
+            executemany,
+            count,
+            " ".join(statement.split())
+        )
+
+
+def instrument_engine(engine):
+    """
+    Count, time and slow-log every statement run through ``engine``.
+
+    Wraps the dialect's do_execute* methods rather than listening for
+    cursor events: any cursor listener moves every statement onto
+    SQLAlchemy's event dispatch path, which costs more than the
+    bookkeeping itself. Failed statements are not counted.
+    """
+    dialect = getattr(engine, "sync_engine", engine).dialect
+    do_execute = dialect.do_execute
+    do_executemany = dialect.do_executemany
+    do_execute_no_params = dialect.do_execute_no_params
+    clock = time.perf_counter
+
+    def timed_execute(cursor, statement, parameters, context=None):
+        start = clock()
+        result = do_execute(cursor, statement, parameters, context)
+        _record_statement(statement, clock() - start, parameters, False)
+        return result
+
+    def timed_executemany(cursor, statement, parameters, context=None):
+        start = clock()
+        result = do_executemany(cursor, statement, parameters, context)
+        _record_statement(statement, clock() - start, parameters, True)
+        return result
+
+    def timed_execute_no_params(cursor, statement, context=None):
+        start = clock()
+        result = do_execute_no_params(cursor, statement, context)
+        _record_statement(statement, clock() - start, None, False)
+        return result
+
+    dialect.do_execute = timed_execute
+    dialect.do_executemany = timed_executemany
+    dialect.do_execute_no_params = timed_execute_no_params
@@ -0,0 +1,210 @@
+"""
+In-process counters and histograms rendered in the Prometheus text
+exposition format. Recording is a dict lookup, a bisect and a few
+additions under a lock, so it can sit on every request.
+"""
+import math
+import threading
+from bisect import bisect_left
+from typing import Callable, Sequence
+
+# Seconds; request latency and per-query DB time
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Statements issued by one request
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 50, 100)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._series.items())
+        names = self.labels + ("le",)
+        for label_values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = _format_value(float(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(names, label_values + (le,))} {cumulative}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class GaugeCallback:
+    """Gauges read at scrape time from a callable returning {label values: value}."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], read: Callable[[], dict]):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.read = read
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for label_values, value in sorted(self.read().items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class RequestMetrics:
+    """
+    The per-request families (latency, responses by status, statements
+    and DB time), recorded together so a request costs one dict lookup
+    rather than one locked update per family. Rendered as the separate
+    histograms and counters; the DB families are by route only.
+
+    Unlocked: requests are recorded, and /metrics rendered, on the
+    event loop thread only. Use Histogram and Counter from threads.
+    """
+
+    def __init__(self, latency_buckets=LATENCY_BUCKETS, count_buckets=COUNT_BUCKETS):
+        self.latency_buckets = tuple(latency_buckets)
+        self.count_buckets = tuple(count_buckets)
+        # (method, route) -> [latency counts, latency sum, {status: n},
+        #                     statement counts, statement sum, db seconds]
+        self._series = {}
+
+    def record(self, method: str, route: str, status: int, seconds: float, queries: int, db_seconds: float):
+        i = bisect_left(self.latency_buckets, seconds)
+        j = bisect_left(self.count_buckets, queries)
+        series = self._series.get((method, route))
+        if series is None:
+            series = self._series[(method, route)] = [
+                [0] * (len(self.latency_buckets) + 1), 0.0, {},
+                [0] * (len(self.count_buckets) + 1), 0.0, 0.0
+            ]
+        series[0][i] += 1
+        series[1] += seconds
+        statuses = series[2]
+        statuses[status] = statuses.get(status, 0) + 1
+        series[3][j] += 1
+        series[4] += queries
+        series[5] += db_seconds
+
+    def render(self) -> list:
+        duration = Histogram(
+            "http_request_duration_seconds",
+            "HTTP request latency by route template",
+            labels=("method", "route"),
+            buckets=self.latency_buckets
+        )
+        responses = Counter(
+            "http_requests_total",
+            "HTTP responses by route template and status code",
+            labels=("method", "route", "status")
+        )
+        statements = Histogram(
+            "db_queries_per_request",
+            "SQL statements issued while serving one request",
+            labels=("route",),
+            buckets=self.count_buckets
+        )
+        db_time = Counter(
+            "db_query_seconds_total",
+            "Time spent executing SQL statements, by route",
+            labels=("route",)
+        )
+
+        for (method, route), (latency, latency_sum, statuses, counts, count_sum, db_seconds) in list(self._series.items()):
+            duration._series[(method, route)] = [latency, latency_sum, sum(latency)]
+            for status, n in statuses.items():
+                responses._values[(method, route, status)] = n
+            merged = statements._series.setdefault((route,), [[0] * len(counts), 0.0, 0])
+            merged[0] = [a + b for a, b in zip(merged[0], counts)]
+            merged[1] += count_sum
+            merged[2] += sum(counts)
+            if db_seconds:
+                db_time._values[(route,)] = db_time._values.get((route,), 0) + db_seconds
+        return duration.render() + responses.render() + statements.render() + db_time.render()
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self.register(Counter(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self.register(Histogram(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> GaugeCallback:
+        return self.register(GaugeCallback(*args, **kwargs))
+
+    def request_metrics(self, *args, **kwargs) -> RequestMetrics:
+        return self.register(RequestMetrics(*args, **kwargs))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
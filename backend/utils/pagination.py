@@ -0,0 +1,26 @@
+"""
+Opaque keyset cursors. A cursor carries the sort key of the last row
+on a page, as URL-safe base64 JSON; clients pass it back unchanged.
+"""
+import base64
+import binascii
+import json
+from datetime import date
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(last_date: date) -> str:
+    payload = json.dumps({"d": last_date.isoformat()}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> date:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return date.fromisoformat(payload["d"])
+    except (binascii.Error, ValueError, KeyError, TypeError, UnicodeDecodeError):
+        raise InvalidCursor("Invalid cursor")
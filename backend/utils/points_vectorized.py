@@ -0,0 +1,27 @@
+"""
+NumPy twin of utils.points.calculate_points for bulk rescoring.
+Any rule change must be made in both places; crud.rescore can verify
+that they agree row for row.
+"""
+import numpy as np
+
+
+def calculate_points_array(
+    steps: np.ndarray,
+    junk_quantity: np.ndarray,
+    max_allowed: np.ndarray
+) -> np.ndarray:
+    steps = np.asarray(steps, dtype=np.int64)
+    junk_quantity = np.asarray(junk_quantity, dtype=np.int64)
+    max_allowed = np.asarray(max_allowed, dtype=np.int64)
+
+    # 30 points at 6k steps, 5 per full 1k up to 10k, capped at 50
+    additional = (np.minimum(steps, 10000) - 6000) // 1000 * 5
+    points = np.where(steps >= 6000, 30 + additional, 0)
+    points = np.minimum(points, 50)
+
+    # Junk penalty: 5 points per item over the allowed quantity
+    excess = junk_quantity - max_allowed
+    points -= np.where(excess > 0, excess * 5, 0)
+
+    return points
@@ -0,0 +1,123 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Hashable, Optional
+
+
+class RankIndex:
+    """
+    Users ordered by points (highest first, ties by user id), kept as a
+    sorted array so rank and neighbour lookups are a binary search.
+    Safe to share between threadpool workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._points = {}
+        self._keys = []
+        self.tag = None
+        self.loaded_at = None
+        # Bumped on every change, so callers can tell pages apart cheaply
+        self.version = 0
+        # Users changed while a reload is in flight; None when not tracking
+        self._changed = None
+
+    def replace(self, scores: dict, tag=None):
+        # tag records what the scores describe, e.g. the window's start
+        keys = sorted((-points, user_id) for user_id, points in scores.items())
+        with self._lock:
+            self._points = dict(scores)
+            self._keys = keys
+            self.tag = tag
+            self.loaded_at = time.monotonic()
+            self.version += 1
+
+    def track_changes(self):
+        """Start recording changed users, before a reload's query runs."""
+        with self._lock:
+            self._changed = set()
+
+    def take_changes(self) -> set:
+        """
+        Users changed since tracking started or the last call. Tracking
+        stops once a call finds none.
+        """
+        with self._lock:
+            changed = self._changed or set()
+            self._changed = set() if changed else None
+            return changed
+
+    def note_change(self, user_id: Hashable):
+        # A change the index itself does not hold, e.g. one for the next week
+        with self._lock:
+            if self._changed is not None:
+                self._changed.add(user_id)
+
+    def update(self, scores: dict):
+        """Overwrite some users' points with freshly read ones, untracked."""
+        with self._lock:
+            for user_id, points in scores.items():
+                self._move(user_id, points, track=False)
+
+    def _move(self, user_id: Hashable, points: int, track: bool = True):
+        if track and self._changed is not None:
+            self._changed.add(user_id)
+        old = self._points.get(user_id)
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, user_id))]
+        self._points[user_id] = points
+        insort(self._keys, (-points, user_id))
+        self.version += 1
+
+    def set(self, user_id: Hashable, points: int):
+        with self._lock:
+            self._move(user_id, points)
+
+    def setdefault(self, user_id: Hashable, points: int):
+        # Leaves a user already present alone, whatever their points
+        with self._lock:
+            if user_id not in self._points:
+                self._move(user_id, points)
+
+    def add(self, user_id: Hashable, delta: int):
+        with self._lock:
+            self._move(user_id, self._points.get(user_id, 0) + delta)
+
+    def touch(self):
+        # Something shown next to the scores changed, e.g. a profile
+        with self._lock:
+            self.version += 1
+
+    def get(self, user_id: Hashable) -> Optional[int]:
+        with self._lock:
+            return self._points.get(user_id)
+
+    def _rank(self, points: int) -> int:
+        # Standard competition ranking: 1 + users with strictly more points
+        return bisect_left(self._keys, (-points,)) + 1
+
+    def page(self, offset: int, limit: int) -> list:
+        """(rank, user_id, points) for positions offset .. offset+limit."""
+        with self._lock:
+            return [
+                (self._rank(-neg_points), user_id, -neg_points)
+                for neg_points, user_id in self._keys[offset:offset + limit]
+            ]
+
+    def around(self, user_id: Hashable, k: int) -> Optional[tuple]:
+        """(rank, points, [(rank, user_id, points)]) for the user and k either side."""
+        with self._lock:
+            points = self._points.get(user_id)
+            if points is None:
+                return None
+            position = bisect_left(self._keys, (-points, user_id))
+            start = max(position - k, 0)
+            window = [
+                (self._rank(-neg_points), uid, -neg_points)
+                for neg_points, uid in self._keys[start:position + k + 1]
+            ]
+            return self._rank(points), points, window
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._keys)
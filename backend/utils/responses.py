@@ -0,0 +1,50 @@
+"""
+JSON rendering with orjson, and gzip for large bodies.
+
+ORJSONResponse is the app's default response class. Routes whose output
+they assemble themselves (already in the documented shape) can return
+json_response() to skip FastAPI's response_model validation and
+jsonable_encoder pass; they keep response_model for the OpenAPI schema.
+"""
+import os
+
+from fastapi.responses import ORJSONResponse
+from starlette.middleware.gzip import GZipMiddleware
+
+# Bodies at least this large are gzipped for clients that accept it;
+# 0 turns compression off
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+
+
+def json_response(content, headers=None, status_code: int = 200) -> ORJSONResponse:
+    return ORJSONResponse(content, status_code=status_code, headers=headers)
+
+
+class CompressionMiddleware:
+    """
+    Starlette's GZipMiddleware, except that a strong ETag on a
+    compressed body is sent as weak: the gzipped bytes are a different
+    representation, and If-None-Match compares weakly anyway.
+    """
+
+    def __init__(self, app, minimum_size: int = GZIP_MIN_SIZE, compresslevel: int = GZIP_LEVEL):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=compresslevel)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_weak_etag(message):
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                if (b"content-encoding", b"gzip") in headers:
+                    message["headers"] = [
+                        (k, b"W/" + v if k == b"etag" and not v.startswith(b"W/") else v)
+                        for k, v in headers
+                    ]
+            await send(message)
+
+        await self.gzip(scope, receive, send_with_weak_etag)
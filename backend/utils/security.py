@@ -1,27 +1,127 @@
+import asyncio
 import os
+import hashlib
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from passlib.context import CryptContext
 import jwt
-from typing import Optional
+from typing import Optional, Tuple
+
+from utils.cache import TTLCache
+from utils.metrics import registry
+
+# Argon2 cost parameters; hashes made with other values are
+# upgraded on the next successful login
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
 
 pwd_context = CryptContext(
     schemes=["argon2"],
-    deprecated="auto"
+    deprecated="auto",
+    argon2__rounds=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__parallelism=ARGON2_PARALLELISM
 )
 
+# Hashing runs in its own processes so a login burst cannot starve
+# the request threadpool. HASH_POOL_SIZE=0 hashes inline instead.
+HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", "2"))
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", str(max(HASH_POOL_SIZE, 1) * 4)))
+
 # JWT Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-super-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
+# Verified payloads keyed by token digest; entries never outlive the token's exp
+token_cache = TTLCache(
+    maxsize=int(os.getenv("TOKEN_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+)
+
+
+class HashingBusy(Exception):
+    """Raised when too many hash operations are already queued."""
+
+
+hash_duration = registry.histogram(
+    "password_hash_duration_seconds",
+    "Argon2 work per call, including time queued for a hashing worker",
+    labels=("operation",)
+)
+hash_rejected = registry.counter(
+    "password_hash_rejected_total",
+    "Hash calls refused because HASH_MAX_PENDING were already queued",
+    labels=("operation",)
+)
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+_hash_slots = threading.BoundedSemaphore(max(HASH_MAX_PENDING, 1))
+
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    if _hash_pool is None:
+        with _hash_pool_lock:
+            if _hash_pool is None:
+                _hash_pool = ProcessPoolExecutor(
+                    max_workers=HASH_POOL_SIZE,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _hash_pool
+
 
-def hash_password(password: str) -> str:
+def shutdown_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown(wait=False, cancel_futures=True)
+            _hash_pool = None
+
+
+async def _run_hashing(operation, fn, *args):
+    # Admission control: reject instead of queueing without bound
+    if not _hash_slots.acquire(blocking=False):
+        hash_rejected.inc(operation)
+        raise HashingBusy()
+    start = time.perf_counter()
+    try:
+        # Inline mode still keeps the event loop free via the default executor
+        executor = _get_hash_pool() if HASH_POOL_SIZE > 0 else None
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+    finally:
+        _hash_slots.release()
+        hash_duration.observe(time.perf_counter() - start, operation)
+
+
+def _hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
-def verify_password(password: str, hashed: str) -> bool:
-    return pwd_context.verify(password, hashed)
+def _verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed)
+
+
+async def hash_password(password: str) -> str:
+    return await _run_hashing("hash", _hash, password)
+
+
+async def verify_and_update_password(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and, when the stored hash uses outdated Argon2
+    parameters, also return a replacement hash (otherwise None).
+    """
+    return await _run_hashing("verify", _verify_and_update, password, hashed)
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return (await verify_and_update_password(password, hashed))[0]
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -45,8 +145,19 @@ def create_refresh_token(data: dict) -> str:
 
 
 def decode_token(token: str) -> Optional[dict]:
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is not None:
+        return dict(payload)
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except jwt.PyJWTError:
         return None
+
+    # Only tokens that carry an expiry are cached, and only until then
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        token_cache.set(key, payload, ttl=exp - time.time())
+
+    return dict(payload)